@@ -1,6 +1,19 @@
 from django.apps import AppConfig
+from django.core.signals import request_started
+from django.db.models.signals import post_migrate
 
 
 class ApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'api'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        # Instala a contagem de consultas nas conexões abertas a partir daqui
+        from . import metricas  # noqa: F401
+        # Triggers da busca (SQL bruto) descartados quando o SQLite refaz a tabela
+        from .busca import garantir_triggers
+        post_migrate.connect(garantir_triggers, sender=self)
+        # Despachante de tarefas de cada processo web (ver api/tarefas.py)
+        from . import tarefas
+        request_started.connect(tarefas.iniciar)
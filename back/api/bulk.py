@@ -0,0 +1,298 @@
+"""
+Operações em lote para /api/falhas/bulk/ e /api/unidades/bulk/.
+
+Cada função valida todos os itens de uma vez (as referências a unidades e
+os id_unidade existentes são carregados com uma consulta só), grava os
+itens válidos em uma única transação com bulk_create/bulk_update e devolve
+os erros por item, identificados pela posição no lote.
+"""
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .filters import FiltroInvalido
+from .models import UnidadeDjango, FalhaDjango
+from .serializers import UnidadeSerializer, UnidadeLoteSerializer, FalhaSerializer
+from . import confiabilidade, rollup
+from .cache import incrementar_versao
+from . import eventos, historico, signals
+
+
+class ErroLote(Exception):
+    """Falha que impede o processamento do lote inteiro"""
+
+
+CAMPOS_FALHA = ['unidade', 'falha_ocorrida', 'data_falha', 'observacao', 'ativa']
+CAMPOS_UNIDADE = ['nome_unidade', 'grupo_unidade', 'tecnico_unidade', 'id_unidade', 'observacoes']
+
+
+def get_max_itens():
+    return getattr(settings, 'API_BULK_MAX_ITEMS', 1000)
+
+
+def validar_lista(itens):
+    """Garante que o corpo é uma lista de tamanho aceitável"""
+    if not isinstance(itens, list):
+        raise FiltroInvalido('O corpo da requisição deve ser uma lista')
+    if len(itens) > get_max_itens():
+        raise FiltroInvalido(f'O lote aceita no máximo {get_max_itens()} itens')
+    return itens
+
+
+def erro_item(indice, erros):
+    return {'index': indice, 'errors': erros}
+
+
+def id_valido(valor):
+    """Ids do lote são inteiros (bool é subclasse de int e fica de fora)"""
+    return isinstance(valor, int) and not isinstance(valor, bool)
+
+
+def ids_dos_itens(itens):
+    """Ids válidos dos objetos do lote, na ordem em que aparecem"""
+    return [item['id'] for item in itens if isinstance(item, dict) and id_valido(item.get('id'))]
+
+
+def ler_ids(itens):
+    """Extrai os ids de uma lista de ids ou de objetos com 'id'"""
+    ids = []
+    for item in validar_lista(itens):
+        valor = item.get('id') if isinstance(item, dict) else item
+        if not id_valido(valor):
+            raise FiltroInvalido("Cada item deve ser um id inteiro ou um objeto com 'id'")
+        ids.append(valor)
+    return ids
+
+
+def carregar_unidades(itens):
+    """Carrega em uma consulta todas as unidades referenciadas pelos itens"""
+    ids = set()
+    for item in itens:
+        valor = item.get('unidade') if isinstance(item, dict) else None
+        try:
+            if not isinstance(valor, bool):
+                ids.add(int(valor))
+        except (TypeError, ValueError):
+            pass
+    return UnidadeDjango.objects.only('id', 'nome_unidade').in_bulk(ids)
+
+
+def validar_itens(serializer_class, itens, instancias=None, context=None):
+    """
+    Valida cada item com o serializer e retorna (validos, erros), onde
+    validos é uma lista de (indice, instancia ou None, validated_data).
+    """
+    validos, erros = [], []
+    for indice, item in enumerate(itens):
+        if not isinstance(item, dict):
+            erros.append(erro_item(indice, {'non_field_errors': ['Item deve ser um objeto']}))
+            continue
+        instancia = None
+        if instancias is not None:
+            if not id_valido(item.get('id')):
+                erros.append(erro_item(indice, {'id': ['Informe o id inteiro do registro']}))
+                continue
+            instancia = instancias.get(item['id'])
+            if instancia is None:
+                erros.append(erro_item(indice, {'id': ['Registro não encontrado']}))
+                continue
+        serializer = serializer_class(instancia, data=item, context=context or {})
+        if serializer.is_valid():
+            validos.append((indice, instancia, serializer.validated_data))
+        else:
+            erros.append(erro_item(indice, serializer.errors))
+    return validos, erros
+
+
+def ids_duplicados(itens):
+    """Conjunto de ids que aparecem mais de uma vez no lote"""
+    vistos, duplicados = set(), set()
+    for valor in ids_dos_itens(itens):
+        if valor in vistos:
+            duplicados.add(valor)
+        vistos.add(valor)
+    return duplicados
+
+
+def rejeitar_duplicados(itens, validos, erros, duplicados, campo, mensagem):
+    """Move para `erros` os itens válidos cujo `campo` está em `duplicados`"""
+    restantes = []
+    for indice, instancia, dados in validos:
+        if dados.get(campo, itens[indice].get(campo)) in duplicados:
+            erros.append(erro_item(indice, {campo: [mensagem]}))
+        else:
+            restantes.append((indice, instancia, dados))
+    return restantes
+
+
+# Falhas
+
+def criar_falhas(itens):
+    validar_lista(itens)
+    contexto = {'unidades_por_id': carregar_unidades(itens)}
+    validos, erros = validar_itens(FalhaSerializer, itens, context=contexto)
+
+    falhas = [FalhaDjango(**dados) for _, _, dados in validos]
+    with transaction.atomic():
+        falhas = FalhaDjango.objects.bulk_create(falhas)
+        historico.registrar_lote(falhas, 'created')
+        rollup.registrar_lote(adicionadas=[rollup.chave_resumo(falha) for falha in falhas])
+        confiabilidade.registrar_lote(adicionadas=[confiabilidade.contribuicao(falha) for falha in falhas])
+        if falhas:
+            incrementar_versao('falhas')
+
+    dados = FalhaSerializer(falhas, many=True).data
+    eventos.publicar_lote('falha', 'created', dados)
+    return {'created': dados, 'errors': ordenar_erros(erros)}
+
+
+def atualizar_falhas(itens):
+    validar_lista(itens)
+    duplicados = ids_duplicados(itens)
+    instancias = FalhaDjango.objects.com_unidade().in_bulk(ids_dos_itens(itens))
+    contexto = {'unidades_por_id': carregar_unidades(itens)}
+    validos, erros = validar_itens(FalhaSerializer, itens, instancias, contexto)
+    validos = rejeitar_duplicados(itens, validos, erros, duplicados, 'id', 'Registro repetido no lote')
+
+    agora = timezone.now()
+    removidas, anteriores, falhas = [], [], []
+    for _, falha, dados in validos:
+        removidas.append(rollup.chave_resumo(falha))
+        anteriores.append(confiabilidade.contribuicao(falha))
+        for campo, valor in dados.items():
+            setattr(falha, campo, valor)
+        falha.marcar_resolucao(agora)
+        falha.updated_at = agora
+        falhas.append(falha)
+
+    with transaction.atomic():
+        FalhaDjango.objects.bulk_update(falhas, CAMPOS_FALHA + ['resolvida_em', 'updated_at'], batch_size=500)
+        historico.registrar_lote(falhas, 'updated')
+        rollup.registrar_lote(removidas, [rollup.chave_resumo(falha) for falha in falhas])
+        confiabilidade.registrar_lote(anteriores, [confiabilidade.contribuicao(falha) for falha in falhas])
+        if falhas:
+            incrementar_versao('falhas')
+
+    dados = FalhaSerializer(falhas, many=True).data
+    eventos.publicar_lote('falha', 'updated', dados)
+    return {'updated': dados, 'errors': ordenar_erros(erros)}
+
+
+def excluir_falhas(itens):
+    ids = ler_ids(itens)
+    with transaction.atomic():
+        falhas = FalhaDjango.objects.filter(pk__in=ids)
+        linhas = list(falhas.values(*signals.colunas_exclusao(FalhaDjango, 'resolvida_em')))
+        signals.excluir_em_lote(falhas, linhas)
+        rollup.registrar_lote(removidas=[(linha['unidade_id'], linha['data_falha'], linha['ativa']) for linha in linhas])
+        confiabilidade.registrar_lote(removidas=[
+            confiabilidade.Contribuicao(
+                linha['unidade_id'], linha['falha_ocorrida'], linha['data_falha'], linha['ativa'],
+                confiabilidade.tempo_reparo(linha['data_falha'], linha['ativa'], linha['resolvida_em']),
+            )
+            for linha in linhas
+        ])
+
+    excluidos = {linha['id'] for linha in linhas}
+    return excluidos_e_erros(ids, excluidos)
+
+
+# Unidades
+
+def verificar_id_unidade(itens, validos, erros, instancias=None):
+    """
+    Rejeita id_unidade já usados por outra unidade ou repetidos no lote (a
+    primeira ocorrência é aceita), com uma única consulta para o lote todo.
+    """
+    valores = {dados['id_unidade'] for _, _, dados in validos}
+    existentes = dict(UnidadeDjango.objects.filter(id_unidade__in=valores).values_list('id_unidade', 'pk'))
+
+    vistos, restantes = set(), []
+    for indice, instancia, dados in validos:
+        dono = existentes.get(dados['id_unidade'])
+        if dados['id_unidade'] in vistos:
+            erros.append(erro_item(indice, {'id_unidade': ['id_unidade repetido no lote']}))
+        elif dono is not None and (instancia is None or dono != instancia.pk):
+            erros.append(erro_item(indice, {'id_unidade': ['Unidade com este ID da Unidade já existe.']}))
+        else:
+            vistos.add(dados['id_unidade'])
+            restantes.append((indice, instancia, dados))
+    return restantes
+
+
+def criar_unidades(itens):
+    validar_lista(itens)
+    validos, erros = validar_itens(UnidadeLoteSerializer, itens)
+    validos = verificar_id_unidade(itens, validos, erros)
+
+    unidades = [UnidadeDjango(**dados) for _, _, dados in validos]
+    try:
+        with transaction.atomic():
+            unidades = UnidadeDjango.objects.bulk_create(unidades)
+            historico.registrar_lote(unidades, 'created')
+            if unidades:
+                incrementar_versao('unidades')
+    except IntegrityError:
+        raise ErroLote('Conflito de id_unidade com uma gravação concorrente; reenvie o lote')
+
+    dados = UnidadeSerializer(unidades, many=True).data
+    eventos.publicar_lote('unidade', 'created', dados)
+    return {'created': dados, 'errors': ordenar_erros(erros)}
+
+
+def atualizar_unidades(itens):
+    validar_lista(itens)
+    duplicados = ids_duplicados(itens)
+    instancias = UnidadeDjango.objects.in_bulk(ids_dos_itens(itens))
+    validos, erros = validar_itens(UnidadeLoteSerializer, itens, instancias)
+    validos = rejeitar_duplicados(itens, validos, erros, duplicados, 'id', 'Registro repetido no lote')
+    validos = verificar_id_unidade(itens, validos, erros, instancias)
+
+    agora = timezone.now()
+    unidades, grupos = [], {}
+    for _, unidade, dados in validos:
+        grupos[unidade.pk] = unidade.grupo_unidade
+        for campo, valor in dados.items():
+            setattr(unidade, campo, valor)
+        unidade.updated_at = agora
+        unidades.append(unidade)
+
+    try:
+        with transaction.atomic():
+            UnidadeDjango.objects.bulk_update(unidades, CAMPOS_UNIDADE + ['updated_at'], batch_size=500)
+            historico.registrar_lote(unidades, 'updated')
+            confiabilidade.mover_unidades({
+                unidade.pk: (grupos[unidade.pk], unidade.grupo_unidade) for unidade in unidades
+            })
+            if unidades:
+                incrementar_versao('unidades')
+    except IntegrityError:
+        raise ErroLote('Conflito de id_unidade entre unidades do lote; reenvie o lote')
+
+    dados = UnidadeSerializer(unidades, many=True).data
+    eventos.publicar_lote('unidade', 'updated', dados)
+    return {'updated': dados, 'errors': ordenar_erros(erros)}
+
+
+def excluir_unidades(itens):
+    ids = ler_ids(itens)
+    with transaction.atomic():
+        unidades = UnidadeDjango.objects.filter(pk__in=ids)
+        linhas = list(unidades.values(*signals.colunas_exclusao(UnidadeDjango)))
+        # As falhas e o resumo diário dessas unidades são removidos em cascata
+        signals.excluir_em_lote(unidades, linhas)
+        excluidos = {linha['id'] for linha in linhas}
+
+    return excluidos_e_erros(ids, excluidos)
+
+
+def excluidos_e_erros(ids, excluidos):
+    erros = [
+        erro_item(indice, {'id': ['Registro não encontrado']})
+        for indice, pk in enumerate(ids) if pk not in excluidos
+    ]
+    return {'deleted': sorted(excluidos), 'errors': erros}
+
+
+def ordenar_erros(erros):
+    return sorted(erros, key=lambda erro: erro['index'])
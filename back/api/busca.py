@@ -0,0 +1,169 @@
+"""
+Busca de texto completo em falhas (falha_ocorrida, observacao e nome da
+unidade), ordenada por relevância.
+
+No SQLite usa a tabela FTS5 api_falha_busca criada na migração 0009 e
+mantida por triggers (recriadas por garantir_triggers() no post_migrate,
+ver abaixo); a consulta percorre só o índice invertido, então o
+tempo depende do número de resultados, não do tamanho do histórico. Em
+outros bancos cai para um filtro icontains sem ordenação por relevância.
+"""
+import logging
+import re
+
+from django.db import DEFAULT_DB_ALIAS, connection, connections, transaction
+from django.db.models import Q
+
+from .cache import incrementar_versao
+from .filters import FiltroInvalido, parse_bool, parse_int
+from .models import FalhaDjango
+
+
+MAX_TERMOS = 10
+LIMITE_PADRAO = 50
+LIMITE_MAXIMO = 200
+
+# Pesos do bm25 por coluna: falha_ocorrida, observacao, nome_unidade
+PESOS_BM25 = (4.0, 1.0, 2.0)
+
+logger = logging.getLogger(__name__)
+
+# Triggers que mantêm api_falha_busca (mesmo SQL da migração 0009). O SQLite
+# não tem ALTER COLUMN: o Django refaz a tabela (cria uma nova, copia e
+# renomeia) em AlterField/RemoveField, o que descarta os triggers dela.
+TRIGGERS_BUSCA = {
+    'api_falha_busca_insert': """
+        CREATE TRIGGER api_falha_busca_insert AFTER INSERT ON api_falhadjango BEGIN
+            INSERT INTO api_falha_busca (rowid, falha_ocorrida, observacao, nome_unidade)
+            SELECT NEW.id, NEW.falha_ocorrida, NEW.observacao, u.nome_unidade
+            FROM api_unidadedjango u WHERE u.id = NEW.unidade_id;
+        END
+    """,
+    'api_falha_busca_delete': """
+        CREATE TRIGGER api_falha_busca_delete AFTER DELETE ON api_falhadjango BEGIN
+            DELETE FROM api_falha_busca WHERE rowid = OLD.id;
+        END
+    """,
+    'api_falha_busca_update': """
+        CREATE TRIGGER api_falha_busca_update AFTER UPDATE OF falha_ocorrida, observacao, unidade_id
+        ON api_falhadjango BEGIN
+            DELETE FROM api_falha_busca WHERE rowid = OLD.id;
+            INSERT INTO api_falha_busca (rowid, falha_ocorrida, observacao, nome_unidade)
+            SELECT NEW.id, NEW.falha_ocorrida, NEW.observacao, u.nome_unidade
+            FROM api_unidadedjango u WHERE u.id = NEW.unidade_id;
+        END
+    """,
+    'api_unidade_busca_update': """
+        CREATE TRIGGER api_unidade_busca_update AFTER UPDATE OF nome_unidade ON api_unidadedjango
+        WHEN NEW.nome_unidade IS NOT OLD.nome_unidade BEGIN
+            UPDATE api_falha_busca SET nome_unidade = NEW.nome_unidade
+            WHERE rowid IN (SELECT id FROM api_falhadjango WHERE unidade_id = NEW.id);
+        END
+    """,
+}
+
+REINDEXAR_BUSCA = """
+    INSERT INTO api_falha_busca (rowid, falha_ocorrida, observacao, nome_unidade)
+    SELECT f.id, f.falha_ocorrida, f.observacao, u.nome_unidade
+    FROM api_falhadjango f JOIN api_unidadedjango u ON u.id = f.unidade_id
+"""
+
+
+def garantir_triggers(using=DEFAULT_DB_ALIAS, **kwargs):
+    """
+    Receiver de post_migrate: recria os triggers de api_falha_busca que uma
+    migração posterior tenha descartado e reconstrói o índice, que pode ter
+    perdido gravações feitas sem eles. Retorna os nomes recriados.
+    """
+    conexao = connections[using]
+    if conexao.vendor != 'sqlite':
+        return []
+    with conexao.cursor() as cursor:
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE type IN ('table', 'trigger') AND name LIKE 'api_%busca%'"
+        )
+        existentes = {linha[0] for linha in cursor.fetchall()}
+        # Sem a tabela a migração 0009 ainda não foi aplicada (ou foi revertida)
+        if 'api_falha_busca' not in existentes:
+            return []
+        faltando = [nome for nome in TRIGGERS_BUSCA if nome not in existentes]
+        if not faltando:
+            return []
+        logger.warning('Recriando triggers da busca: %s', ', '.join(faltando))
+        with transaction.atomic(using=using):
+            for nome in faltando:
+                cursor.execute(TRIGGERS_BUSCA[nome])
+            cursor.execute('DELETE FROM api_falha_busca')
+            cursor.execute(REINDEXAR_BUSCA)
+            # Invalida as respostas de /api/falhas/busca/ guardadas com o índice antigo
+            incrementar_versao('falhas')
+    return faltando
+
+
+def extrair_termos(texto):
+    """Palavras da busca, sem a sintaxe de consulta do FTS5"""
+    termos = re.findall(r'\w+', texto or '')
+    if not termos:
+        raise FiltroInvalido("Informe o texto da busca em 'q'")
+    return termos[:MAX_TERMOS]
+
+
+def consulta_fts(termos):
+    """Todas as palavras precisam aparecer; a última aceita prefixo (busca enquanto digita)"""
+    partes = [f'"{termo}"' for termo in termos]
+    partes[-1] += '*'
+    return ' '.join(partes)
+
+
+def fts_disponivel():
+    return connection.vendor == 'sqlite'
+
+
+def buscar_ids_fts(termos, limite, unidade=None, ativa=None):
+    sql = [
+        'SELECT api_falha_busca.rowid FROM api_falha_busca',
+        'JOIN api_falhadjango f ON f.id = api_falha_busca.rowid',
+        'WHERE api_falha_busca MATCH %s',
+    ]
+    params = [consulta_fts(termos)]
+    if unidade is not None:
+        sql.append('AND f.unidade_id = %s')
+        params.append(unidade)
+    if ativa is not None:
+        sql.append('AND f.ativa = %s')
+        params.append(ativa)
+    sql.append('ORDER BY bm25(api_falha_busca, %s, %s, %s) LIMIT %s')
+    params += [*PESOS_BM25, limite]
+
+    with connection.cursor() as cursor:
+        cursor.execute(' '.join(sql), params)
+        return [linha[0] for linha in cursor.fetchall()]
+
+
+def buscar_falhas(params):
+    """
+    Retorna as falhas que correspondem a params['q'], da mais relevante para
+    a menos relevante. Aceita também unidade, ativa e limit.
+    """
+    termos = extrair_termos(params.get('q'))
+    limite = parse_int('limit', params['limit']) if params.get('limit') else LIMITE_PADRAO
+    limite = max(1, min(limite, LIMITE_MAXIMO))
+    unidade = parse_int('unidade', params['unidade']) if params.get('unidade') else None
+    ativa = parse_bool('ativa', params['ativa']) if params.get('ativa') else None
+
+    falhas = FalhaDjango.objects.com_unidade()
+    if fts_disponivel():
+        ids = buscar_ids_fts(termos, limite, unidade, ativa)
+        por_id = falhas.in_bulk(ids)
+        return [por_id[pk] for pk in ids if pk in por_id]
+
+    if unidade is not None:
+        falhas = falhas.filter(unidade_id=unidade)
+    if ativa is not None:
+        falhas = falhas.filter(ativa=ativa)
+    for termo in termos:
+        falhas = falhas.filter(
+            Q(falha_ocorrida__icontains=termo) | Q(observacao__icontains=termo)
+            | Q(unidade__nome_unidade__icontains=termo)
+        )
+    return list(falhas[:limite])
@@ -0,0 +1,177 @@
+"""
+Cache de respostas GET com validação por ETag/Last-Modified.
+
+Cada tabela tem um contador em VersaoTabelaDjango, incrementado a cada
+gravação (ver api.signals). A chave da resposta em cache e o ETag são
+derivados das versões das tabelas de que a view depende, então uma
+gravação torna inalcançáveis todas as respostas antigas: nunca é servido
+conteúdo defasado, sem precisar apagar nada do cache.
+
+Como as versões ficam no banco, a invalidação vale para todos os
+processos; o backend de cache (settings.CACHES[API_CACHE_ALIAS]) guarda
+apenas os corpos das respostas e pode ser memória local, arquivo, etc.
+"""
+import hashlib
+from functools import wraps
+from inspect import iscoroutinefunction
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.db.models import F
+from django.http import HttpResponse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+
+from .models import VersaoTabelaDjango
+
+
+def get_cache():
+    return caches[getattr(settings, 'API_CACHE_ALIAS', 'default')]
+
+
+def incrementar_versao(*tabelas):
+    """Marca as tabelas como alteradas, invalidando as respostas que dependem delas"""
+    agora = timezone.now()
+    for tabela in tabelas:
+        atualizadas = VersaoTabelaDjango.objects.filter(tabela=tabela).update(
+            versao=F('versao') + 1, modificado_em=agora
+        )
+        if not atualizadas:
+            VersaoTabelaDjango.objects.get_or_create(tabela=tabela, defaults={'modificado_em': agora})
+
+
+def get_versoes(tabelas):
+    """Retorna {tabela: (versao, modificado_em)} em uma única consulta"""
+    versoes = {
+        versao.tabela: (versao.versao, versao.modificado_em)
+        for versao in VersaoTabelaDjango.objects.filter(tabela__in=tabelas)
+    }
+    for tabela in tabelas:
+        if tabela not in versoes:
+            versao, _ = VersaoTabelaDjango.objects.get_or_create(
+                tabela=tabela, defaults={'modificado_em': timezone.now()}
+            )
+            versoes[tabela] = (versao.versao, versao.modificado_em)
+    return versoes
+
+
+async def aget_versoes(tabelas):
+    """Versão de get_versoes() para views assíncronas"""
+    versoes = {
+        versao.tabela: (versao.versao, versao.modificado_em)
+        async for versao in VersaoTabelaDjango.objects.filter(tabela__in=tabelas)
+    }
+    for tabela in tabelas:
+        if tabela not in versoes:
+            versao, _ = await VersaoTabelaDjango.objects.aget_or_create(
+                tabela=tabela, defaults={'modificado_em': timezone.now()}
+            )
+            versoes[tabela] = (versao.versao, versao.modificado_em)
+    return versoes
+
+
+def calcular_etag(request, versoes):
+    """ETag forte: mesma URL, mesmo Accept e mesmas versões produzem o mesmo corpo"""
+    partes = [request.get_full_path(), request.META.get('HTTP_ACCEPT', '')]
+    partes += [f'{tabela}:{versao}:{modificado_em.isoformat()}' for tabela, (versao, modificado_em) in sorted(versoes.items())]
+    return '"%s"' % hashlib.sha1('|'.join(partes).encode()).hexdigest()
+
+
+def adicionar_validadores(response, etag, ultima_modificacao):
+    response['ETag'] = etag
+    if ultima_modificacao is not None:
+        response['Last-Modified'] = http_date(ultima_modificacao)
+    # O cliente pode guardar a resposta, mas deve revalidar a cada uso
+    response['Cache-Control'] = 'no-cache'
+    patch_vary_headers(response, ['Accept'])
+    return response
+
+
+def validadores(request, versoes):
+    """Retorna (etag, ultima_modificacao, resposta 304/412 ou None)"""
+    etag = calcular_etag(request, versoes)
+    ultima_modificacao = None
+    if versoes:
+        ultima_modificacao = int(max(modificado_em for _, modificado_em in versoes.values()).timestamp())
+    condicional = get_conditional_response(request, etag=etag, last_modified=ultima_modificacao)
+    return etag, ultima_modificacao, condicional
+
+
+def chave_cache(etag):
+    return 'api:resposta:' + etag.strip('"')
+
+
+def resposta_guardada(guardada, etag, ultima_modificacao):
+    response = HttpResponse(guardada['content'], content_type=guardada['content_type'])
+    return adicionar_validadores(response, etag, ultima_modificacao)
+
+
+def conteudo_para_cache(response):
+    if hasattr(response, 'render'):
+        response.render()
+    return {'content': response.content, 'content_type': response['Content-Type']}
+
+
+def cache_resposta(*tabelas, timeout=DEFAULT_TIMEOUT):
+    """
+    Decorator para views GET que dependem das `tabelas` informadas. Responde
+    304 quando If-None-Match/If-Modified-Since ainda valem e reaproveita o
+    corpo já renderizado quando outra requisição pediu a mesma versão
+    (respostas em streaming recebem os validadores, mas o corpo não é
+    guardado). Outros métodos passam direto para a view. Aceita views síncronas e
+    assíncronas.
+    """
+    def decorator(view):
+        if iscoroutinefunction(view):
+            return cache_resposta_async(view, tabelas, timeout)
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view(request, *args, **kwargs)
+
+            versoes = get_versoes(tabelas) if tabelas else {}
+            etag, ultima_modificacao, condicional = validadores(request, versoes)
+            if condicional is not None:
+                return adicionar_validadores(condicional, etag, ultima_modificacao)
+
+            cache = get_cache()
+            guardada = cache.get(chave_cache(etag))
+            if guardada is not None:
+                return resposta_guardada(guardada, etag, ultima_modificacao)
+
+            response = view(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+            if not response.streaming:
+                cache.set(chave_cache(etag), conteudo_para_cache(response), timeout)
+            return adicionar_validadores(response, etag, ultima_modificacao)
+        return wrapper
+    return decorator
+
+
+def cache_resposta_async(view, tabelas, timeout):
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return await view(request, *args, **kwargs)
+
+        versoes = await aget_versoes(tabelas) if tabelas else {}
+        etag, ultima_modificacao, condicional = validadores(request, versoes)
+        if condicional is not None:
+            return adicionar_validadores(condicional, etag, ultima_modificacao)
+
+        cache = get_cache()
+        guardada = await cache.aget(chave_cache(etag))
+        if guardada is not None:
+            return resposta_guardada(guardada, etag, ultima_modificacao)
+
+        response = await view(request, *args, **kwargs)
+        if response.status_code != 200:
+            return response
+        if not response.streaming:
+            await cache.aset(chave_cache(etag), conteudo_para_cache(response), timeout)
+        return adicionar_validadores(response, etag, ultima_modificacao)
+    return wrapper
@@ -0,0 +1,240 @@
+"""
+Compressão das respostas (gzip e, com o pacote opcional brotli, br).
+
+CompressaoMiddleware comprime as respostas cujo tipo está em TIPOS e cujo
+corpo tem pelo menos TAMANHO_MINIMO bytes, na codificação aceita pelo
+cliente (Accept-Encoding), preferindo br a gzip. Respostas em streaming
+(exportação) são comprimidas pedaço a pedaço; o feed de eventos
+(text/event-stream) nunca é comprimido, porque o compressor seguraria os
+eventos até juntar um bloco.
+
+O ETag forte de api.cache identifica os bytes sem compressão. A versão
+comprimida recebe o mesmo ETag com o sufixo da codificação ("...-gzip"),
+continuando forte; nas requisições condicionais o sufixo é removido antes
+de chegar à view, então If-None-Match com o ETag comprimido também resulta
+em 304. Como o ETag identifica o corpo, o corpo comprimido fica no cache
+de respostas e não é recomprimido enquanto os dados não mudarem.
+"""
+import re
+import zlib
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+
+from .cache import get_cache
+from .serializacao import MEDIA_TYPE_COLUNAS
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+CONFIG_PADRAO = {
+    # Corpos menores que isso saem sem compressão (o ganho não paga o custo)
+    'TAMANHO_MINIMO': 1024,
+    'TIPOS': (
+        'application/json', MEDIA_TYPE_COLUNAS, 'application/x-ndjson', 'text/csv', 'text/plain', 'text/html',
+    ),
+    'NIVEL_GZIP': 6,
+    'QUALIDADE_BROTLI': 5,
+}
+
+# Nunca comprimidos, mesmo se listados em TIPOS
+TIPOS_EXCLUIDOS = {'text/event-stream'}
+
+SUFIXO_ETAG = re.compile(r'-(gzip|br)"')
+
+
+def get_config(nome):
+    return getattr(settings, 'API_COMPRESSAO', {}).get(nome, CONFIG_PADRAO[nome])
+
+
+def codificacoes_suportadas():
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def codificacoes_aceitas(cabecalho):
+    """{codificação: q} do Accept-Encoding"""
+    aceitas = {}
+    for parte in cabecalho.split(','):
+        nome, *parametros = (item.strip() for item in parte.split(';'))
+        if not nome:
+            continue
+        q = 1.0
+        for parametro in parametros:
+            chave, _, valor = parametro.partition('=')
+            if chave.strip() == 'q':
+                try:
+                    q = float(valor)
+                except ValueError:
+                    q = 0.0
+        aceitas[nome.lower()] = q
+    return aceitas
+
+
+def negociar(request, response):
+    """
+    Codificação a usar na resposta, ou None. Respostas comprimíveis recebem
+    Vary: Accept-Encoding mesmo quando o cliente não aceita compressão.
+    """
+    if response.has_header('Content-Encoding') or not response.has_header('Content-Type'):
+        return None
+    tipo = response['Content-Type'].split(';')[0].strip().lower()
+    if tipo in TIPOS_EXCLUIDOS or tipo not in get_config('TIPOS'):
+        return None
+    if not response.streaming and len(response.content) < get_config('TAMANHO_MINIMO'):
+        return None
+
+    patch_vary_headers(response, ['Accept-Encoding'])
+    aceitas = codificacoes_aceitas(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+    for codificacao in codificacoes_suportadas():
+        if aceitas.get(codificacao, aceitas.get('*', 0)) > 0:
+            return codificacao
+    return None
+
+
+def novo_compressor(codificacao):
+    """(comprimir, finalizar) de um fluxo na `codificacao`"""
+    if codificacao == 'br':
+        compressor = brotli.Compressor(quality=get_config('QUALIDADE_BROTLI'))
+        return compressor.process, compressor.finish
+    # wbits=31: formato gzip; o cabeçalho sem data deixa a saída determinística
+    compressor = zlib.compressobj(get_config('NIVEL_GZIP'), zlib.DEFLATED, 31)
+    return compressor.compress, compressor.flush
+
+
+def comprimir(conteudo, codificacao):
+    processar, finalizar = novo_compressor(codificacao)
+    return processar(conteudo) + finalizar()
+
+
+def comprimir_pedacos(pedacos, codificacao):
+    processar, finalizar = novo_compressor(codificacao)
+    for pedaco in pedacos:
+        saida = processar(pedaco)
+        if saida:
+            yield saida
+    yield finalizar()
+
+
+async def acomprimir_pedacos(pedacos, codificacao):
+    processar, finalizar = novo_compressor(codificacao)
+    async for pedaco in pedacos:
+        saida = processar(pedaco)
+        if saida:
+            yield saida
+    yield finalizar()
+
+
+def etag_com_sufixo(etag, sufixo):
+    return etag[:-1] + f'-{sufixo}"' if etag.endswith('"') else etag
+
+
+def remover_sufixos(request):
+    """
+    Tira o sufixo de codificação dos ETags de If-None-Match/If-Match, para
+    que api.cache compare com o ETag do corpo sem compressão. Retorna o
+    último sufixo removido (usado no ETag de uma resposta 304).
+    """
+    sufixo = None
+    for cabecalho in ('HTTP_IF_NONE_MATCH', 'HTTP_IF_MATCH'):
+        valor = request.META.get(cabecalho)
+        if valor:
+            for encontrado in SUFIXO_ETAG.finditer(valor):
+                sufixo = encontrado.group(1)
+            request.META[cabecalho] = SUFIXO_ETAG.sub('"', valor)
+    return sufixo
+
+
+def chave_compressao(response, codificacao):
+    """Chave do corpo comprimido no cache, só para respostas 200 com ETag forte"""
+    etag = response.get('ETag', '')
+    if response.status_code != 200 or not etag.startswith('"'):
+        return None
+    return f'api:compressao:{codificacao}:' + etag.strip('"')
+
+
+def aplicar(response, conteudo, codificacao):
+    """Troca o corpo pelo comprimido, se ficou menor"""
+    if len(conteudo) >= len(response.content):
+        return response
+    response.content = conteudo
+    response['Content-Length'] = str(len(conteudo))
+    response['Content-Encoding'] = codificacao
+    if response.has_header('ETag'):
+        response['ETag'] = etag_com_sufixo(response['ETag'], codificacao)
+    return response
+
+
+def aplicar_streaming(response, codificacao):
+    if response.is_async:
+        response.streaming_content = acomprimir_pedacos(response.streaming_content, codificacao)
+    else:
+        response.streaming_content = comprimir_pedacos(response.streaming_content, codificacao)
+    if response.has_header('Content-Length'):
+        del response['Content-Length']
+    response['Content-Encoding'] = codificacao
+    if response.has_header('ETag'):
+        response['ETag'] = etag_com_sufixo(response['ETag'], codificacao)
+    return response
+
+
+def resposta_304(response, sufixo):
+    """O 304 repete o ETag que o cliente guardou, com o sufixo da codificação"""
+    if response.status_code == 304 and sufixo and response.has_header('ETag'):
+        response['ETag'] = etag_com_sufixo(response['ETag'], sufixo)
+    return response
+
+
+class CompressaoMiddleware:
+    """
+    Comprime as respostas (ver o docstring do módulo). Fica logo depois de
+    MetricasMiddleware em settings.MIDDLEWARE, para que o tamanho medido seja
+    o enviado e os demais middlewares vejam o corpo sem compressão.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.assincrono = iscoroutinefunction(get_response)
+        if self.assincrono:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.assincrono:
+            return self.__acall__(request)
+        sufixo = remover_sufixos(request)
+        response = self.get_response(request)
+        codificacao = negociar(request, response)
+        if codificacao is None:
+            return resposta_304(response, sufixo)
+        if response.streaming:
+            return aplicar_streaming(response, codificacao)
+
+        chave = chave_compressao(response, codificacao)
+        conteudo = get_cache().get(chave) if chave else None
+        if conteudo is None:
+            conteudo = comprimir(response.content, codificacao)
+            if chave:
+                get_cache().set(chave, conteudo)
+        return aplicar(response, conteudo, codificacao)
+
+    async def __acall__(self, request):
+        sufixo = remover_sufixos(request)
+        response = await self.get_response(request)
+        codificacao = negociar(request, response)
+        if codificacao is None:
+            return resposta_304(response, sufixo)
+        if response.streaming:
+            return aplicar_streaming(response, codificacao)
+
+        chave = chave_compressao(response, codificacao)
+        conteudo = await get_cache().aget(chave) if chave else None
+        if conteudo is None:
+            conteudo = comprimir(response.content, codificacao)
+            if chave:
+                await get_cache().aset(chave, conteudo)
+        return aplicar(response, conteudo, codificacao)
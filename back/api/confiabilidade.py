@@ -0,0 +1,566 @@
+"""
+Métricas de confiabilidade por unidade e por grupo_unidade: MTTR, MTBF,
+idade das falhas abertas (percentis) e falhas mais recorrentes.
+
+Nenhuma consulta lê as falhas uma a uma. Tabelas de contadores são
+mantidas na mesma transação que grava as falhas, como o resumo diário
+(api.rollup):
+
+- ConfiabilidadeUnidadeDjango: por unidade, total de falhas, abertas,
+  primeira e última data de falha, reparos e tempo total de reparo;
+- OcorrenciaFalhaDjango: total por (unidade, falha_ocorrida);
+- AbertasGrupoDjango e OcorrenciaGrupoDjango: abertas por (grupo, dia) e
+  total por (grupo, falha_ocorrida), para que as métricas por grupo não
+  percorram as linhas de todas as unidades.
+
+Os percentis da idade das abertas saem de uma função de janela sobre as
+abertas por dia (o resumo diário, para as unidades), que devolve só os
+dias onde caem os percentis; as recorrentes, de outra janela (ROW_NUMBER).
+As views chamam registrar_* com as contribuições (`contribuicao()`) de
+antes e depois da gravação, e mover_unidades() quando uma unidade muda de
+grupo ou é excluída; `reconstruir()` refaz tudo a partir de FalhaDjango
+(ver rebuild_falhas_rollup).
+
+Definições:
+
+- MTTR: média de resolvida_em - início do dia da falha (data_falha às
+  00:00 UTC, ver inicio_do_dia()), nas falhas resolvidas com resolvida_em;
+- MTBF: (última data de falha - primeira) / (falhas - 1), em dias; no
+  grupo, a soma dos intervalos das unidades dividida pela soma de
+  (falhas - 1) das unidades com duas falhas ou mais;
+- idade das abertas: hoje - data_falha, em dias, percentis pelo método
+  do posto mais próximo.
+"""
+from collections import Counter, namedtuple
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+
+from django.db import IntegrityError, connection, transaction
+from django.db.models import (
+    Count, DateField, DateTimeField, DurationField, ExpressionWrapper, F, Max, Min, OuterRef, Q, Subquery, Sum, Window,
+)
+from django.db.models.functions import Cast, RowNumber
+from django.utils import timezone
+
+from .cache import incrementar_versao
+from .models import (
+    UnidadeDjango, FalhaDjango, ResumoDiarioFalhasDjango, ConfiabilidadeUnidadeDjango, OcorrenciaFalhaDjango,
+    AbertasGrupoDjango, OcorrenciaGrupoDjango,
+)
+from .pagination import KeysetPagination
+
+# Falhas mais recorrentes listadas por unidade ou grupo
+RECORRENTES = 3
+
+# Percentis da idade das abertas, como frações inteiras (calculadas também no SQL)
+PERCENTIS = (('p50', (1, 2)), ('p90', (9, 10)), ('max', (1, 1)))
+
+CAMPOS_UNIDADE = ['falhas', 'abertas', 'primeira_falha', 'ultima_falha', 'reparos', 'tempo_reparo']
+
+# Acima deste número de linhas afetadas, registrar_lote troca os UPDATEs
+# individuais por uma leitura + bulk_update/bulk_create (como api.rollup)
+LIMITE_DELTAS_INDIVIDUAIS = 20
+
+Contribuicao = namedtuple('Contribuicao', 'unidade_id falha_ocorrida data ativa reparo')
+
+
+# O início do dia da falha precisa ser o mesmo nas contas incrementais
+# (Python) e na reconstrução (SQL). Cast de uma data para DateTimeField dá
+# a meia-noite UTC (o Django abre as conexões em UTC com USE_TZ), por isso
+# o lado Python também usa UTC, e não o TIME_ZONE do servidor.
+def inicio_do_dia(data):
+    return datetime.combine(data, time.min, tzinfo=dt_timezone.utc)
+
+
+def inicio_do_dia_sql(campo='data_falha'):
+    """Expressão de inicio_do_dia() calculada no banco"""
+    return Cast(campo, DateTimeField())
+
+
+def tempo_reparo(data, ativa, resolvida_em):
+    """Duração do reparo, ou None se a falha está aberta ou não tem resolvida_em"""
+    if ativa or resolvida_em is None:
+        return None
+    return max(resolvida_em - inicio_do_dia(data), timedelta(0))
+
+
+def contribuicao(falha):
+    """O que a falha soma nas tabelas de confiabilidade (tirar antes de alterar, e de novo depois)"""
+    return Contribuicao(
+        falha.unidade_id, falha.falha_ocorrida, falha.data_falha, falha.ativa,
+        tempo_reparo(falha.data_falha, falha.ativa, falha.resolvida_em),
+    )
+
+
+class Delta:
+    """Mudanças acumuladas de uma unidade em uma operação"""
+    __slots__ = ('falhas', 'abertas', 'reparos', 'tempo_reparo', 'datas')
+
+    def __init__(self):
+        self.falhas = self.abertas = self.reparos = 0
+        self.tempo_reparo = timedelta(0)
+        self.datas = Counter()
+
+    def somar(self, contribuicao, sinal):
+        self.falhas += sinal
+        self.abertas += sinal if contribuicao.ativa else 0
+        if contribuicao.reparo is not None:
+            self.reparos += sinal
+            self.tempo_reparo += sinal * contribuicao.reparo
+        self.datas[contribuicao.data] += sinal
+
+    def __bool__(self):
+        return bool(self.falhas or self.abertas or self.reparos or self.tempo_reparo or self.datas_mudaram())
+
+    def datas_mudaram(self):
+        return any(self.datas.values())
+
+    def aplicar(self, linha):
+        """
+        Aplica o delta em uma ConfiabilidadeUnidadeDjango lida do banco;
+        False se a linha precisa ser recalculada (contagem negativa, ou
+        removida a falha da primeira/última data)
+        """
+        falhas, abertas, reparos = linha.falhas + self.falhas, linha.abertas + self.abertas, linha.reparos + self.reparos
+        tempo = linha.tempo_reparo + self.tempo_reparo
+        if min(falhas, abertas, reparos) < 0 or tempo < timedelta(0):
+            return False
+        removidas = [data for data, n in self.datas.items() if n < 0]
+        if any(data in (linha.primeira_falha, linha.ultima_falha) for data in removidas):
+            return False
+        for data in (data for data, n in self.datas.items() if n > 0):
+            if linha.primeira_falha is None or data < linha.primeira_falha:
+                linha.primeira_falha = data
+            if linha.ultima_falha is None or data > linha.ultima_falha:
+                linha.ultima_falha = data
+        linha.falhas, linha.abertas, linha.reparos, linha.tempo_reparo = falhas, abertas, reparos, tempo
+        return True
+
+
+def agregados(falhas):
+    """Contadores de ConfiabilidadeUnidadeDjango por unidade_id, calculados no banco"""
+    inicio = inicio_do_dia_sql()
+    resolvida = Q(ativa=False, resolvida_em__isnull=False)
+    return falhas.order_by().values('unidade_id').annotate(
+        falhas=Count('id'),
+        abertas=Count('id', filter=Q(ativa=True)),
+        primeira_falha=Min('data_falha'),
+        ultima_falha=Max('data_falha'),
+        reparos=Count('id', filter=resolvida),
+        # Reparos "antes" do início do dia contam como zero, como em tempo_reparo()
+        tempo_reparo=Sum(
+            ExpressionWrapper(F('resolvida_em') - inicio, output_field=DurationField()),
+            filter=resolvida & Q(resolvida_em__gt=inicio),
+        ),
+    )
+
+
+def linha_unidade(agregado):
+    return ConfiabilidadeUnidadeDjango(
+        unidade_id=agregado['unidade_id'], tempo_reparo=agregado['tempo_reparo'] or timedelta(0),
+        **{campo: agregado[campo] for campo in CAMPOS_UNIDADE if campo != 'tempo_reparo'},
+    )
+
+
+def recalcular_unidades(unidades):
+    """Refaz a linha de cada unidade a partir das falhas dela (linha ausente ou defasada)"""
+    linhas = [linha_unidade(agregado) for agregado in agregados(FalhaDjango.objects.filter(unidade_id__in=unidades))]
+    ConfiabilidadeUnidadeDjango.objects.bulk_create(
+        linhas, update_conflicts=True, unique_fields=['unidade'], update_fields=CAMPOS_UNIDADE, batch_size=500,
+    )
+    sem_falhas = set(unidades) - {linha.unidade_id for linha in linhas}
+    if sem_falhas:
+        ConfiabilidadeUnidadeDjango.objects.filter(unidade_id__in=sem_falhas).delete()
+
+
+def aplicar_delta_unidade(unidade_id, delta):
+    """UPDATE com F() dos contadores; primeira/última data relidas pelo índice da unidade"""
+    linhas = ConfiabilidadeUnidadeDjango.objects.filter(unidade_id=unidade_id)
+    for campo in ('falhas', 'abertas', 'reparos'):
+        if getattr(delta, campo) < 0:
+            linhas = linhas.filter(**{f'{campo}__gte': -getattr(delta, campo)})
+    campos = {
+        'falhas': F('falhas') + delta.falhas,
+        'abertas': F('abertas') + delta.abertas,
+        'reparos': F('reparos') + delta.reparos,
+        'tempo_reparo': F('tempo_reparo') + delta.tempo_reparo,
+    }
+    if delta.datas_mudaram():
+        datas = FalhaDjango.objects.filter(unidade_id=OuterRef('unidade_id')).values('data_falha')
+        campos['primeira_falha'] = Subquery(datas.order_by('data_falha')[:1])
+        campos['ultima_falha'] = Subquery(datas.order_by('-data_falha')[:1])
+    if not linhas.update(**campos):
+        # Sem linha (primeira falha da unidade) ou contagem que ficaria negativa (defasada)
+        recalcular_unidades([unidade_id])
+
+
+def aplicar_contagem(modelo, chave, delta):
+    """Soma `delta` ao total da linha `chave` ({campo: valor}), removendo a linha que chega a zero"""
+    linhas = modelo.objects.filter(**chave)
+    if delta < 0:
+        linhas = linhas.filter(total__gte=-delta)
+    if linhas.update(total=F('total') + delta):
+        if delta < 0:
+            modelo.objects.filter(**chave, total=0).delete()
+        return
+
+    if delta < 0:
+        # Nada a decrementar: a tabela já estava defasada (ver rebuild_falhas_rollup)
+        return
+    try:
+        with transaction.atomic():
+            modelo.objects.create(**chave, total=delta)
+    except IntegrityError:
+        # Outra requisição criou a linha entre o UPDATE e o INSERT
+        linhas.update(total=F('total') + delta)
+
+
+def aplicar_contagens(modelo, campos, deltas):
+    """
+    Soma `deltas` ({tupla com os valores de `campos`: delta}) à coluna
+    total de `modelo`: UPDATEs individuais para poucas linhas, ou uma
+    leitura + bulk_update/bulk_create
+    """
+    deltas = {chave: delta for chave, delta in deltas.items() if delta}
+    if len(deltas) <= LIMITE_DELTAS_INDIVIDUAIS:
+        for chave, delta in deltas.items():
+            aplicar_contagem(modelo, dict(zip(campos, chave)), delta)
+        return
+
+    with transaction.atomic():
+        filtro = {f'{campo}__in': {chave[i] for chave in deltas} for i, campo in enumerate(campos)}
+        existentes = {
+            tuple(getattr(linha, campo) for campo in campos): linha
+            for linha in modelo.objects.select_for_update().filter(**filtro)
+        }
+        atualizar, criar, vazias = [], [], []
+        for chave, delta in deltas.items():
+            linha = existentes.get(chave)
+            if linha is None:
+                # Decrementos sem linha só ocorrem com a tabela defasada (ver rebuild_falhas_rollup)
+                if delta > 0:
+                    criar.append(modelo(**dict(zip(campos, chave)), total=delta))
+                continue
+            linha.total = max(linha.total + delta, 0)
+            if linha.total:
+                atualizar.append(linha)
+            else:
+                vazias.append(linha.pk)
+
+        modelo.objects.bulk_update(atualizar, ['total'], batch_size=500)
+        modelo.objects.bulk_create(criar, batch_size=500)
+        if vazias:
+            modelo.objects.filter(pk__in=vazias).delete()
+
+
+def registrar_criacao(falha):
+    registrar_lote(adicionadas=[contribuicao(falha)])
+
+
+def registrar_exclusao(falha):
+    """Chamada depois do DELETE, para que primeira/última data sejam relidas sem a falha"""
+    registrar_lote(removidas=[contribuicao(falha)])
+
+
+def registrar_alteracao(anterior, falha):
+    registrar_lote([anterior], [contribuicao(falha)])
+
+
+def registrar_lote(removidas=(), adicionadas=()):
+    """
+    Aplica de uma vez as mudanças de uma gravação (depois dela): `removidas`
+    e `adicionadas` são Contribuicao. O custo depende do número de unidades,
+    dias e textos de falha distintos, não do número de falhas.
+    """
+    por_unidade = {}
+    ocorrencias, abertas = Counter(), Counter()
+    for sinal, contribuicoes in ((-1, removidas), (1, adicionadas)):
+        for item in contribuicoes:
+            por_unidade.setdefault(item.unidade_id, Delta()).somar(item, sinal)
+            ocorrencias[(item.unidade_id, item.falha_ocorrida)] += sinal
+            if item.ativa:
+                abertas[(item.unidade_id, item.data)] += sinal
+    por_unidade = {unidade_id: delta for unidade_id, delta in por_unidade.items() if delta}
+    ocorrencias = {chave: delta for chave, delta in ocorrencias.items() if delta}
+    abertas = {chave: delta for chave, delta in abertas.items() if delta}
+
+    if len(por_unidade) <= LIMITE_DELTAS_INDIVIDUAIS:
+        for unidade_id, delta in por_unidade.items():
+            aplicar_delta_unidade(unidade_id, delta)
+    else:
+        with transaction.atomic():
+            aplicar_deltas_unidades_em_massa(por_unidade)
+    aplicar_contagens(OcorrenciaFalhaDjango, ('unidade_id', 'falha_ocorrida'), ocorrencias)
+
+    if ocorrencias or abertas:
+        unidades = {unidade_id for unidade_id, _ in ocorrencias} | {unidade_id for unidade_id, _ in abertas}
+        grupos = dict(UnidadeDjango.objects.filter(pk__in=unidades).values_list('pk', 'grupo_unidade'))
+        aplicar_contagens(OcorrenciaGrupoDjango, ('grupo_unidade', 'falha_ocorrida'), somar_por_grupo(ocorrencias, grupos))
+        aplicar_contagens(AbertasGrupoDjango, ('grupo_unidade', 'data'), somar_por_grupo(abertas, grupos))
+
+
+def somar_por_grupo(deltas, grupos):
+    """{(unidade_id, valor): delta} -> {(grupo_unidade, valor): delta}"""
+    por_grupo = Counter()
+    for (unidade_id, valor), delta in deltas.items():
+        if unidade_id in grupos:
+            por_grupo[(grupos[unidade_id], valor)] += delta
+    return por_grupo
+
+
+def aplicar_deltas_unidades_em_massa(por_unidade):
+    """Lê as linhas afetadas de uma vez e grava com bulk_update; as defasadas são recalculadas"""
+    existentes = ConfiabilidadeUnidadeDjango.objects.select_for_update().in_bulk(list(por_unidade))
+    atualizar, recalcular = [], []
+    for unidade_id, delta in por_unidade.items():
+        linha = existentes.get(unidade_id)
+        if linha is not None and delta.aplicar(linha):
+            atualizar.append(linha)
+        else:
+            recalcular.append(unidade_id)
+    ConfiabilidadeUnidadeDjango.objects.bulk_update(atualizar, CAMPOS_UNIDADE, batch_size=500)
+    if recalcular:
+        recalcular_unidades(recalcular)
+
+
+def mover_unidades(mudancas):
+    """
+    Passa as contagens por grupo das unidades de um grupo_unidade para
+    outro. `mudancas` é {unidade_id: (grupo anterior, grupo novo)}; grupo
+    novo None tira a unidade dos grupos (chamada antes de excluí-la, quando
+    as falhas ainda não saíram em cascata).
+    """
+    mudancas = {unidade_id: grupos for unidade_id, grupos in mudancas.items() if grupos[0] != grupos[1]}
+    if not mudancas:
+        return
+    ocorrencias, abertas = Counter(), Counter()
+    origens = [
+        (ocorrencias, OcorrenciaFalhaDjango.objects.filter(unidade_id__in=mudancas)
+         .values_list('unidade_id', 'falha_ocorrida', 'total')),
+        # Índice (unidade, ativa, data_falha): só as falhas abertas das unidades, sem ler a tabela
+        (abertas, FalhaDjango.objects.filter(unidade_id__in=mudancas, ativa=True).order_by()
+         .values('unidade_id', 'data_falha').annotate(total=Count('id'))
+         .values_list('unidade_id', 'data_falha', 'total')),
+    ]
+    for deltas, linhas in origens:
+        for unidade_id, valor, total in linhas:
+            anterior, novo = mudancas[unidade_id]
+            deltas[(anterior, valor)] -= total
+            if novo is not None:
+                deltas[(novo, valor)] += total
+    aplicar_contagens(OcorrenciaGrupoDjango, ('grupo_unidade', 'falha_ocorrida'), ocorrencias)
+    aplicar_contagens(AbertasGrupoDjango, ('grupo_unidade', 'data'), abertas)
+
+
+@transaction.atomic
+def reconstruir(batch_size=1000):
+    """Recalcula as tabelas de confiabilidade a partir de FalhaDjango; retorna {tabela: linhas}"""
+    falhas = FalhaDjango.objects.order_by()
+    linhas = {
+        ConfiabilidadeUnidadeDjango: (linha_unidade(agregado) for agregado in agregados(falhas).iterator()),
+        OcorrenciaFalhaDjango: (
+            OcorrenciaFalhaDjango(**linha)
+            for linha in falhas.values('unidade_id', 'falha_ocorrida').annotate(total=Count('id')).iterator()
+        ),
+        OcorrenciaGrupoDjango: (
+            OcorrenciaGrupoDjango(grupo_unidade=grupo, falha_ocorrida=falha_ocorrida, total=total)
+            for grupo, falha_ocorrida, total in falhas.values('unidade__grupo_unidade', 'falha_ocorrida')
+            .annotate(total=Count('id')).values_list('unidade__grupo_unidade', 'falha_ocorrida', 'total').iterator()
+        ),
+        AbertasGrupoDjango: (
+            AbertasGrupoDjango(grupo_unidade=grupo, data=data, total=total)
+            for grupo, data, total in falhas.filter(ativa=True).values('unidade__grupo_unidade', 'data_falha')
+            .annotate(total=Count('id')).values_list('unidade__grupo_unidade', 'data_falha', 'total').iterator()
+        ),
+    }
+    totais = {}
+    for modelo, novas in linhas.items():
+        modelo.objects.all().delete()
+        totais[modelo._meta.db_table] = len(modelo.objects.bulk_create(novas, batch_size=batch_size))
+    # As métricas em cache foram calculadas sobre as tabelas anteriores
+    incrementar_versao('falhas')
+    return totais
+
+
+# Consultas
+
+def horas(duracao):
+    return round(duracao.total_seconds() / 3600, 2)
+
+
+def dias(duracao):
+    return round(duracao.total_seconds() / 86400, 2)
+
+
+def mttr_horas(reparos, tempo_reparo):
+    return horas(tempo_reparo / reparos) if reparos else None
+
+
+def mtbf_dias(intervalo, falhas):
+    """`intervalo` entre a primeira e a última falha, dividido pelos `falhas` - 1 intervalos entre falhas"""
+    return dias(intervalo / (falhas - 1)) if falhas > 1 and intervalo is not None else None
+
+
+def postos(total):
+    """Posto (1 = falha aberta mais nova) de cada percentil, pelo método do posto mais próximo"""
+    return {
+        nome: max((numerador * total + denominador - 1) // denominador, 1)
+        for nome, (numerador, denominador) in PERCENTIS
+    }
+
+
+def idades_abertas(modelo, chave, coluna, filtro=None):
+    """
+    {valor da chave: {'p50', 'p90', 'max'}} da idade em dias das falhas
+    abertas, a partir das abertas por dia em `modelo` (colunas `chave`,
+    data e `coluna`), opcionalmente só para os valores de chave em
+    `filtro`. Uma função de janela acumula as abertas da mais nova para a
+    mais antiga e só voltam os dias que contêm o posto de algum percentil.
+    """
+    if filtro is not None and not filtro:
+        return {}
+    condicoes = [f'{coluna} > 0']
+    params = []
+    if filtro is not None:
+        condicoes.append(f"{chave} IN ({', '.join(['%s'] * len(filtro))})")
+        params += list(filtro)
+    percentis = ' OR '.join(
+        f'(acumulado - abertas < ({numerador} * total + {denominador - 1}) / {denominador} '
+        f'AND acumulado >= ({numerador} * total + {denominador - 1}) / {denominador})'
+        for _, (numerador, denominador) in PERCENTIS
+    )
+    consulta = (
+        'SELECT chave, data, acumulado, abertas, total FROM ('
+        f'SELECT {chave} AS chave, data, {coluna} AS abertas, '
+        f'SUM({coluna}) OVER (PARTITION BY {chave} ORDER BY data DESC ROWS UNBOUNDED PRECEDING) AS acumulado, '
+        f'SUM({coluna}) OVER (PARTITION BY {chave}) AS total '
+        f"FROM {modelo._meta.db_table} WHERE {' AND '.join(condicoes)}"
+        f') acumulados WHERE {percentis}'
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(consulta, params)
+        linhas = cursor.fetchall()
+
+    hoje = timezone.localdate()
+    para_data = DateField().to_python
+    idades = {}
+    for valor, data, acumulado, abertas, total in linhas:
+        resultado = idades.setdefault(valor, {})
+        for nome, posto in postos(total).items():
+            if acumulado - abertas < posto <= acumulado:
+                resultado[nome] = (hoje - para_data(data)).days
+    return idades
+
+
+def recorrentes(ocorrencias, chave):
+    """
+    {valor da chave: [{'falha_ocorrida', 'total'}]} com as RECORRENTES
+    falhas de maior total de cada valor da chave (empate pelo texto)
+    """
+    linhas = (
+        ocorrencias.annotate(posicao=Window(
+            RowNumber(), partition_by=F(chave), order_by=[F('total').desc(), F('falha_ocorrida').asc()],
+        ))
+        .filter(posicao__lte=RECORRENTES)
+        .order_by(chave, 'posicao')
+        .values_list(chave, 'falha_ocorrida', 'total')
+    )
+    resultado = {}
+    for valor, falha_ocorrida, total in linhas:
+        resultado.setdefault(valor, []).append({'falha_ocorrida': falha_ocorrida, 'total': total})
+    return resultado
+
+
+class PaginacaoConfiabilidade(KeysetPagination):
+    """As métricas por unidade são sempre paginadas, pela ordem de id"""
+    ordering = ('id',)
+
+    def deve_paginar(self, request):
+        return True
+
+
+def unidades_com_contadores(params):
+    """Unidades (com o filtro opcional ?grupo=) e os contadores de ConfiabilidadeUnidadeDjango (LEFT JOIN)"""
+    unidades = UnidadeDjango.objects.all()
+    if params.get('grupo'):
+        unidades = unidades.filter(grupo_unidade=params['grupo'])
+    return unidades.values_list(
+        'id', 'nome_unidade', 'grupo_unidade', 'id_unidade',
+        *(f'confiabilidade__{campo}' for campo in CAMPOS_UNIDADE),
+        named=True,
+    )
+
+
+def metricas_unidades(pagina):
+    """Métricas de uma página de unidades_com_contadores(): mais duas consultas, limitadas às unidades da página"""
+    ids = [linha.id for linha in pagina]
+    idades = idades_abertas(ResumoDiarioFalhasDjango, 'unidade_id', 'ativas', ids)
+    recorrentes_por_unidade = recorrentes(OcorrenciaFalhaDjango.objects.filter(unidade_id__in=ids), 'unidade_id')
+
+    resultado = []
+    for linha in pagina:
+        primeira, ultima = linha.confiabilidade__primeira_falha, linha.confiabilidade__ultima_falha
+        resultado.append({
+            'id': linha.id,
+            'nome_unidade': linha.nome_unidade,
+            'grupo_unidade': linha.grupo_unidade,
+            'id_unidade': linha.id_unidade,
+            'falhas': linha.confiabilidade__falhas or 0,
+            'abertas': linha.confiabilidade__abertas or 0,
+            'mttr_horas': mttr_horas(linha.confiabilidade__reparos, linha.confiabilidade__tempo_reparo),
+            'mtbf_dias': mtbf_dias(
+                ultima - primeira if primeira else None, linha.confiabilidade__falhas or 0,
+            ),
+            'idade_abertas_dias': idades.get(linha.id),
+            'recorrentes': recorrentes_por_unidade.get(linha.id, []),
+        })
+    return resultado
+
+
+def metricas_grupos():
+    """
+    Métricas por grupo_unidade em cinco consultas: unidades por grupo,
+    soma dos contadores das unidades, intervalos entre a primeira e a
+    última falha, percentis de AbertasGrupoDjango e recorrentes de
+    OcorrenciaGrupoDjango
+    """
+    unidades = (
+        UnidadeDjango.objects.order_by('grupo_unidade').values('grupo_unidade')
+        .annotate(total=Count('id')).values_list('grupo_unidade', 'total')
+    )
+    contadores = {
+        linha['unidade__grupo_unidade']: linha
+        for linha in ConfiabilidadeUnidadeDjango.objects.order_by()
+        .values('unidade__grupo_unidade')
+        .annotate(
+            total_falhas=Sum('falhas'),
+            total_abertas=Sum('abertas'),
+            total_reparos=Sum('reparos'),
+            total_tempo_reparo=Sum('tempo_reparo'),
+        )
+    }
+    # A diferença entre datas no SQL do SQLite é uma função Python chamada por
+    # linha; somar aqui as diferenças lidas custa um quarto disso
+    intervalos = {}
+    for grupo, falhas, primeira, ultima in ConfiabilidadeUnidadeDjango.objects.filter(falhas__gte=2).values_list(
+        'unidade__grupo_unidade', 'falhas', 'primeira_falha', 'ultima_falha',
+    ):
+        intervalo, quantidade = intervalos.get(grupo, (timedelta(0), 0))
+        intervalos[grupo] = (intervalo + (ultima - primeira), quantidade + falhas - 1)
+    idades = idades_abertas(AbertasGrupoDjango, 'grupo_unidade', 'total')
+    recorrentes_por_grupo = recorrentes(OcorrenciaGrupoDjango.objects.all(), 'grupo_unidade')
+
+    resultado = []
+    for grupo, total_unidades in unidades:
+        linha = contadores.get(grupo, {})
+        intervalo, quantidade = intervalos.get(grupo, (None, 0))
+        resultado.append({
+            'grupo_unidade': grupo,
+            'unidades': total_unidades,
+            'falhas': linha.get('total_falhas') or 0,
+            'abertas': linha.get('total_abertas') or 0,
+            'mttr_horas': mttr_horas(linha.get('total_reparos'), linha.get('total_tempo_reparo')),
+            'mtbf_dias': mtbf_dias(intervalo, quantidade + 1),
+            'idade_abertas_dias': idades.get(grupo),
+            'recorrentes': recorrentes_por_grupo.get(grupo, []),
+        })
+    return resultado
@@ -0,0 +1,174 @@
+"""
+Gerador de dados sintéticos para benchmarks e testes de carga.
+
+Cria unidades, falhas, universidades, cursos e estudantes em blocos com
+bulk_create. A mesma semente gera o mesmo conteúdo: nomes, datas e
+distribuições saem de um random.Random próprio, sem depender do estado
+global. Unidades e falhas entram no histórico (api.historico) como criadas;
+as falhas resolvidas recebem resolvida_em algumas horas depois do dia da
+falha. Depois da carga o resumo diário e as tabelas de confiabilidade são
+reconstruídos e as versões de cache das tabelas alteradas são
+incrementadas, como em uma importação.
+"""
+import random
+from datetime import date, timedelta
+
+from django.db import transaction
+
+from . import confiabilidade, historico
+from .cache import incrementar_versao
+from .models import UniversityDjango, CourseDjango, StudentDjango, UnidadeDjango, FalhaDjango
+from .rollup import reconstruir_resumo_diario
+
+
+BATCH_SIZE = 1000
+DATA_INICIAL = date(2023, 1, 1)
+DIAS = 730
+
+GRUPOS = ['Norte', 'Sul', 'Leste', 'Oeste', 'Centro']
+TECNICOS = ['Ana Souza', 'Bruno Lima', 'Carla Mendes', 'Diego Rocha', 'Elisa Prado', '']
+FALHAS = [
+    'Falha no compressor', 'Queda de energia', 'Vazamento de óleo', 'Superaquecimento do motor',
+    'Erro de comunicação com o CLP', 'Sensor de pressão descalibrado', 'Desalinhamento da esteira',
+    'Curto-circuito no painel', 'Ruído excessivo no rolamento', 'Bomba hidráulica travada',
+]
+OBSERVACOES = [
+    '', 'Peça substituída', 'Aguardando fornecedor', 'Reincidente', 'Manutenção preventiva agendada',
+    'Técnico acionado no plantão',
+]
+PAISES = [
+    ('Portugal', 'Lisboa'), ('Espanha', 'Madrid'), ('França', 'Lyon'), ('Itália', 'Bolonha'),
+    ('Alemanha', 'Munique'), ('Países Baixos', 'Leiden'), ('Bélgica', 'Lovaina'), ('Áustria', 'Viena'),
+]
+CURSOS = ['Engenharia', 'Direito', 'Medicina', 'Economia', 'Arquitetura', 'Filosofia', 'Física', 'História']
+IDIOMAS = ['Inglês', 'Português', 'Espanhol', 'Francês', 'Italiano', 'Alemão']
+NOMES = ['Ana', 'Marco', 'Sophie', 'Hans', 'Elena', 'James', 'Giulia', 'Pedro', 'Lena', 'Tomás']
+SOBRENOMES = ['Silva', 'Rossi', 'Dubois', 'Mueller', 'García', 'Smith', 'Bianchi', 'Costa', 'Weber', 'Martin']
+
+
+def volumes_para(linhas):
+    """
+    Volumes proporcionais a partir do número de linhas das tabelas grandes
+    (falhas e estudantes): 1 unidade a cada 50 falhas, 1 curso a cada 100
+    estudantes e 1 universidade a cada 20 cursos.
+    """
+    cursos = max(linhas // 100, 1)
+    return {
+        'unidades': max(linhas // 50, 1),
+        'falhas': linhas,
+        'universidades': max(cursos // 20, 1),
+        'cursos': cursos,
+        'estudantes': linhas,
+    }
+
+
+def em_lotes(modelo, objetos, batch_size=BATCH_SIZE):
+    """bulk_create em blocos, cada um na sua transação; retorna os objetos com pk"""
+    criados = []
+    for inicio in range(0, len(objetos), batch_size):
+        with transaction.atomic():
+            criados += modelo.objects.bulk_create(objetos[inicio:inicio + batch_size])
+    return criados
+
+
+def falha_sintetica(aleatorio, ids_unidades):
+    falha = FalhaDjango(
+        unidade_id=aleatorio.choice(ids_unidades),
+        falha_ocorrida=aleatorio.choice(FALHAS),
+        data_falha=DATA_INICIAL + timedelta(days=aleatorio.randrange(DIAS)),
+        observacao=aleatorio.choice(OBSERVACOES),
+        # ~20% ainda ativas
+        ativa=aleatorio.random() < 0.2,
+    )
+    if not falha.ativa:
+        # Reparo de ~1 dia em média, contado do início do dia da falha
+        falha.resolvida_em = (
+            confiabilidade.inicio_do_dia(falha.data_falha) + timedelta(hours=aleatorio.expovariate(1 / 24))
+        )
+    return falha
+
+
+def gerar_dados(unidades=0, falhas=0, universidades=0, cursos=0, estudantes=0, seed=42):
+    """
+    Cria os volumes pedidos e retorna quantas linhas de cada tabela foram
+    criadas. Falhas usam as unidades criadas (ou, sem elas, as existentes);
+    cursos e estudantes fazem o mesmo com universidades e cursos.
+    """
+    aleatorio = random.Random(seed)
+    # Prefixo para id_unidade e e-mail únicos mesmo com cargas repetidas
+    lote = f'{seed}-{UnidadeDjango.objects.count() + StudentDjango.objects.count()}'
+
+    novas_unidades = em_lotes(UnidadeDjango, [
+        UnidadeDjango(
+            nome_unidade=f'Unidade {aleatorio.choice(GRUPOS)} {n}',
+            grupo_unidade=aleatorio.choice(GRUPOS),
+            tecnico_unidade=aleatorio.choice(TECNICOS),
+            id_unidade=f'SINT-{lote}-{n}',
+        )
+        for n in range(unidades)
+    ])
+    historico.registrar_lote(novas_unidades, 'created')
+    ids_unidades = [u.pk for u in novas_unidades] or list(UnidadeDjango.objects.values_list('pk', flat=True))
+    if falhas and not ids_unidades:
+        raise ValueError('Falhas sintéticas precisam de pelo menos uma unidade')
+
+    for inicio in range(0, falhas, BATCH_SIZE):
+        historico.registrar_lote(em_lotes(FalhaDjango, [
+            falha_sintetica(aleatorio, ids_unidades) for _ in range(min(BATCH_SIZE, falhas - inicio))
+        ]), 'created')
+
+    lista_universidades = []
+    for n in range(universidades):
+        pais, cidade = aleatorio.choice(PAISES)
+        lista_universidades.append(UniversityDjango(
+            name=f'Universidade Sintética {n}', country=pais, city=cidade,
+            established_year=aleatorio.randint(1100, 2000),
+        ))
+    novas_universidades = em_lotes(UniversityDjango, lista_universidades)
+    ids_universidades = (
+        [u.pk for u in novas_universidades] or list(UniversityDjango.objects.values_list('pk', flat=True))
+    )
+    if cursos and not ids_universidades:
+        raise ValueError('Cursos sintéticos precisam de pelo menos uma universidade')
+
+    novos_cursos = em_lotes(CourseDjango, [
+        CourseDjango(
+            name=f'{aleatorio.choice(CURSOS)} {n}',
+            code=f'SINT-{n}',
+            duration_months=aleatorio.choice([12, 18, 24, 36, 48]),
+            language=aleatorio.choice(IDIOMAS),
+            tuition_fee=aleatorio.randrange(0, 50000, 500),
+            university_id=aleatorio.choice(ids_universidades),
+        )
+        for n in range(cursos)
+    ])
+    ids_cursos = [c.pk for c in novos_cursos] or list(CourseDjango.objects.values_list('pk', flat=True))
+    if estudantes and not ids_cursos:
+        raise ValueError('Estudantes sintéticos precisam de pelo menos um curso')
+
+    for inicio in range(0, estudantes, BATCH_SIZE):
+        em_lotes(StudentDjango, [
+            StudentDjango(
+                first_name=aleatorio.choice(NOMES),
+                last_name=aleatorio.choice(SOBRENOMES),
+                email=f'sint-{lote}-{n}@email.com',
+                birth_date=date(1990, 1, 1) + timedelta(days=aleatorio.randrange(4000)),
+                course_id=aleatorio.choice(ids_cursos),
+            )
+            for n in range(inicio, min(inicio + BATCH_SIZE, estudantes))
+        ])
+
+    if unidades or falhas:
+        reconstruir_resumo_diario()
+        confiabilidade.reconstruir()
+        incrementar_versao('unidades', 'falhas')
+    if universidades or cursos or estudantes:
+        incrementar_versao('universidades', 'cursos', 'estudantes')
+
+    return {
+        'unidades': unidades,
+        'falhas': falhas,
+        'universidades': universidades,
+        'cursos': cursos,
+        'estudantes': estudantes,
+    }
@@ -0,0 +1,262 @@
+"""
+Feed de eventos em tempo real (Server-Sent Events) com as criações,
+alterações e exclusões de falhas e unidades.
+
+As gravações publicam eventos depois do commit (ver api.signals e
+api.bulk). O broker padrão, BrokerLocal, entrega os eventos aos clientes
+conectados no mesmo processo. Com vários processos, um broker externo
+(Redis pub/sub, PostgreSQL LISTEN/NOTIFY, ...) pode ser configurado em
+settings.API_EVENTOS['BROKER']: ele recebe os eventos em publicar() e,
+em cada processo, os repassa para get_feed().distribuir().
+
+Cada cliente tem uma fila própria e limitada. Os últimos eventos ficam
+guardados para que um cliente que reconecte com Last-Event-ID receba o
+que perdeu. Os ids são numerados por feed e prefixados pela época do feed
+(um token sorteado quando ele é criado): um Last-Event-ID de outro processo
+ou de antes de um reinício não corresponde aos eventos guardados e é
+ignorado.
+
+As falhas excluídas em cascata com uma unidade saem num evento só, com
+dados {"ids": [...], "unidades": [...]}.
+"""
+import abc
+import asyncio
+import json
+import queue
+import secrets
+import threading
+from collections import deque
+from functools import lru_cache
+from itertools import count
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+from .filters import FiltroInvalido, parse_int
+
+
+# Tipos de registro; as ações são created, updated, deleted e imported
+TIPOS = ('falha', 'unidade')
+
+CONFIG_PADRAO = {
+    'BROKER': 'api.eventos.BrokerLocal',
+    # Quantos eventos recentes ficam disponíveis para reconexão
+    'HISTORICO': 1000,
+    # Eventos pendentes por cliente antes de derrubar a conexão
+    'MAX_FILA': 1000,
+    # Intervalo, em segundos, dos comentários que mantêm a conexão aberta
+    'KEEPALIVE': 15,
+}
+
+
+def get_config(nome):
+    return getattr(settings, 'API_EVENTOS', {}).get(nome, CONFIG_PADRAO[nome])
+
+
+class Assinante(abc.ABC):
+    """Fila de eventos de um cliente conectado"""
+
+    def __init__(self, tipos=None):
+        self.tipos = set(tipos or TIPOS)
+        self.transbordou = False
+        # Cliente que não pode mais receber eventos; o Feed cancela a assinatura
+        self.encerrado = False
+
+    def aceita(self, evento):
+        return evento['tipo'] in self.tipos
+
+    @abc.abstractmethod
+    def entregar(self, evento):
+        """Coloca o evento na fila do cliente sem bloquear (chamado com o lock do Feed)"""
+
+
+class AssinanteSync(Assinante):
+    """Assinante para servidores WSGI: a thread da requisição espera na fila"""
+
+    def __init__(self, tipos=None):
+        super().__init__(tipos)
+        self.fila = queue.Queue(maxsize=get_config('MAX_FILA'))
+
+    def entregar(self, evento):
+        try:
+            self.fila.put_nowait(evento)
+        except queue.Full:
+            self.transbordou = True
+
+    def proximo(self, timeout):
+        try:
+            return self.fila.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class AssinanteAsync(Assinante):
+    """Assinante para servidores ASGI: a entrega é agendada no event loop do cliente"""
+
+    def __init__(self, tipos=None):
+        super().__init__(tipos)
+        self.loop = asyncio.get_running_loop()
+        self.fila = asyncio.Queue(maxsize=get_config('MAX_FILA'))
+
+    def entregar(self, evento):
+        try:
+            self.loop.call_soon_threadsafe(self._colocar, evento)
+        except RuntimeError:
+            # Event loop já fechado sem cancelar a assinatura (worker encerrado).
+            # A entrega roda no on_commit de uma gravação: o erro não pode subir.
+            self.encerrado = True
+
+    def _colocar(self, evento):
+        try:
+            self.fila.put_nowait(evento)
+        except asyncio.QueueFull:
+            self.transbordou = True
+
+    async def proximo(self, timeout):
+        try:
+            return await asyncio.wait_for(self.fila.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class Feed:
+    """Distribui os eventos aos assinantes do processo e guarda os mais recentes"""
+
+    def __init__(self, historico=None):
+        self._lock = threading.Lock()
+        self._assinantes = set()
+        # (número, evento) dos eventos mais recentes
+        self._recentes = deque(maxlen=historico or get_config('HISTORICO'))
+        self._ids = count(1)
+        self.epoca = secrets.token_hex(4)
+
+    def assinar(self, assinante, ultimo_id=None):
+        """
+        Registra o assinante e entrega os eventos guardados após `ultimo_id`
+        ((época, número), ver parse_ultimo_id()), se ele for deste feed
+        """
+        with self._lock:
+            self._assinantes.add(assinante)
+            if ultimo_id is not None and ultimo_id[0] == self.epoca:
+                for numero, evento in self._recentes:
+                    if numero > ultimo_id[1] and assinante.aceita(evento):
+                        assinante.entregar(evento)
+            self._remover_encerrados()
+        return assinante
+
+    def cancelar(self, assinante):
+        with self._lock:
+            self._assinantes.discard(assinante)
+
+    def distribuir(self, evento):
+        with self._lock:
+            numero = next(self._ids)
+            evento = {**evento, 'id': f'{self.epoca}-{numero}'}
+            self._recentes.append((numero, evento))
+            for assinante in self._assinantes:
+                if assinante.aceita(evento):
+                    assinante.entregar(evento)
+            self._remover_encerrados()
+        return evento
+
+    def _remover_encerrados(self):
+        # Chamado com o lock adquirido (entregar() não pode chamar cancelar())
+        encerrados = [assinante for assinante in self._assinantes if assinante.encerrado]
+        self._assinantes.difference_update(encerrados)
+
+    @property
+    def total_assinantes(self):
+        return len(self._assinantes)
+
+
+class BrokerLocal:
+    """Broker padrão: entrega direto ao feed do próprio processo"""
+
+    def publicar(self, evento):
+        get_feed().distribuir(evento)
+
+
+@lru_cache(maxsize=None)
+def get_feed():
+    return Feed()
+
+
+@lru_cache(maxsize=None)
+def get_broker():
+    return import_string(get_config('BROKER'))()
+
+
+def publicar(tipo, acao, dados):
+    """Publica o evento quando a transação atual for confirmada"""
+    evento = {'tipo': tipo, 'acao': acao, 'dados': dados}
+    transaction.on_commit(lambda: get_broker().publicar(evento))
+
+
+def publicar_lote(tipo, acao, itens):
+    """Um evento por item; uma transação só agenda um callback"""
+    if not itens:
+        return
+    eventos = [{'tipo': tipo, 'acao': acao, 'dados': dados} for dados in itens]
+
+    def enviar():
+        broker = get_broker()
+        for evento in eventos:
+            broker.publicar(evento)
+    transaction.on_commit(enviar)
+
+
+def formatar_sse(evento):
+    """Bloco text/event-stream de um evento"""
+    dados = {chave: evento[chave] for chave in ('tipo', 'acao', 'dados')}
+    return f"id: {evento['id']}\ndata: {json.dumps(dados, cls=DjangoJSONEncoder, ensure_ascii=False)}\n\n"
+
+
+KEEPALIVE = ': keepalive\n\n'
+# Pede ao EventSource que reconecte após 3 s se a conexão cair
+INICIO = 'retry: 3000\n\n'
+
+
+def transmitir_sync(assinante):
+    feed = get_feed()
+    try:
+        yield INICIO
+        while not assinante.transbordou:
+            evento = assinante.proximo(get_config('KEEPALIVE'))
+            yield KEEPALIVE if evento is None else formatar_sse(evento)
+    finally:
+        feed.cancelar(assinante)
+
+
+async def transmitir_async(assinante):
+    feed = get_feed()
+    try:
+        yield INICIO
+        while not assinante.transbordou:
+            evento = await assinante.proximo(get_config('KEEPALIVE'))
+            yield KEEPALIVE if evento is None else formatar_sse(evento)
+    finally:
+        feed.cancelar(assinante)
+
+
+def parse_tipos(valor):
+    """Tipos pedidos em ?tipos=falha,unidade (todos quando ausente)"""
+    if not valor:
+        return TIPOS
+    tipos = [tipo.strip() for tipo in valor.split(',') if tipo.strip()]
+    invalidos = [tipo for tipo in tipos if tipo not in TIPOS]
+    if invalidos or not tipos:
+        raise FiltroInvalido(f"Valor inválido para 'tipos': use {', '.join(TIPOS)}")
+    return tipos
+
+
+def parse_ultimo_id(valor):
+    """
+    (época, número) do último evento recebido (Last-Event-ID), se informado.
+    Um id sem época (anterior aos ids com época) não corresponde a nenhum feed.
+    """
+    if not valor:
+        return None
+    epoca, _, numero = valor.rpartition('-')
+    return epoca, parse_int('last_event_id', numero)
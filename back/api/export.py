@@ -0,0 +1,108 @@
+"""
+Exportação do histórico de falhas (junto com os dados da unidade) em NDJSON
+ou CSV, gerada linha a linha a partir de um cursor do banco
+(`iterator(chunk_size=...)`). A memória usada não depende do tamanho do
+histórico: nenhuma lista de linhas ou de dicts serializados é montada.
+
+Sob ASGI, o StreamingHttpResponse consome um iterador síncrono inteiro
+(sync_to_async(list)) antes de enviar o primeiro byte; por isso as views
+ASGI usam exportar_falhas_async(), que lê um bloco por vez numa thread.
+"""
+import csv
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .filters import FiltroInvalido
+from .models import FalhaDjango
+
+
+# (nome da coluna exportada, campo no ORM)
+COLUNAS = [
+    ('id', 'id'),
+    ('unidade', 'unidade_id'),
+    ('unidade_nome', 'unidade__nome_unidade'),
+    ('id_unidade', 'unidade__id_unidade'),
+    ('grupo_unidade', 'unidade__grupo_unidade'),
+    ('falha_ocorrida', 'falha_ocorrida'),
+    ('data_falha', 'data_falha'),
+    ('observacao', 'observacao'),
+    ('ativa', 'ativa'),
+    ('created_at', 'created_at'),
+    ('updated_at', 'updated_at'),
+]
+
+FORMATOS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv; charset=utf-8',
+}
+
+CHUNK_SIZE = 2000
+
+
+def get_formato(formato):
+    if formato not in FORMATOS:
+        raise FiltroInvalido(f"Valor inválido para 'formato': use {', '.join(FORMATOS)}")
+    return formato
+
+
+def linhas_falhas(falhas=None, chunk_size=CHUNK_SIZE):
+    """Tuplas com as colunas de COLUNAS, lidas do banco em blocos de `chunk_size`"""
+    if falhas is None:
+        falhas = FalhaDjango.objects.all()
+    return (
+        falhas.order_by('id')
+        .values_list(*[campo for _, campo in COLUNAS])
+        .iterator(chunk_size=chunk_size)
+    )
+
+
+def gerar_ndjson(linhas):
+    nomes = [nome for nome, _ in COLUNAS]
+    encoder = DjangoJSONEncoder(ensure_ascii=False)
+    for linha in linhas:
+        yield encoder.encode(dict(zip(nomes, linha))) + '\n'
+
+
+class _Eco:
+    """Pseudo-arquivo para o csv.writer: devolve a linha em vez de guardá-la"""
+    def write(self, valor):
+        return valor
+
+
+def gerar_csv(linhas):
+    escritor = csv.writer(_Eco())
+    yield escritor.writerow([nome for nome, _ in COLUNAS])
+    for linha in linhas:
+        yield escritor.writerow(
+            valor.isoformat() if hasattr(valor, 'isoformat') else valor
+            for valor in linha
+        )
+
+
+GERADORES = {
+    'ndjson': gerar_ndjson,
+    'csv': gerar_csv,
+}
+
+
+def exportar_falhas(formato, falhas=None, chunk_size=CHUNK_SIZE):
+    """Gerador de pedaços de texto da exportação no `formato` pedido"""
+    return GERADORES[get_formato(formato)](linhas_falhas(falhas, chunk_size))
+
+
+async def em_blocos_async(pedacos, tamanho):
+    """
+    Consome o gerador síncrono `pedacos` `tamanho` itens por vez, na thread
+    das chamadas síncronas (a mesma conexão com o banco em todos os blocos)
+    """
+    ler = sync_to_async(lambda: ''.join(islice(pedacos, tamanho)))
+    while bloco := await ler():
+        yield bloco
+
+
+def exportar_falhas_async(formato, falhas=None, chunk_size=CHUNK_SIZE):
+    """Como exportar_falhas(), em um gerador assíncrono de um pedaço por bloco de linhas"""
+    return em_blocos_async(exportar_falhas(formato, falhas, chunk_size), chunk_size)
@@ -0,0 +1,85 @@
+from datetime import date
+
+
+class FiltroInvalido(ValueError):
+    """Parâmetro de consulta com valor inválido"""
+
+
+VALORES_VERDADEIROS = {'true', '1', 'sim'}
+VALORES_FALSOS = {'false', '0', 'nao', 'não'}
+
+
+def parse_bool(nome, valor):
+    """Converte um parâmetro de consulta em booleano"""
+    valor_normalizado = valor.strip().lower()
+    if valor_normalizado in VALORES_VERDADEIROS:
+        return True
+    if valor_normalizado in VALORES_FALSOS:
+        return False
+    raise FiltroInvalido(f"Valor inválido para '{nome}': use true ou false")
+
+
+def parse_int(nome, valor):
+    """Converte um parâmetro de consulta em inteiro"""
+    try:
+        return int(valor)
+    except (TypeError, ValueError):
+        raise FiltroInvalido(f"Valor inválido para '{nome}': esperado um número inteiro")
+
+
+def parse_data(nome, valor):
+    """Converte um parâmetro de consulta no formato AAAA-MM-DD em data"""
+    try:
+        return date.fromisoformat(valor)
+    except (TypeError, ValueError):
+        raise FiltroInvalido(f"Valor inválido para '{nome}': use o formato AAAA-MM-DD")
+
+
+def parse_intervalo(params):
+    """Lê data_inicio/data_fim dos parâmetros de consulta"""
+    data_inicio = parse_data('data_inicio', params['data_inicio']) if params.get('data_inicio') else None
+    data_fim = parse_data('data_fim', params['data_fim']) if params.get('data_fim') else None
+    if data_inicio and data_fim and data_inicio > data_fim:
+        raise FiltroInvalido("'data_inicio' deve ser anterior ou igual a 'data_fim'")
+    return data_inicio, data_fim
+
+
+def filtrar_falhas(queryset, params):
+    """
+    Aplica os filtros de consulta suportados por /api/falhas/:
+
+    - unidade: id da unidade
+    - ativa: true/false
+    - data_inicio / data_fim: intervalo (inclusivo) de data_falha
+    - falha_ocorrida: trecho do texto da falha (sem diferenciar maiúsculas)
+    """
+    if params.get('unidade'):
+        queryset = queryset.filter(unidade_id=parse_int('unidade', params['unidade']))
+
+    if params.get('ativa'):
+        queryset = queryset.filter(ativa=parse_bool('ativa', params['ativa']))
+
+    data_inicio, data_fim = parse_intervalo(params)
+    if data_inicio:
+        queryset = queryset.filter(data_falha__gte=data_inicio)
+    if data_fim:
+        queryset = queryset.filter(data_falha__lte=data_fim)
+
+    if params.get('falha_ocorrida'):
+        queryset = queryset.filter(falha_ocorrida__icontains=params['falha_ocorrida'].strip())
+
+    return queryset
+
+
+def filtrar_resumos_diarios(queryset, params):
+    """Aplica os filtros unidade, data_inicio e data_fim ao resumo diário de falhas"""
+    if params.get('unidade'):
+        queryset = queryset.filter(unidade_id=parse_int('unidade', params['unidade']))
+
+    data_inicio, data_fim = parse_intervalo(params)
+    if data_inicio:
+        queryset = queryset.filter(data__gte=data_inicio)
+    if data_fim:
+        queryset = queryset.filter(data__lte=data_fim)
+
+    return queryset
@@ -0,0 +1,151 @@
+"""
+Histórico de falhas e unidades (HistoricoDjango), só de inserção.
+
+Cada gravação de uma falha ou unidade acrescenta um evento: na criação e
+na exclusão, o estado completo do registro; na alteração, só os campos que
+mudaram, como {campo: [antes, depois]}. O estado anterior vem dos valores
+lidos do banco junto com a instância (EstadoCarregadoMixin), então o
+histórico custa um INSERT por gravação e nenhuma leitura a mais. As
+gravações em lote (api.bulk, api.importacao) inserem os eventos de cada
+lote com um bulk_create.
+
+O índice (unidade, momento, id) deixa a linha do tempo de uma unidade
+paginada por cursor: o custo de cada página não depende do tamanho do
+histórico.
+"""
+from django.utils import timezone
+
+from .filters import FiltroInvalido, parse_int
+from .models import UnidadeDjango, FalhaDjango, HistoricoDjango
+from .pagination import KeysetPagination
+
+TIPOS = {
+    FalhaDjango: 'falha',
+    UnidadeDjango: 'unidade',
+}
+
+# Campos de controle que não entram no histórico; resolvida_em é o momento
+# do evento em que ativa passou a false
+IGNORADOS = {'id', 'created_at', 'updated_at', 'resolvida_em'}
+
+ORDENACAO = ('-momento', '-id')
+
+
+def campos(modelo):
+    """(nome, attname) dos campos registrados; chaves estrangeiras pelo id"""
+    return [
+        (campo.name, campo.attname) for campo in modelo._meta.concrete_fields if campo.name not in IGNORADOS
+    ]
+
+
+def estado(instancia):
+    return {nome: getattr(instancia, attname) for nome, attname in campos(type(instancia))}
+
+
+def alteracoes(instancia):
+    """
+    {campo: [antes, depois]} dos campos que mudaram desde a leitura do
+    banco. Sem o estado lido (instância montada à mão), antes fica null.
+    """
+    carregado = getattr(instancia, '_estado_carregado', None)
+    mudancas = {}
+    for nome, attname in campos(type(instancia)):
+        depois = getattr(instancia, attname)
+        if carregado is None:
+            mudancas[nome] = [None, depois]
+        elif attname in carregado and carregado[attname] != depois:
+            mudancas[nome] = [carregado[attname], depois]
+    return mudancas
+
+
+def unidade_de(instancia):
+    return instancia.pk if isinstance(instancia, UnidadeDjango) else instancia.unidade_id
+
+
+def evento(instancia, acao, momento=None):
+    """
+    HistoricoDjango (ainda não gravado) da `acao` sobre a instância, ou
+    None para uma alteração que não mudou nenhum campo registrado
+    """
+    dados = alteracoes(instancia) if acao == 'updated' else estado(instancia)
+    if acao == 'updated' and not dados:
+        return None
+    return HistoricoDjango(
+        unidade_id=unidade_de(instancia), tipo=TIPOS[type(instancia)], registro_id=instancia.pk,
+        acao=acao, dados=dados, momento=momento or timezone.now(),
+    )
+
+
+def marcar_gravado(instancia):
+    """O estado gravado passa a ser o de referência para a próxima alteração"""
+    instancia._estado_carregado = {attname: getattr(instancia, attname) for _, attname in campos(type(instancia))}
+
+
+def registrar(instancia, acao):
+    """Um INSERT no histórico para a gravação de uma instância (ver api.signals)"""
+    novo = evento(instancia, acao)
+    if novo is not None:
+        novo.save()
+    if acao != 'deleted':
+        marcar_gravado(instancia)
+
+
+def registrar_lote(instancias, acao, batch_size=1000):
+    """Eventos de uma gravação em lote, com um bulk_create (todos com o mesmo momento)"""
+    momento = timezone.now()
+    novos = []
+    for instancia in instancias:
+        novo = evento(instancia, acao, momento)
+        if novo is not None:
+            novos.append(novo)
+        if acao != 'deleted':
+            marcar_gravado(instancia)
+    HistoricoDjango.objects.bulk_create(novos, batch_size=batch_size)
+    return novos
+
+
+def registrar_exclusoes(modelo, linhas, batch_size=1000):
+    """
+    Eventos de exclusão a partir de dicts com os campos de `campos(modelo)`
+    e 'id' (ex.: as falhas removidas em cascata com a unidade, lidas com
+    .values() antes do delete)
+    """
+    momento = timezone.now()
+    tipo = TIPOS[modelo]
+    nomes = campos(modelo)
+    HistoricoDjango.objects.bulk_create(
+        [
+            HistoricoDjango(
+                unidade_id=linha['id'] if modelo is UnidadeDjango else linha['unidade_id'],
+                tipo=tipo, registro_id=linha['id'], acao='deleted', momento=momento,
+                dados={nome: linha[attname] for nome, attname in nomes},
+            )
+            for linha in linhas
+        ],
+        batch_size=batch_size,
+    )
+
+
+class PaginacaoHistorico(KeysetPagination):
+    """A linha do tempo é sempre paginada (do evento mais recente para o mais antigo)"""
+    ordering = ORDENACAO
+
+    def deve_paginar(self, request):
+        return True
+
+
+def linha_do_tempo(unidade_id, params):
+    """
+    Eventos de uma unidade e das suas falhas, com os filtros opcionais
+    ?tipo=falha|unidade e ?registro=<id> (um registro só)
+    """
+    eventos = HistoricoDjango.objects.filter(unidade_id=unidade_id)
+    tipo = params.get('tipo')
+    if tipo:
+        if tipo not in TIPOS.values():
+            raise FiltroInvalido(f"Valor inválido para 'tipo': use {', '.join(TIPOS.values())}")
+        eventos = eventos.filter(tipo=tipo)
+    registro = params.get('registro')
+    if registro:
+        eventos = eventos.filter(registro_id=parse_int('registro', registro))
+    return eventos
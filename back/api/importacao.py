@@ -0,0 +1,258 @@
+"""
+Importação em massa de unidades e falhas a partir de CSV ou Excel (.xlsx).
+
+O arquivo é lido como stream, linha a linha, e gravado em blocos de
+`chunk_size` linhas com bulk_create, cada bloco na sua própria transação.
+As referências `id_unidade` das falhas são resolvidas por um único mapa em
+memória carregado no início. Linhas inválidas ou com id_unidade já
+existente são reportadas no relatório sem interromper a carga. Pela API,
+a importação roda como tarefa em segundo plano (api.tarefas).
+
+Excel depende do pacote opcional openpyxl (`pip install openpyxl`).
+"""
+import csv
+import io
+from datetime import date, datetime
+from itertools import islice
+
+from django.db import IntegrityError, transaction
+
+from .cache import incrementar_versao
+from .filters import FiltroInvalido, VALORES_FALSOS, VALORES_VERDADEIROS
+from .models import UnidadeDjango, FalhaDjango
+from . import confiabilidade, eventos, historico, rollup
+
+
+FORMATOS_IMPORTACAO = ('csv', 'xlsx')
+CHUNK_SIZE = 1000
+# Quantos erros individuais o relatório lista (os demais são apenas contados)
+MAX_ERROS_RELATORIO = 500
+
+
+class ErroLinha(ValueError):
+    """Valor inválido em uma linha do arquivo"""
+
+
+def detectar_formato(nome_arquivo, formato=None):
+    formato = (formato or nome_arquivo.rsplit('.', 1)[-1]).lower()
+    if formato not in FORMATOS_IMPORTACAO:
+        raise FiltroInvalido(f"Formato não suportado: use {', '.join(FORMATOS_IMPORTACAO)}")
+    return formato
+
+
+def ler_csv(arquivo):
+    """Dicts por linha de um arquivo CSV binário (UTF-8, com ou sem BOM)"""
+    texto = io.TextIOWrapper(arquivo, encoding='utf-8-sig', newline='')
+    yield from csv.DictReader(texto)
+
+
+def ler_xlsx(arquivo):
+    """Dicts por linha da primeira planilha de um .xlsx, sem carregá-la inteira"""
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise FiltroInvalido('Importação de Excel requer o pacote openpyxl (pip install openpyxl)')
+
+    planilha = load_workbook(arquivo, read_only=True, data_only=True).worksheets[0]
+    linhas = planilha.iter_rows(values_only=True)
+    cabecalho = [str(coluna).strip() if coluna is not None else '' for coluna in next(linhas, ())]
+    for linha in linhas:
+        if any(valor is not None for valor in linha):
+            yield dict(zip(cabecalho, linha))
+
+
+def ler_linhas(arquivo, formato):
+    return ler_xlsx(arquivo) if formato == 'xlsx' else ler_csv(arquivo)
+
+
+def texto(linha, campo, modelo, obrigatorio=False):
+    valor = linha.get(campo)
+    valor = '' if valor is None else str(valor).strip()
+    if obrigatorio and not valor:
+        raise ErroLinha(f"'{campo}' é obrigatório")
+    max_length = modelo._meta.get_field(campo).max_length
+    if max_length and len(valor) > max_length:
+        raise ErroLinha(f"'{campo}' excede {max_length} caracteres")
+    return valor
+
+
+def data(linha, campo):
+    valor = linha.get(campo)
+    if isinstance(valor, datetime):
+        return valor.date()
+    if isinstance(valor, date):
+        return valor
+    try:
+        return date.fromisoformat(str(valor).strip())
+    except (TypeError, ValueError):
+        raise ErroLinha(f"'{campo}' deve estar no formato AAAA-MM-DD")
+
+
+def booleano(linha, campo, padrao):
+    valor = linha.get(campo)
+    if valor is None or valor == '':
+        return padrao
+    if isinstance(valor, bool):
+        return valor
+    normalizado = str(valor).strip().lower()
+    if normalizado in VALORES_VERDADEIROS:
+        return True
+    if normalizado in VALORES_FALSOS:
+        return False
+    raise ErroLinha(f"'{campo}' deve ser true ou false")
+
+
+def em_blocos(linhas, chunk_size):
+    """Agrupa (numero_da_linha, dict) em listas de até `chunk_size` itens"""
+    # A linha 1 é o cabeçalho
+    numeradas = enumerate(linhas, start=2)
+    while True:
+        bloco = list(islice(numeradas, chunk_size))
+        if not bloco:
+            return
+        yield bloco
+
+
+class Relatorio:
+    def __init__(self):
+        self.criados = 0
+        self.total_erros = 0
+        self.erros = []
+
+    def erro(self, linha, mensagem):
+        self.total_erros += 1
+        if len(self.erros) < MAX_ERROS_RELATORIO:
+            self.erros.append({'line': linha, 'error': mensagem})
+
+    def como_dict(self):
+        return {'created': self.criados, 'error_count': self.total_erros, 'errors': self.erros}
+
+
+def importar_unidades(linhas, chunk_size=CHUNK_SIZE, progresso=None):
+    relatorio = Relatorio()
+    vistos = set()
+
+    for bloco in em_blocos(linhas, chunk_size):
+        candidatas = []
+        for numero, linha in bloco:
+            try:
+                unidade = UnidadeDjango(
+                    nome_unidade=texto(linha, 'nome_unidade', UnidadeDjango, obrigatorio=True),
+                    grupo_unidade=texto(linha, 'grupo_unidade', UnidadeDjango, obrigatorio=True),
+                    tecnico_unidade=texto(linha, 'tecnico_unidade', UnidadeDjango),
+                    id_unidade=texto(linha, 'id_unidade', UnidadeDjango, obrigatorio=True),
+                    observacoes=texto(linha, 'observacoes', UnidadeDjango),
+                )
+            except ErroLinha as e:
+                relatorio.erro(numero, str(e))
+                continue
+            if unidade.id_unidade in vistos:
+                relatorio.erro(numero, f"id_unidade '{unidade.id_unidade}' repetido no arquivo")
+                continue
+            vistos.add(unidade.id_unidade)
+            candidatas.append((numero, unidade))
+
+        existentes = set(
+            UnidadeDjango.objects.filter(id_unidade__in=[u.id_unidade for _, u in candidatas])
+            .values_list('id_unidade', flat=True)
+        )
+        novas = []
+        for numero, unidade in candidatas:
+            if unidade.id_unidade in existentes:
+                relatorio.erro(numero, f"id_unidade '{unidade.id_unidade}' já existe")
+            else:
+                novas.append(unidade)
+
+        try:
+            with transaction.atomic():
+                UnidadeDjango.objects.bulk_create(novas)
+                historico.registrar_lote(novas, 'created')
+        except IntegrityError:
+            # Outra gravação criou algum desses id_unidade depois da verificação:
+            # refaz o bloco linha a linha para isolar as colisões
+            novas = inserir_individualmente(candidatas, existentes, relatorio)
+            historico.registrar_lote(novas, 'created')
+        if novas:
+            incrementar_versao('unidades')
+            eventos.publicar('unidade', 'imported', {'count': len(novas)})
+        relatorio.criados += len(novas)
+        if progresso is not None:
+            progresso(bloco[-1][0] - 1)
+
+    return relatorio
+
+
+def inserir_individualmente(candidatas, existentes, relatorio):
+    """
+    Insere uma linha por vez com bulk_create([unidade]): sem os sinais de
+    save(), o bloco gera os mesmos eventos e versões do caminho em lote
+    """
+    inseridas = []
+    for numero, unidade in candidatas:
+        if unidade.id_unidade in existentes:
+            continue
+        try:
+            with transaction.atomic():
+                UnidadeDjango.objects.bulk_create([unidade])
+        except IntegrityError:
+            relatorio.erro(numero, f"id_unidade '{unidade.id_unidade}' já existe")
+        else:
+            inseridas.append(unidade)
+    return inseridas
+
+
+def importar_falhas(linhas, chunk_size=CHUNK_SIZE, progresso=None):
+    relatorio = Relatorio()
+    unidades_por_codigo = dict(UnidadeDjango.objects.values_list('id_unidade', 'pk'))
+
+    for bloco in em_blocos(linhas, chunk_size):
+        novas = []
+        for numero, linha in bloco:
+            try:
+                codigo = texto(linha, 'id_unidade', UnidadeDjango, obrigatorio=True)
+                if codigo not in unidades_por_codigo:
+                    raise ErroLinha(f"Unidade '{codigo}' não encontrada")
+                novas.append(FalhaDjango(
+                    unidade_id=unidades_por_codigo[codigo],
+                    falha_ocorrida=texto(linha, 'falha_ocorrida', FalhaDjango, obrigatorio=True),
+                    data_falha=data(linha, 'data_falha'),
+                    observacao=texto(linha, 'observacao', FalhaDjango),
+                    ativa=booleano(linha, 'ativa', padrao=True),
+                ))
+            except ErroLinha as e:
+                relatorio.erro(numero, str(e))
+
+        with transaction.atomic():
+            FalhaDjango.objects.bulk_create(novas)
+            historico.registrar_lote(novas, 'created')
+            rollup.registrar_lote(adicionadas=[rollup.chave_resumo(falha) for falha in novas])
+            confiabilidade.registrar_lote(adicionadas=[confiabilidade.contribuicao(falha) for falha in novas])
+            if novas:
+                incrementar_versao('falhas')
+                # Um evento por bloco: os clientes recarregam em vez de receber cada linha
+                eventos.publicar('falha', 'imported', {'count': len(novas)})
+        relatorio.criados += len(novas)
+        if progresso is not None:
+            progresso(bloco[-1][0] - 1)
+
+    return relatorio
+
+
+IMPORTADORES = {
+    'unidades': importar_unidades,
+    'falhas': importar_falhas,
+}
+
+
+def get_tipo(tipo):
+    if tipo not in IMPORTADORES:
+        raise FiltroInvalido(f"Tipo inválido: use {', '.join(IMPORTADORES)}")
+    return tipo
+
+
+def importar(tipo, arquivo, formato, chunk_size=CHUNK_SIZE, progresso=None):
+    """
+    Importa `arquivo` (binário) do `tipo` unidades ou falhas; retorna o
+    Relatorio. `progresso`, se informado, recebe as linhas lidas a cada bloco.
+    """
+    return IMPORTADORES[get_tipo(tipo)](ler_linhas(arquivo, formato), chunk_size, progresso)
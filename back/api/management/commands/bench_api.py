@@ -0,0 +1,254 @@
+import json
+import math
+import platform
+import statistics
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+import django
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, reset_queries
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+
+from api import tarefas, urls
+from api.dados_sinteticos import gerar_dados, volumes_para
+from api.management.commands.bench_escritas import banco_temporario
+from api.models import UniversityDjango, CourseDjango, StudentDjango, UnidadeDjango, FalhaDjango, TarefaDjango
+
+
+def primeiro(modelo):
+    return lambda: [modelo.objects.order_by('pk').values_list('pk', flat=True).first()]
+
+
+def corpo_unidades(n):
+    return [
+        {'nome_unidade': f'Bench {n}-{i}', 'grupo_unidade': 'Bench', 'id_unidade': f'BENCH-{n}-{i}'}
+        for i in range(50)
+    ]
+
+
+def corpo_falhas(n):
+    unidade = UnidadeDjango.objects.order_by('pk').values_list('pk', flat=True).first()
+    return [
+        {'unidade': unidade, 'falha_ocorrida': f'Falha de bench {n}', 'data_falha': '2025-01-01'}
+        for _ in range(50)
+    ]
+
+
+def arquivo_falhas(n):
+    id_unidade = UnidadeDjango.objects.order_by('pk').values_list('id_unidade', flat=True).first()
+    linhas = ['id_unidade,falha_ocorrida,data_falha'] + [f'{id_unidade},Falha importada {n},2025-01-01'] * 50
+    return {'arquivo': SimpleUploadedFile('falhas.csv', '\n'.join(linhas).encode(), content_type='text/csv')}
+
+
+def corpo_tarefa(n):
+    # Exportação de uma unidade só: a execução (em tarefa_executada) fica barata
+    unidade = UnidadeDjango.objects.order_by('pk').values_list('pk', flat=True).first()
+    return {'tipo': 'exportacao', 'parametros': {'formato': 'csv', 'unidade': unidade}}
+
+
+def tarefa_executada():
+    """Executa as tarefas submetidas pelos casos anteriores (o despachante fica desligado)"""
+    tarefas.executar_pendentes()
+    return [TarefaDjango.objects.order_by('pk').values_list('pk', flat=True).first()]
+
+
+# (nome da rota, método, argumentos da URL, parâmetros do GET ou corpo por requisição).
+# As escritas ficam no fim para não mudar os volumes medidos pelas leituras.
+CASOS = [
+    ('university-list', 'GET', None, {}),
+    ('university-detail', 'GET', primeiro(UniversityDjango), {}),
+    ('course-list', 'GET', None, {}),
+    ('course-detail', 'GET', primeiro(CourseDjango), {}),
+    ('student-list', 'GET', None, {}),
+    ('student-detail', 'GET', primeiro(StudentDjango), {}),
+    ('dashboard-stats', 'GET', None, {}),
+    ('falha-stats', 'GET', None, {'periodo': 'mes'}),
+    ('falha-stats', 'GET', None, {'periodo': 'mes', 'ativa': 'true'}),
+    ('unidade-list', 'GET', None, {}),
+    ('unidade-list', 'GET', None, {'page_size': 100}),
+    ('unidade-summary', 'GET', None, {}),
+    ('unidade-detail', 'GET', primeiro(UnidadeDjango), {}),
+    ('unidade-historico', 'GET', primeiro(UnidadeDjango), {'page_size': 50}),
+    ('confiabilidade-unidades', 'GET', None, {'page_size': 100}),
+    ('confiabilidade-grupos', 'GET', None, {}),
+    ('falha-list', 'GET', None, {'page_size': 100}),
+    ('falha-list', 'GET', None, {'ativa': 'true', 'page_size': 100}),
+    ('falha-detail', 'GET', primeiro(FalhaDjango), {}),
+    ('falha-busca', 'GET', None, {'q': 'compressor'}),
+    ('falha-export', 'GET', None, {'formato': 'ndjson'}),
+    ('sync', 'GET', None, {'page_size': 100}),
+    ('metricas', 'GET', None, {}),
+    ('unidade-bulk', 'POST', None, corpo_unidades),
+    ('falha-bulk', 'POST', None, corpo_falhas),
+    ('importacao', 'POST', lambda: ['falhas'], arquivo_falhas),
+    ('tarefa-list', 'POST', None, corpo_tarefa),
+    ('tarefa-list', 'GET', None, {'page_size': 100}),
+    ('tarefa-detail', 'GET', tarefa_executada, {}),
+    ('tarefa-resultado', 'GET', tarefa_executada, {}),
+]
+
+# Rotas de api/urls.py fora do benchmark, com o motivo
+SEM_BENCHMARK = {
+    'eventos': 'stream SSE que só termina quando o cliente desconecta',
+}
+
+
+def percentil(tempos, fracao):
+    return tempos[max(math.ceil(len(tempos) * fracao) - 1, 0)]
+
+
+def requisitar(client, metodo, url, dados, n, cabecalhos):
+    """
+    Faz a requisição e lê a resposta inteira (inclusive streaming); retorna
+    (status, bytes enviados, ETag)
+    """
+    if metodo == 'GET':
+        response = client.get(url, dados, **cabecalhos)
+    else:
+        corpo = dados(n)
+        # Dicts com arquivo vão como multipart (upload); o resto como JSON
+        if isinstance(corpo, dict) and any(hasattr(valor, 'read') for valor in corpo.values()):
+            response = client.post(url, corpo, **cabecalhos)
+        else:
+            response = client.post(url, corpo, content_type='application/json', **cabecalhos)
+    conteudo = b''.join(response.streaming_content) if response.streaming else response.content
+    return response.status_code, len(conteudo), response.get('ETag')
+
+
+def medir(client, caso, requisicoes, cabecalhos, revalidar):
+    nome, metodo, argumentos, dados = caso
+    url = reverse(nome, args=argumentos() if argumentos else None)
+    # Aquecimento: conexão, caches do Django e do SQLite
+    _, _, etag = requisitar(client, metodo, url, dados, 0, cabecalhos)
+    if revalidar and metodo == 'GET' and etag:
+        # Cliente que guardou a resposta: as próximas requisições são condicionais
+        cabecalhos = {**cabecalhos, 'HTTP_IF_NONE_MATCH': etag}
+
+    # Consultas e pico de memória em uma requisição à parte: o tracemalloc deixa tudo mais lento
+    # (o sinal request_started limpa o log de queries; zerado aqui, a contagem não fica negativa)
+    reset_queries()
+    tracemalloc.start()
+    try:
+        with CaptureQueriesContext(connection) as consultas:
+            codigo, tamanho, _ = requisitar(client, metodo, url, dados, 1, cabecalhos)
+        _, pico = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    tempos = []
+    for n in range(requisicoes):
+        inicio = time.perf_counter()
+        requisitar(client, metodo, url, dados, n + 2, cabecalhos)
+        tempos.append((time.perf_counter() - inicio) * 1000)
+    tempos.sort()
+    return {
+        'rota': nome,
+        'metodo': metodo,
+        'params': dados if isinstance(dados, dict) else {},
+        'status': codigo,
+        'p50_ms': round(statistics.median(tempos), 2),
+        'p99_ms': round(percentil(tempos, 0.99), 2),
+        'queries': len(consultas),
+        'pico_memoria_kb': round(pico / 1024, 1),
+        'bytes': tamanho,
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark das rotas de api/urls.py pelo client de testes do Django, em bancos '
+        'temporários com dados sintéticos: p50/p99, queries por requisição e pico de memória'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--escalas', type=int, nargs='+', default=[1000, 10000, 100000],
+                            help='Linhas das tabelas grandes (falhas e estudantes) em cada rodada')
+        parser.add_argument('--requisicoes', type=int, default=20, help='Requisições medidas por rota')
+        parser.add_argument('--rotas', nargs='+', help='Mede só estas rotas (nomes de api/urls.py)')
+        parser.add_argument('--seed', type=int, default=42, help='Semente do gerador de dados')
+        parser.add_argument('--com-cache', action='store_true',
+                            help='Mantém o cache de respostas (por padrão cada requisição executa a view)')
+        parser.add_argument('--accept-encoding', default='',
+                            help='Accept-Encoding das requisições (ex.: "gzip, br"); os bytes medidos são os enviados')
+        parser.add_argument('--revalidar', action='store_true',
+                            help='GETs com If-None-Match do ETag da primeira resposta (mede o 304)')
+        parser.add_argument('--json', action='store_true', help='Escreve o resultado em JSON')
+        parser.add_argument('--output', '-o', help='Grava o JSON neste arquivo (para comparar execuções)')
+
+    def handle(self, *args, **options):
+        casos = self.selecionar_casos(options['rotas'])
+
+        # As tarefas submetidas só são executadas pelo caso de tarefa-detail, fora da medição
+        diretorio_tarefas = tempfile.TemporaryDirectory()
+        ajustes = {
+            'ALLOWED_HOSTS': ['testserver'],
+            'API_TAREFAS': {'INICIAR': False, 'DIRETORIO': diretorio_tarefas.name},
+        }
+        if not options['com_cache']:
+            ajustes['CACHES'] = {
+                'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+                'api': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'},
+            }
+
+        cabecalhos = {'HTTP_ACCEPT_ENCODING': options['accept_encoding']} if options['accept_encoding'] else {}
+        resultados = []
+        with diretorio_tarefas, override_settings(**ajustes):
+            for escala in options['escalas']:
+                with banco_temporario():
+                    inicio = time.perf_counter()
+                    gerar_dados(seed=options['seed'], **volumes_para(escala))
+                    self.stderr.write(f'{escala} linhas geradas em {time.perf_counter() - inicio:.1f}s')
+                    client = Client()
+                    for caso in casos:
+                        medicao = medir(client, caso, options['requisicoes'], cabecalhos, options['revalidar'])
+                        resultados.append({'escala': escala, **medicao})
+
+        relatorio = {
+            'data': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'banco': connection.vendor,
+            'seed': options['seed'],
+            'requisicoes': options['requisicoes'],
+            'accept_encoding': options['accept_encoding'],
+            'revalidar': options['revalidar'],
+            'resultados': resultados,
+        }
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as saida:
+                json.dump(relatorio, saida, indent=2, ensure_ascii=False)
+            self.stderr.write(self.style.SUCCESS(f'Resultado gravado em {options["output"]}'))
+        if options['json']:
+            self.stdout.write(json.dumps(relatorio, indent=2, ensure_ascii=False))
+            return
+
+        self.stdout.write(
+            f"{'escala':>8}  {'rota':<40}{'status':>7}{'p50 ms':>10}{'p99 ms':>10}{'queries':>9}{'pico KB':>10}{'bytes':>11}"
+        )
+        for linha in resultados:
+            rota = f"{linha['metodo']} {linha['rota']}"
+            if linha['params']:
+                rota += '?' + '&'.join(f'{chave}={valor}' for chave, valor in linha['params'].items())
+            self.stdout.write(
+                f"{linha['escala']:>8}  {rota:<40}{linha['status']:>7}{linha['p50_ms']:>10}"
+                f"{linha['p99_ms']:>10}{linha['queries']:>9}{linha['pico_memoria_kb']:>10}{linha['bytes']:>11}"
+            )
+
+    def selecionar_casos(self, rotas):
+        """Confere que toda rota de api/urls.py tem caso (ou motivo para não ter) e aplica --rotas"""
+        nomes = {padrao.name for padrao in urls.urlpatterns}
+        sem_caso = nomes - {caso[0] for caso in CASOS} - set(SEM_BENCHMARK)
+        if sem_caso:
+            raise CommandError(f"Rotas sem caso no benchmark: {', '.join(sorted(sem_caso))}")
+        if not rotas:
+            return CASOS
+        desconhecidas = set(rotas) - nomes
+        if desconhecidas:
+            raise CommandError(f"Rotas desconhecidas: {', '.join(sorted(desconhecidas))}")
+        return [caso for caso in CASOS if caso[0] in rotas]
@@ -0,0 +1,148 @@
+import json
+import logging
+import os
+import statistics
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+from django.core.management.base import BaseCommand
+from django.db import connection, connections
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from api.models import UnidadeDjango
+
+
+@contextmanager
+def banco_temporario(sem_ajustes=False):
+    """
+    Cria um banco descartável com o perfil de settings.DATABASES (em SQLite,
+    um arquivo temporário, para que WAL e os pragmas valham) e o remove no fim.
+    Com `sem_ajustes`, o SQLite usa a configuração padrão do Django.
+    """
+    ajustes = connection.settings_dict
+    opcoes_originais, nome_teste_original = ajustes['OPTIONS'], ajustes['TEST'].get('NAME')
+    diretorio = None
+    if connection.vendor == 'sqlite':
+        diretorio = tempfile.TemporaryDirectory()
+        ajustes['TEST']['NAME'] = os.path.join(diretorio.name, 'bench.sqlite3')
+        if sem_ajustes:
+            ajustes['OPTIONS'] = {}
+    nome_original = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    try:
+        yield
+    finally:
+        connections.close_all()
+        connection.creation.destroy_test_db(nome_original, verbosity=0)
+        ajustes['OPTIONS'], ajustes['TEST']['NAME'] = opcoes_originais, nome_teste_original
+        if diretorio is not None:
+            diretorio.cleanup()
+
+
+def escrever(unidade_id, quantidade, tempos, status):
+    client = Client()
+    try:
+        for indice in range(quantidade):
+            dados = {
+                'unidade': unidade_id,
+                'falha_ocorrida': f'Falha de carga {indice}',
+                'data_falha': '2025-01-01',
+                'observacao': 'bench_escritas',
+            }
+            inicio = time.perf_counter()
+            try:
+                response = client.post(reverse('falha-list'), dados, content_type='application/json')
+                status.append(response.status_code)
+            except Exception:
+                status.append(None)
+            tempos.append(time.perf_counter() - inicio)
+    finally:
+        connection.close()
+
+
+def ler(parar, contador):
+    client = Client()
+    try:
+        while not parar.is_set():
+            client.get(reverse('falha-list'), {'page_size': 50})
+            contador.append(1)
+    finally:
+        connection.close()
+
+
+class Command(BaseCommand):
+    help = (
+        'Teste de carga de escritas concorrentes: POSTs simultâneos em /api/falhas/ '
+        'num banco temporário criado com o perfil de settings.DATABASES'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8, help='Clientes escrevendo ao mesmo tempo')
+        parser.add_argument('--requisicoes', type=int, default=100, help='POSTs por cliente')
+        parser.add_argument('--leitores', type=int, default=2, help='Clientes lendo enquanto os outros escrevem')
+        parser.add_argument('--comparar', action='store_true',
+                            help='Repete a carga com o SQLite sem os ajustes do perfil (WAL, timeout, IMMEDIATE)')
+        parser.add_argument('--json', action='store_true', help='Escreve o resultado em JSON')
+
+    def handle(self, *args, **options):
+        perfis = [('perfil', False)]
+        if options['comparar'] and connection.vendor == 'sqlite':
+            perfis.append(('sem ajustes', True))
+
+        resultados = []
+        # Os erros 500 ("database is locked") entram na contagem; não precisam do traceback no log
+        logging.getLogger('django.request').setLevel(logging.CRITICAL)
+        with override_settings(ALLOWED_HOSTS=['testserver']):
+            for nome, sem_ajustes in perfis:
+                with banco_temporario(sem_ajustes):
+                    medida = self.executar(options['threads'], options['requisicoes'], options['leitores'])
+                resultados.append({'perfil': nome, 'banco': connection.vendor, **medida})
+
+        if options['json']:
+            self.stdout.write(json.dumps(resultados, indent=2))
+            return
+        self.stdout.write(
+            f"{'perfil':<14}{'escritas/s':>12}{'p50 ms':>10}{'p95 ms':>10}{'erros':>8}{'leituras/s':>12}"
+        )
+        for linha in resultados:
+            self.stdout.write(
+                f"{linha['perfil']:<14}{linha['escritas_s']:>12}{linha['p50_ms']:>10}"
+                f"{linha['p95_ms']:>10}{linha['erros']:>8}{linha['leituras_s']:>12}"
+            )
+
+    def executar(self, threads, requisicoes, leitores):
+        unidade = UnidadeDjango.objects.create(
+            nome_unidade='Unidade de carga', grupo_unidade='Carga', id_unidade='BENCH-ESCRITAS'
+        )
+        connection.close()
+
+        tempos, status, leituras = [], [], []
+        parar = threading.Event()
+        escritores = [
+            threading.Thread(target=escrever, args=(unidade.pk, requisicoes, tempos, status))
+            for _ in range(threads)
+        ]
+        leitores = [threading.Thread(target=ler, args=(parar, leituras)) for _ in range(leitores)]
+
+        inicio = time.perf_counter()
+        for thread in leitores + escritores:
+            thread.start()
+        for thread in escritores:
+            thread.join()
+        duracao = time.perf_counter() - inicio
+        parar.set()
+        for thread in leitores:
+            thread.join()
+
+        tempos = sorted(segundos * 1000 for segundos in tempos)
+        return {
+            # Só as escritas concluídas (201) contam para a vazão
+            'escritas_s': round(sum(1 for codigo in status if codigo == 201) / duracao, 1),
+            'p50_ms': round(statistics.median(tempos), 2),
+            'p95_ms': round(tempos[int(len(tempos) * 0.95) - 1], 2),
+            'erros': sum(1 for codigo in status if codigo != 201),
+            'leituras_s': round(len(leituras) / duracao, 1),
+        }
@@ -0,0 +1,121 @@
+import asyncio
+import json
+import statistics
+import threading
+import time
+
+from django.core.handlers.asgi import ASGIHandler
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+from django.urls import path
+
+from api import views, views_async
+
+
+ROTAS = {
+    'unidades/': 'unidade_list',
+    'unidades/summary/': 'unidade_summary',
+    'falhas/?page_size=100': 'falha_list',
+    'dashboard/falhas/': 'falha_stats',
+}
+
+# Urlconf usada só durante o benchmark: as mesmas views em /sync/ e /async/
+urlpatterns = [
+    path(f'{variante}/{rota.split("?")[0]}', getattr(modulo, nome))
+    for variante, modulo in (('sync', views), ('async', views_async))
+    for rota, nome in ROTAS.items()
+]
+
+
+async def requisitar(app, caminho):
+    """Faz uma requisição GET direto na aplicação ASGI; retorna (status, segundos)"""
+    caminho, _, query = caminho.partition('?')
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1',
+        'method': 'GET', 'scheme': 'http', 'path': caminho, 'raw_path': caminho.encode(),
+        'query_string': query.encode(), 'root_path': '',
+        'headers': [(b'host', b'localhost'), (b'accept', b'application/json')],
+        'client': ('127.0.0.1', 0), 'server': ('localhost', 80),
+    }
+    entrada = asyncio.Queue()
+    await entrada.put({'type': 'http.request', 'body': b'', 'more_body': False})
+    resultado = {}
+
+    async def enviar(mensagem):
+        if mensagem['type'] == 'http.response.start':
+            resultado['status'] = mensagem['status']
+
+    inicio = time.perf_counter()
+    await app(scope, entrada.get, enviar)
+    return resultado.get('status'), time.perf_counter() - inicio
+
+
+async def medir(app, caminho, requisicoes, concorrencia):
+    limite = asyncio.Semaphore(concorrencia)
+    threads = threading.active_count()
+
+    async def uma():
+        nonlocal threads
+        async with limite:
+            resultado = await requisitar(app, caminho)
+            threads = max(threads, threading.active_count())
+            return resultado
+
+    inicio = time.perf_counter()
+    resultados = await asyncio.gather(*(uma() for _ in range(requisicoes)))
+    duracao = time.perf_counter() - inicio
+    tempos = sorted(segundos * 1000 for _, segundos in resultados)
+    return {
+        'req_s': round(requisicoes / duracao, 1),
+        'p50_ms': round(statistics.median(tempos), 2),
+        'p95_ms': round(tempos[int(len(tempos) * 0.95) - 1], 2),
+        'erros': sum(1 for status, _ in resultados if status != 200),
+        # Threads vivas no processo: o ORM assíncrono do Django ainda executa as consultas em threads
+        'threads': threads,
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        'Compara as views de leitura síncronas e assíncronas sob requisições '
+        'concorrentes, chamando a aplicação ASGI no próprio processo (só GET)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requisicoes', type=int, default=500, help='Requisições por rota e variante')
+        parser.add_argument('--concorrencia', type=int, default=50, help='Requisições simultâneas')
+        parser.add_argument('--com-cache', action='store_true',
+                            help='Mantém o cache de respostas (por padrão cada requisição executa a view)')
+        parser.add_argument('--json', action='store_true', help='Escreve o resultado em JSON')
+
+    def handle(self, *args, **options):
+        ajustes = {'ROOT_URLCONF': __name__}
+        if not options['com_cache']:
+            ajustes['CACHES'] = {
+                'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+                'api': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'},
+            }
+        with override_settings(**ajustes):
+            resultados = asyncio.run(self.executar(options['requisicoes'], options['concorrencia']))
+
+        if options['json']:
+            self.stdout.write(json.dumps(resultados, indent=2))
+            return
+        self.stdout.write(f"{'rota':<26}{'variante':<10}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'erros':>8}{'threads':>9}")
+        for linha in resultados:
+            self.stdout.write(
+                f"{linha['rota']:<26}{linha['variante']:<10}{linha['req_s']:>10}"
+                f"{linha['p50_ms']:>10}{linha['p95_ms']:>10}{linha['erros']:>8}{linha['threads']:>9}"
+            )
+
+    async def executar(self, requisicoes, concorrencia):
+        app = ASGIHandler()
+        resultados = []
+        for rota in ROTAS:
+            for variante in ('sync', 'async'):
+                caminho = f'/{variante}/{rota}'
+                # Aquecimento: conexão com o banco e caches do Django
+                await requisitar(app, caminho)
+                medida = await medir(app, caminho, requisicoes, concorrencia)
+                resultados.append({'rota': rota, 'variante': variante, **medida})
+        return resultados
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from api import tarefas
+
+
+class Command(BaseCommand):
+    help = (
+        'Executa as tarefas em segundo plano (api.tarefas) neste processo, separado dos processos web; '
+        'use com API_TAREFAS["INICIAR"] = False'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=tarefas.get_config('THREADS'),
+                            help='Tarefas executadas ao mesmo tempo')
+        parser.add_argument('--uma-vez', action='store_true',
+                            help='Executa as tarefas pendentes e termina, em vez de esperar por novas')
+
+    def handle(self, *args, **options):
+        if options['uma_vez']:
+            tarefas.expirar()
+            executadas = tarefas.executar_pendentes()
+            self.stdout.write(self.style.SUCCESS(f'{executadas} tarefas executadas'))
+            return
+
+        despachante = tarefas.Despachante(options['threads'], tarefas.get_config('INTERVALO')).iniciar()
+        self.stdout.write(f'Executando tarefas com {options["threads"]} threads (Ctrl+C para parar)')
+        try:
+            despachante.esperar()
+        except KeyboardInterrupt:
+            self.stdout.write('Parando: esperando as tarefas em execução terminarem')
+            despachante.parar()
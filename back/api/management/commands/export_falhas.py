@@ -0,0 +1,28 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.export import CHUNK_SIZE, FORMATOS, exportar_falhas
+from api.filters import FiltroInvalido
+
+
+class Command(BaseCommand):
+    help = 'Exporta o histórico completo de falhas (com os dados da unidade) em NDJSON ou CSV'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--formato', choices=list(FORMATOS), default='ndjson')
+        parser.add_argument('--output', '-o', help='Arquivo de saída (padrão: saída padrão)')
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help='Linhas lidas do banco por vez')
+
+    def handle(self, *args, **options):
+        try:
+            conteudo = exportar_falhas(options['formato'], chunk_size=options['chunk_size'])
+        except FiltroInvalido as e:
+            raise CommandError(str(e))
+
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8', newline='') as saida:
+                saida.writelines(conteudo)
+            self.stderr.write(self.style.SUCCESS(f'Exportação escrita em {options["output"]}'))
+        else:
+            sys.stdout.writelines(conteudo)
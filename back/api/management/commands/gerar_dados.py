@@ -0,0 +1,35 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.dados_sinteticos import gerar_dados, volumes_para
+
+
+class Command(BaseCommand):
+    help = (
+        'Gera dados sintéticos reprodutíveis (mesma semente, mesmo conteúdo) de unidades, '
+        'falhas, universidades, cursos e estudantes'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--linhas', type=int,
+                            help='Volumes proporcionais: N falhas e N estudantes (ver volumes_para)')
+        for tabela in ('unidades', 'falhas', 'universidades', 'cursos', 'estudantes'):
+            parser.add_argument(f'--{tabela}', type=int, help=f'Quantidade de {tabela} (sobrepõe --linhas)')
+        parser.add_argument('--seed', type=int, default=42, help='Semente do gerador')
+
+    def handle(self, *args, **options):
+        volumes = volumes_para(options['linhas']) if options['linhas'] else {}
+        for tabela in ('unidades', 'falhas', 'universidades', 'cursos', 'estudantes'):
+            if options[tabela] is not None:
+                volumes[tabela] = options[tabela]
+        if not any(volumes.values()):
+            raise CommandError('Informe --linhas ou a quantidade de pelo menos uma tabela')
+
+        inicio = time.perf_counter()
+        try:
+            criados = gerar_dados(seed=options['seed'], **volumes)
+        except ValueError as e:
+            raise CommandError(str(e))
+        resumo = ', '.join(f'{quantidade} {tabela}' for tabela, quantidade in criados.items() if quantidade)
+        self.stdout.write(self.style.SUCCESS(f'Criados {resumo} em {time.perf_counter() - inicio:.1f}s'))
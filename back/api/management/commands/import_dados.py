@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from api.filters import FiltroInvalido
+from api.importacao import CHUNK_SIZE, IMPORTADORES, detectar_formato, importar
+
+
+class Command(BaseCommand):
+    help = 'Importa unidades ou falhas de um arquivo CSV ou XLSX em blocos transacionais'
+
+    def add_arguments(self, parser):
+        parser.add_argument('tipo', choices=list(IMPORTADORES))
+        parser.add_argument('arquivo')
+        parser.add_argument('--formato', help='csv ou xlsx (padrão: extensão do arquivo)')
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help='Linhas por transação')
+
+    def handle(self, *args, **options):
+        try:
+            formato = detectar_formato(options['arquivo'], options['formato'])
+            with open(options['arquivo'], 'rb') as arquivo:
+                relatorio = importar(options['tipo'], arquivo, formato, options['chunk_size'])
+        except (FiltroInvalido, OSError) as e:
+            raise CommandError(str(e))
+
+        for erro in relatorio.erros:
+            self.stderr.write(f"Linha {erro['line']}: {erro['error']}")
+        if relatorio.total_erros > len(relatorio.erros):
+            self.stderr.write(f'... e mais {relatorio.total_erros - len(relatorio.erros)} erros')
+        self.stdout.write(self.style.SUCCESS(
+            f'{relatorio.criados} registros criados, {relatorio.total_erros} linhas com erro'
+        ))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from api.sync import limpar_exclusoes
+
+
+class Command(BaseCommand):
+    help = 'Apaga as marcas de exclusão usadas pela sincronização incremental mais antigas que a retenção'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dias', type=int, default=None,
+                            help="Retenção em dias (padrão: API_SYNC['RETENCAO_EXCLUSOES_DIAS'])")
+
+    def handle(self, *args, **options):
+        apagados = limpar_exclusoes(options['dias'])
+        self.stdout.write(self.style.SUCCESS(f'Marcas de exclusão apagadas: {apagados}'))
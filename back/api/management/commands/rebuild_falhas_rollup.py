@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from api.confiabilidade import reconstruir
+from api.rollup import reconstruir_resumo_diario
+
+
+class Command(BaseCommand):
+    help = (
+        'Reconstrói do zero as tabelas derivadas das falhas: o resumo diário (ResumoDiarioFalhasDjango) '
+        'e as de confiabilidade (api.confiabilidade)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Linhas por INSERT em lote')
+
+    def handle(self, *args, **options):
+        total = reconstruir_resumo_diario(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Resumo diário reconstruído: {total} linhas'))
+        for tabela, linhas in reconstruir(batch_size=options['batch_size']).items():
+            self.stdout.write(self.style.SUCCESS(f'{tabela} reconstruída: {linhas} linhas'))
@@ -0,0 +1,259 @@
+"""
+Métricas de desempenho por requisição.
+
+MetricasMiddleware mede, para cada requisição, o tempo total, o número e o
+tempo das consultas SQL, o tempo de serialização (serializers e renderização
+do JSON) e o tamanho da resposta. Os valores voltam no cabeçalho
+Server-Timing e são acumulados em histogramas por view (nome da rota) e
+método, expostos em /api/metricas/ no formato texto do Prometheus.
+
+A medição da requisição corrente fica em uma ContextVar, que acompanha a
+requisição também nas threads do sync_to_async (ORM assíncrono). As
+consultas são contadas por um execute_wrapper instalado em cada conexão
+(não depende de DEBUG). Fora de uma requisição nada é medido.
+
+Os histogramas são do processo: com vários workers, cada um expõe os
+seus, e o Prometheus agrega pelo rótulo de instância.
+"""
+import time
+import threading
+from bisect import bisect_left
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.http import HttpResponse
+from django.views.decorators.http import require_GET
+from rest_framework import renderers
+
+
+CONFIG_PADRAO = {
+    # Desligado, os histogramas continuam sendo alimentados, só o cabeçalho sai
+    'SERVER_TIMING': True,
+}
+
+BUCKETS_SEGUNDOS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+BUCKETS_CONSULTAS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+BUCKETS_BYTES = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+# nome: (descrição, buckets)
+HISTOGRAMAS = {
+    'api_requisicao_segundos': ('Tempo total da requisição', BUCKETS_SEGUNDOS),
+    'api_sql_segundos': ('Tempo de execução das consultas SQL por requisição', BUCKETS_SEGUNDOS),
+    'api_sql_consultas': ('Consultas SQL por requisição', BUCKETS_CONSULTAS),
+    'api_serializacao_segundos': ('Tempo de serialização e renderização por requisição', BUCKETS_SEGUNDOS),
+    'api_resposta_bytes': ('Tamanho do corpo da resposta (exceto streaming)', BUCKETS_BYTES),
+}
+
+
+def get_config(nome):
+    return getattr(settings, 'API_METRICAS', {}).get(nome, CONFIG_PADRAO[nome])
+
+
+class Medicao:
+    """Acumuladores de uma requisição"""
+    __slots__ = ('consultas', 'sql', 'serializacao', 'em_andamento')
+
+    def __init__(self):
+        self.consultas = 0
+        self.sql = 0.0
+        self.serializacao = 0.0
+        self.em_andamento = False
+
+
+_medicao = ContextVar('medicao', default=None)
+
+
+def registrar_sql(execute, sql, params, many, context):
+    """execute_wrapper: conta a consulta e soma o tempo na medição corrente"""
+    medicao = _medicao.get()
+    if medicao is None:
+        return execute(sql, params, many, context)
+    inicio = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        medicao.sql += time.perf_counter() - inicio
+        medicao.consultas += 1
+
+
+def instalar_em_conexao(sender, connection, **kwargs):
+    if registrar_sql not in connection.execute_wrappers:
+        connection.execute_wrappers.append(registrar_sql)
+
+
+connection_created.connect(instalar_em_conexao)
+
+
+def medir_serializacao(funcao, *args, **kwargs):
+    """
+    Executa `funcao` somando o tempo em Medicao.serializacao. Chamadas
+    aninhadas (serializers dentro de serializers) contam uma vez só.
+    """
+    medicao = _medicao.get()
+    if medicao is None or medicao.em_andamento:
+        return funcao(*args, **kwargs)
+    medicao.em_andamento = True
+    inicio = time.perf_counter()
+    try:
+        return funcao(*args, **kwargs)
+    finally:
+        medicao.serializacao += time.perf_counter() - inicio
+        medicao.em_andamento = False
+
+
+class JSONRendererMedido(renderers.JSONRenderer):
+    """JSONRenderer que soma o tempo de renderização em Medicao.serializacao"""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return medir_serializacao(super().render, data, accepted_media_type, renderer_context)
+
+
+class Histograma:
+    __slots__ = ('limites', 'contagens', 'soma', 'total')
+
+    def __init__(self, limites):
+        self.limites = limites
+        self.contagens = [0] * (len(limites) + 1)
+        self.soma = 0
+        self.total = 0
+
+    def observar(self, valor):
+        self.contagens[bisect_left(self.limites, valor)] += 1
+        self.soma += valor
+        self.total += 1
+
+
+class Registro:
+    """Histogramas e contagem de respostas por (view, método), protegidos por um lock"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.histogramas = {}
+        self.respostas = {}
+
+    def registrar(self, view, metodo, status, valores):
+        with self.lock:
+            for nome, valor in valores.items():
+                chave = (nome, view, metodo)
+                histograma = self.histogramas.get(chave)
+                if histograma is None:
+                    histograma = self.histogramas[chave] = Histograma(HISTOGRAMAS[nome][1])
+                histograma.observar(valor)
+            chave = (view, metodo, status)
+            self.respostas[chave] = self.respostas.get(chave, 0) + 1
+
+    def limpar(self):
+        with self.lock:
+            self.histogramas.clear()
+            self.respostas.clear()
+
+    def exportar(self):
+        """Texto no formato de exposição do Prometheus (versão 0.0.4)"""
+        with self.lock:
+            histogramas = {
+                chave: (list(h.contagens), h.soma, h.total) for chave, h in self.histogramas.items()
+            }
+            respostas = dict(self.respostas)
+
+        linhas = [
+            '# HELP api_requisicoes_total Respostas por view, método e status',
+            '# TYPE api_requisicoes_total counter',
+        ]
+        for (view, metodo, status), total in sorted(respostas.items()):
+            linhas.append(f'api_requisicoes_total{rotulos(view=view, metodo=metodo, status=status)} {total}')
+
+        for nome, (descricao, limites) in HISTOGRAMAS.items():
+            linhas += [f'# HELP {nome} {descricao}', f'# TYPE {nome} histogram']
+            for (metrica, view, metodo), (contagens, soma, total) in sorted(histogramas.items()):
+                if metrica != nome:
+                    continue
+                acumulado = 0
+                for limite, contagem in zip(limites + ('+Inf',), contagens):
+                    acumulado += contagem
+                    linhas.append(f'{nome}_bucket{rotulos(view=view, metodo=metodo, le=limite)} {acumulado}')
+                linhas.append(f'{nome}_sum{rotulos(view=view, metodo=metodo)} {soma}')
+                linhas.append(f'{nome}_count{rotulos(view=view, metodo=metodo)} {total}')
+        return '\n'.join(linhas) + '\n'
+
+
+def rotulos(**valores):
+    def escapar(valor):
+        return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+    return '{' + ','.join(f'{nome}="{escapar(valor)}"' for nome, valor in valores.items()) + '}'
+
+
+registro = Registro()
+
+
+def server_timing(total, medicao, tamanho):
+    partes = [
+        f'total;dur={total * 1000:.1f}',
+        f'db;dur={medicao.sql * 1000:.1f};desc="{medicao.consultas} consultas"',
+        f'serializacao;dur={medicao.serializacao * 1000:.1f}',
+    ]
+    if tamanho is not None:
+        partes.append(f'resposta;desc="{tamanho} bytes"')
+    return ', '.join(partes)
+
+
+class MetricasMiddleware:
+    """
+    Mede cada requisição e registra os valores por view; deve ser o primeiro
+    de settings.MIDDLEWARE para que o tempo total inclua os demais.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.assincrono = iscoroutinefunction(get_response)
+        if self.assincrono:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.assincrono:
+            return self.__acall__(request)
+        medicao = Medicao()
+        token = _medicao.set(medicao)
+        inicio = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _medicao.reset(token)
+        return self.finalizar(request, response, medicao, time.perf_counter() - inicio)
+
+    async def __acall__(self, request):
+        medicao = Medicao()
+        token = _medicao.set(medicao)
+        inicio = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _medicao.reset(token)
+        return self.finalizar(request, response, medicao, time.perf_counter() - inicio)
+
+    def finalizar(self, request, response, medicao, total):
+        # Respostas em streaming: o tempo vai até a view devolver o gerador, sem o tamanho
+        tamanho = None if response.streaming else len(response.content)
+        valores = {
+            'api_requisicao_segundos': total,
+            'api_sql_segundos': medicao.sql,
+            'api_sql_consultas': medicao.consultas,
+            'api_serializacao_segundos': medicao.serializacao,
+        }
+        if tamanho is not None:
+            valores['api_resposta_bytes'] = tamanho
+        rota = request.resolver_match.view_name if request.resolver_match else '<sem rota>'
+        registro.registrar(rota, request.method, response.status_code, valores)
+
+        if get_config('SERVER_TIMING'):
+            response['Server-Timing'] = server_timing(total, medicao, tamanho)
+        return response
+
+
+@require_GET
+def metricas(request):
+    """Histogramas por view no formato texto do Prometheus"""
+    return HttpResponse(registro.exportar(), content_type='text/plain; version=0.0.4; charset=utf-8')
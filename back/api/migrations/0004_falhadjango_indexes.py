@@ -0,0 +1,25 @@
+# Generated by Django 5.2.6 on 2026-10-18 08:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_alter_unidadedjango_tecnico_unidade'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='falhadjango',
+            index=models.Index(fields=['unidade', 'ativa', 'data_falha'], name='falha_unidade_ativa_data_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='falhadjango',
+            index=models.Index(fields=['ativa', 'data_falha'], name='falha_ativa_data_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='falhadjango',
+            index=models.Index(fields=['-data_falha', '-created_at'], name='falha_data_created_idx'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.6 on 2026-10-18 08:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_falhadjango_indexes'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='falhadjango',
+            name='falha_data_created_idx',
+        ),
+        migrations.AddIndex(
+            model_name='falhadjango',
+            index=models.Index(fields=['-data_falha', '-created_at', '-id'], name='falha_data_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='unidadedjango',
+            index=models.Index(fields=['nome_unidade', 'id'], name='unidade_nome_id_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.6 on 2026-10-18 08:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_keyset_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='falhadjango',
+            index=models.Index(fields=['unidade', '-data_falha', '-created_at'], name='falha_unidade_data_idx'),
+        ),
+    ]
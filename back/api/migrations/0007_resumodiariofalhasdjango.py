@@ -0,0 +1,55 @@
+# Generated by Django 5.2.6 on 2026-10-18 08:31
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+def preencher_resumo_diario(apps, schema_editor):
+    FalhaDjango = apps.get_model('api', 'FalhaDjango')
+    ResumoDiarioFalhasDjango = apps.get_model('api', 'ResumoDiarioFalhasDjango')
+    linhas = (
+        FalhaDjango.objects.order_by()
+        .values('unidade_id', 'data_falha')
+        .annotate(ativas=Count('id', filter=Q(ativa=True)), resolvidas=Count('id', filter=Q(ativa=False)))
+    )
+    ResumoDiarioFalhasDjango.objects.bulk_create(
+        [
+            ResumoDiarioFalhasDjango(
+                unidade_id=linha['unidade_id'],
+                data=linha['data_falha'],
+                ativas=linha['ativas'],
+                resolvidas=linha['resolvidas'],
+            )
+            for linha in linhas
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_falha_unidade_data_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumoDiarioFalhasDjango',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('data', models.DateField(verbose_name='Data')),
+                ('ativas', models.PositiveIntegerField(default=0, verbose_name='Falhas Ativas')),
+                ('resolvidas', models.PositiveIntegerField(default=0, verbose_name='Falhas Resolvidas')),
+                ('unidade', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='resumos_diarios', to='api.unidadedjango', verbose_name='Unidade')),
+            ],
+            options={
+                'verbose_name': 'Resumo Diário de Falhas',
+                'verbose_name_plural': 'Resumos Diários de Falhas',
+                'ordering': ['data', 'unidade'],
+                'indexes': [models.Index(fields=['data', 'unidade'], name='resumo_diario_data_idx')],
+                'constraints': [models.UniqueConstraint(fields=('unidade', 'data'), name='resumo_diario_unidade_data_uniq')],
+            },
+        ),
+        migrations.RunPython(preencher_resumo_diario, migrations.RunPython.noop),
+    ]
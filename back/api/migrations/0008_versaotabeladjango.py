@@ -0,0 +1,35 @@
+# Generated by Django 5.2.6 on 2026-10-18 08:35
+
+from django.db import migrations, models
+from django.db.models import Max
+from django.utils import timezone
+
+
+def criar_versoes(apps, schema_editor):
+    VersaoTabelaDjango = apps.get_model('api', 'VersaoTabelaDjango')
+    for tabela, modelo in [('unidades', 'UnidadeDjango'), ('falhas', 'FalhaDjango')]:
+        ultima = apps.get_model('api', modelo).objects.aggregate(ultima=Max('updated_at'))['ultima']
+        VersaoTabelaDjango.objects.create(tabela=tabela, versao=1, modificado_em=ultima or timezone.now())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_resumodiariofalhasdjango'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VersaoTabelaDjango',
+            fields=[
+                ('tabela', models.CharField(max_length=50, primary_key=True, serialize=False, verbose_name='Tabela')),
+                ('versao', models.PositiveBigIntegerField(default=1, verbose_name='Versão')),
+                ('modificado_em', models.DateTimeField(verbose_name='Modificado em')),
+            ],
+            options={
+                'verbose_name': 'Versão de Tabela',
+                'verbose_name_plural': 'Versões de Tabelas',
+            },
+        ),
+        migrations.RunPython(criar_versoes, migrations.RunPython.noop),
+    ]
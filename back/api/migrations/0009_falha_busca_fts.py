@@ -0,0 +1,77 @@
+# Generated by Django 5.2.6 on 2026-10-18 08:39
+
+from django.db import migrations
+
+
+# Índice de texto completo (SQLite FTS5) sobre falha_ocorrida, observacao e o
+# nome da unidade, mantido por triggers: qualquer gravação (save, bulk_create,
+# delete em cascata, SQL direto) atualiza o índice na mesma transação.
+CRIAR_BUSCA = [
+    """
+    CREATE VIRTUAL TABLE api_falha_busca USING fts5(
+        falha_ocorrida, observacao, nome_unidade,
+        tokenize = 'unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER api_falha_busca_insert AFTER INSERT ON api_falhadjango BEGIN
+        INSERT INTO api_falha_busca (rowid, falha_ocorrida, observacao, nome_unidade)
+        SELECT NEW.id, NEW.falha_ocorrida, NEW.observacao, u.nome_unidade
+        FROM api_unidadedjango u WHERE u.id = NEW.unidade_id;
+    END
+    """,
+    """
+    CREATE TRIGGER api_falha_busca_delete AFTER DELETE ON api_falhadjango BEGIN
+        DELETE FROM api_falha_busca WHERE rowid = OLD.id;
+    END
+    """,
+    """
+    CREATE TRIGGER api_falha_busca_update AFTER UPDATE OF falha_ocorrida, observacao, unidade_id ON api_falhadjango BEGIN
+        DELETE FROM api_falha_busca WHERE rowid = OLD.id;
+        INSERT INTO api_falha_busca (rowid, falha_ocorrida, observacao, nome_unidade)
+        SELECT NEW.id, NEW.falha_ocorrida, NEW.observacao, u.nome_unidade
+        FROM api_unidadedjango u WHERE u.id = NEW.unidade_id;
+    END
+    """,
+    """
+    CREATE TRIGGER api_unidade_busca_update AFTER UPDATE OF nome_unidade ON api_unidadedjango
+    WHEN NEW.nome_unidade IS NOT OLD.nome_unidade BEGIN
+        UPDATE api_falha_busca SET nome_unidade = NEW.nome_unidade
+        WHERE rowid IN (SELECT id FROM api_falhadjango WHERE unidade_id = NEW.id);
+    END
+    """,
+    """
+    INSERT INTO api_falha_busca (rowid, falha_ocorrida, observacao, nome_unidade)
+    SELECT f.id, f.falha_ocorrida, f.observacao, u.nome_unidade
+    FROM api_falhadjango f JOIN api_unidadedjango u ON u.id = f.unidade_id
+    """,
+]
+
+REMOVER_BUSCA = [
+    'DROP TRIGGER IF EXISTS api_unidade_busca_update',
+    'DROP TRIGGER IF EXISTS api_falha_busca_update',
+    'DROP TRIGGER IF EXISTS api_falha_busca_delete',
+    'DROP TRIGGER IF EXISTS api_falha_busca_insert',
+    'DROP TABLE IF EXISTS api_falha_busca',
+]
+
+
+def executar(comandos):
+    def operacao(apps, schema_editor):
+        # Em outros bancos a busca usa o fallback com icontains (ver api.busca)
+        if schema_editor.connection.vendor != 'sqlite':
+            return
+        for sql in comandos:
+            schema_editor.execute(sql)
+    return operacao
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_versaotabeladjango'),
+    ]
+
+    operations = [
+        migrations.RunPython(executar(CRIAR_BUSCA), executar(REMOVER_BUSCA)),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.6 on 2026-10-18 08:45
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_falha_busca_fts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RegistroExcluidoDjango',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tabela', models.CharField(max_length=50, verbose_name='Tabela')),
+                ('registro_id', models.BigIntegerField(verbose_name='ID do Registro')),
+                ('excluido_em', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Excluído em')),
+            ],
+            options={
+                'verbose_name': 'Registro Excluído',
+                'verbose_name_plural': 'Registros Excluídos',
+                'ordering': ['excluido_em', 'id'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='falhadjango',
+            index=models.Index(fields=['updated_at', 'id'], name='falha_updated_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='unidadedjango',
+            index=models.Index(fields=['updated_at', 'id'], name='unidade_updated_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='registroexcluidodjango',
+            index=models.Index(fields=['excluido_em', 'id'], name='registro_excluido_em_idx'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.6 on 2026-10-18 09:30
+
+from django.db import migrations
+from django.utils import timezone
+
+
+def criar_versoes(apps, schema_editor):
+    VersaoTabelaDjango = apps.get_model('api', 'VersaoTabelaDjango')
+    for tabela in ('universidades', 'cursos', 'estudantes'):
+        VersaoTabelaDjango.objects.get_or_create(tabela=tabela, defaults={'modificado_em': timezone.now()})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_sync_incremental'),
+    ]
+
+    operations = [
+        migrations.RunPython(criar_versoes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.6 on 2026-10-18 09:27
+
+import django.core.serializers.json
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0011_versoes_universidades'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HistoricoDjango',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('falha', 'Falha'), ('unidade', 'Unidade')], max_length=10, verbose_name='Tipo')),
+                ('registro_id', models.BigIntegerField(verbose_name='ID do Registro')),
+                ('acao', models.CharField(choices=[('created', 'Criação'), ('updated', 'Alteração'), ('deleted', 'Exclusão')], max_length=10, verbose_name='Ação')),
+                ('dados', models.JSONField(default=dict, encoder=django.core.serializers.json.DjangoJSONEncoder, verbose_name='Dados')),
+                ('momento', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Momento')),
+                ('unidade', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='historico', to='api.unidadedjango', verbose_name='Unidade')),
+            ],
+            options={
+                'verbose_name': 'Evento do Histórico',
+                'verbose_name_plural': 'Histórico',
+                'ordering': ['-momento', '-id'],
+                'indexes': [models.Index(fields=['unidade', 'momento', 'id'], name='historico_unidade_momento_idx')],
+            },
+        ),
+    ]
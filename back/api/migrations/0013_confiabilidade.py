@@ -0,0 +1,137 @@
+# Generated by Django 5.2.6 on 2026-10-18 09:52
+
+import datetime
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Max, Min, Q
+
+
+def preencher_confiabilidade(apps, schema_editor):
+    # resolvida_em acabou de ser criado: nenhuma falha existente tem tempo de reparo
+    FalhaDjango = apps.get_model('api', 'FalhaDjango')
+    ConfiabilidadeUnidadeDjango = apps.get_model('api', 'ConfiabilidadeUnidadeDjango')
+    OcorrenciaFalhaDjango = apps.get_model('api', 'OcorrenciaFalhaDjango')
+    AbertasGrupoDjango = apps.get_model('api', 'AbertasGrupoDjango')
+    OcorrenciaGrupoDjango = apps.get_model('api', 'OcorrenciaGrupoDjango')
+    falhas = FalhaDjango.objects.order_by()
+    unidades = falhas.values('unidade_id').annotate(
+        falhas=Count('id'), abertas=Count('id', filter=Q(ativa=True)),
+        primeira_falha=Min('data_falha'), ultima_falha=Max('data_falha'),
+    )
+    ConfiabilidadeUnidadeDjango.objects.bulk_create(
+        [ConfiabilidadeUnidadeDjango(**linha) for linha in unidades], batch_size=1000,
+    )
+    OcorrenciaFalhaDjango.objects.bulk_create(
+        [
+            OcorrenciaFalhaDjango(**linha)
+            for linha in falhas.values('unidade_id', 'falha_ocorrida').annotate(total=Count('id'))
+        ],
+        batch_size=1000,
+    )
+    AbertasGrupoDjango.objects.bulk_create(
+        [
+            AbertasGrupoDjango(grupo_unidade=linha['unidade__grupo_unidade'], data=linha['data_falha'], total=linha['total'])
+            for linha in falhas.filter(ativa=True).values('unidade__grupo_unidade', 'data_falha').annotate(total=Count('id'))
+        ],
+        batch_size=1000,
+    )
+    OcorrenciaGrupoDjango.objects.bulk_create(
+        [
+            OcorrenciaGrupoDjango(
+                grupo_unidade=linha['unidade__grupo_unidade'], falha_ocorrida=linha['falha_ocorrida'], total=linha['total'],
+            )
+            for linha in falhas.values('unidade__grupo_unidade', 'falha_ocorrida').annotate(total=Count('id'))
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0012_historico'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AbertasGrupoDjango',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('grupo_unidade', models.CharField(max_length=100, verbose_name='Grupo')),
+                ('data', models.DateField(verbose_name='Data')),
+                ('total', models.PositiveIntegerField(default=0, verbose_name='Total')),
+            ],
+            options={
+                'verbose_name': 'Falhas Abertas do Grupo',
+                'verbose_name_plural': 'Falhas Abertas dos Grupos',
+            },
+        ),
+        migrations.CreateModel(
+            name='ConfiabilidadeUnidadeDjango',
+            fields=[
+                ('unidade', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='confiabilidade', serialize=False, to='api.unidadedjango', verbose_name='Unidade')),
+                ('falhas', models.PositiveIntegerField(default=0, verbose_name='Falhas')),
+                ('abertas', models.PositiveIntegerField(default=0, verbose_name='Falhas Abertas')),
+                ('primeira_falha', models.DateField(null=True, verbose_name='Primeira Falha')),
+                ('ultima_falha', models.DateField(null=True, verbose_name='Última Falha')),
+                ('reparos', models.PositiveIntegerField(default=0, verbose_name='Reparos com Duração')),
+                ('tempo_reparo', models.DurationField(default=datetime.timedelta(0), verbose_name='Tempo Total de Reparo')),
+            ],
+            options={
+                'verbose_name': 'Confiabilidade da Unidade',
+                'verbose_name_plural': 'Confiabilidade das Unidades',
+            },
+        ),
+        migrations.CreateModel(
+            name='OcorrenciaFalhaDjango',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('falha_ocorrida', models.CharField(max_length=500, verbose_name='Falha Ocorrida')),
+                ('total', models.PositiveIntegerField(default=0, verbose_name='Total')),
+            ],
+            options={
+                'verbose_name': 'Ocorrência de Falha',
+                'verbose_name_plural': 'Ocorrências de Falhas',
+            },
+        ),
+        migrations.CreateModel(
+            name='OcorrenciaGrupoDjango',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('grupo_unidade', models.CharField(max_length=100, verbose_name='Grupo')),
+                ('falha_ocorrida', models.CharField(max_length=500, verbose_name='Falha Ocorrida')),
+                ('total', models.PositiveIntegerField(default=0, verbose_name='Total')),
+            ],
+            options={
+                'verbose_name': 'Ocorrência de Falha no Grupo',
+                'verbose_name_plural': 'Ocorrências de Falhas nos Grupos',
+            },
+        ),
+        migrations.AddField(
+            model_name='falhadjango',
+            name='resolvida_em',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Resolvida em'),
+        ),
+        migrations.AddIndex(
+            model_name='unidadedjango',
+            index=models.Index(fields=['grupo_unidade', 'id'], name='unidade_grupo_id_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='abertasgrupodjango',
+            constraint=models.UniqueConstraint(fields=('grupo_unidade', 'data'), name='abertas_grupo_data_uniq'),
+        ),
+        migrations.AddField(
+            model_name='ocorrenciafalhadjango',
+            name='unidade',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ocorrencias', to='api.unidadedjango', verbose_name='Unidade'),
+        ),
+        migrations.AddConstraint(
+            model_name='ocorrenciagrupodjango',
+            constraint=models.UniqueConstraint(fields=('grupo_unidade', 'falha_ocorrida'), name='ocorrencia_grupo_falha_uniq'),
+        ),
+        migrations.AddConstraint(
+            model_name='ocorrenciafalhadjango',
+            constraint=models.UniqueConstraint(fields=('unidade', 'falha_ocorrida'), name='ocorrencia_unidade_falha_uniq'),
+        ),
+        migrations.RunPython(preencher_confiabilidade, migrations.RunPython.noop),
+    ]
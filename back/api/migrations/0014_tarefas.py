@@ -0,0 +1,41 @@
+# Generated by Django 5.2.6 on 2026-10-18 10:06
+
+import django.core.serializers.json
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0013_confiabilidade'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TarefaDjango',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('exportacao', 'Exportação'), ('importacao', 'Importação'), ('reconstrucao', 'Reconstrução')], max_length=20, verbose_name='Tipo')),
+                ('status', models.CharField(choices=[('pendente', 'Pendente'), ('executando', 'Executando'), ('concluida', 'Concluída'), ('falhou', 'Falhou')], default='pendente', max_length=20, verbose_name='Status')),
+                ('parametros', models.JSONField(default=dict, encoder=django.core.serializers.json.DjangoJSONEncoder, verbose_name='Parâmetros')),
+                ('entrada', models.CharField(blank=True, max_length=500, verbose_name='Arquivo de entrada')),
+                ('arquivo', models.CharField(blank=True, max_length=500, verbose_name='Arquivo de resultado')),
+                ('progresso', models.PositiveBigIntegerField(default=0, verbose_name='Progresso')),
+                ('total', models.PositiveBigIntegerField(blank=True, null=True, verbose_name='Total')),
+                ('resultado', models.JSONField(blank=True, encoder=django.core.serializers.json.DjangoJSONEncoder, null=True, verbose_name='Resultado')),
+                ('erro', models.TextField(blank=True, verbose_name='Erro')),
+                ('executor', models.CharField(blank=True, max_length=100, verbose_name='Executor')),
+                ('criada_em', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Criada em')),
+                ('iniciada_em', models.DateTimeField(blank=True, null=True, verbose_name='Iniciada em')),
+                ('atualizada_em', models.DateTimeField(blank=True, null=True, verbose_name='Atualizada em')),
+                ('concluida_em', models.DateTimeField(blank=True, null=True, verbose_name='Concluída em')),
+            ],
+            options={
+                'verbose_name': 'Tarefa',
+                'verbose_name_plural': 'Tarefas',
+                'ordering': ['-id'],
+                'indexes': [models.Index(fields=['status', 'id'], name='tarefa_status_idx')],
+            },
+        ),
+    ]
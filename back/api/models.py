@@ -1,61 +1,32 @@
+from datetime import timedelta
+
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
-from sqlalchemy import create_engine, Column, Integer, String, DateTime, ForeignKey, Text
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker, relationship
-from datetime import datetime
+from django.utils import timezone
 
-# SQLAlchemy Base
-Base = declarative_base()
+class EstadoCarregadoMixin:
+    """
+    Guarda em `_estado_carregado` os valores lidos do banco ({attname: valor}),
+    para que o histórico registre só o que mudou sem reler a linha (ver api.historico)
+    """
 
-# SQLAlchemy Models
-class University(Base):
-    __tablename__ = 'universities'
-    
-    id = Column(Integer, primary_key=True)
-    name = Column(String(200), nullable=False)
-    country = Column(String(100), nullable=False)
-    city = Column(String(100), nullable=False)
-    website = Column(String(255))
-    established_year = Column(Integer)
-    description = Column(Text)
-    created_at = Column(DateTime, default=datetime.utcnow)
-    
-    # Relationship
-    courses = relationship("Course", back_populates="university")
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instancia = super().from_db(db, field_names, values)
+        instancia._estado_carregado = dict(zip(field_names, values))
+        return instancia
 
-class Course(Base):
-    __tablename__ = 'courses'
-    
-    id = Column(Integer, primary_key=True)
-    name = Column(String(200), nullable=False)
-    code = Column(String(20), nullable=False)
-    duration_months = Column(Integer)
-    language = Column(String(50))
-    tuition_fee = Column(Integer)  # Em euros
-    description = Column(Text)
-    university_id = Column(Integer, ForeignKey('universities.id'))
-    created_at = Column(DateTime, default=datetime.utcnow)
-    
-    # Relationship
-    university = relationship("University", back_populates="courses")
-    students = relationship("Student", back_populates="course")
+class UniversityQuerySet(models.QuerySet):
+    def com_contagens(self):
+        """Anota cada universidade com courses_count no mesmo SELECT (GROUP BY)"""
+        return self.annotate(courses_count=models.Count('courses'))
 
-class Student(Base):
-    __tablename__ = 'students'
-    
-    id = Column(Integer, primary_key=True)
-    first_name = Column(String(100), nullable=False)
-    last_name = Column(String(100), nullable=False)
-    email = Column(String(255), unique=True, nullable=False)
-    nationality = Column(String(100))
-    birth_date = Column(DateTime)
-    enrollment_date = Column(DateTime, default=datetime.utcnow)
-    course_id = Column(Integer, ForeignKey('courses.id'))
-    
-    # Relationship
-    course = relationship("Course", back_populates="students")
+    def com_cursos(self):
+        """Contagens e, em uma consulta a mais, os cursos já anotados (UniversityDetailSerializer)"""
+        return self.com_contagens().prefetch_related(
+            models.Prefetch('courses', queryset=CourseDjango.objects.com_contagens().order_by('id'))
+        )
 
-# Django Models (para compatibilidade)
 class UniversityDjango(models.Model):
     name = models.CharField(max_length=200)
     country = models.CharField(max_length=100)
@@ -64,6 +35,8 @@ class UniversityDjango(models.Model):
     established_year = models.IntegerField(null=True, blank=True)
     description = models.TextField(blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
+
+    objects = UniversityQuerySet.as_manager()
     
     class Meta:
         verbose_name = "University"
@@ -72,6 +45,17 @@ class UniversityDjango(models.Model):
     def __str__(self):
         return self.name
 
+class CourseQuerySet(models.QuerySet):
+    def com_contagens(self):
+        """Carrega a universidade (JOIN) e anota students_count no mesmo SELECT"""
+        return self.select_related('university').annotate(students_count=models.Count('students'))
+
+    def com_estudantes(self):
+        """Contagens e, em uma consulta a mais, os estudantes com curso e universidade (CourseDetailSerializer)"""
+        return self.com_contagens().prefetch_related(
+            models.Prefetch('students', queryset=StudentDjango.objects.com_curso().order_by('id'))
+        )
+
 class CourseDjango(models.Model):
     name = models.CharField(max_length=200)
     code = models.CharField(max_length=20)
@@ -81,10 +65,17 @@ class CourseDjango(models.Model):
     description = models.TextField(blank=True)
     university = models.ForeignKey(UniversityDjango, on_delete=models.CASCADE, related_name='courses')
     created_at = models.DateTimeField(auto_now_add=True)
+
+    objects = CourseQuerySet.as_manager()
     
     def __str__(self):
         return f"{self.code} - {self.name}"
 
+class StudentQuerySet(models.QuerySet):
+    def com_curso(self):
+        """Carrega curso e universidade no mesmo SELECT, para course_name e university_name"""
+        return self.select_related('course__university')
+
 class StudentDjango(models.Model):
     first_name = models.CharField(max_length=100)
     last_name = models.CharField(max_length=100)
@@ -94,10 +85,28 @@ class StudentDjango(models.Model):
     enrollment_date = models.DateTimeField(auto_now_add=True)
     course = models.ForeignKey(CourseDjango, on_delete=models.CASCADE, related_name='students')
 
+    objects = StudentQuerySet.as_manager()
+
     def __str__(self):
         return f"{self.first_name} {self.last_name}"
 
-class UnidadeDjango(models.Model):
+class UnidadeQuerySet(models.QuerySet):
+    def com_resumo_falhas(self):
+        """
+        Anota cada unidade com total_falhas, falhas_ativas e os dados da falha
+        mais recente (ultima_falha_*), tudo em um único SELECT agregado.
+        """
+        ultima = FalhaDjango.objects.filter(unidade=models.OuterRef('pk')).order_by('-data_falha', '-created_at', '-id')
+        return self.annotate(
+            total_falhas=models.Count('falhas'),
+            falhas_ativas=models.Count('falhas', filter=models.Q(falhas__ativa=True)),
+            ultima_falha_id=models.Subquery(ultima.values('id')[:1]),
+            ultima_falha_ocorrida=models.Subquery(ultima.values('falha_ocorrida')[:1]),
+            ultima_falha_data=models.Subquery(ultima.values('data_falha')[:1]),
+            ultima_falha_ativa=models.Subquery(ultima.values('ativa')[:1]),
+        )
+
+class UnidadeDjango(EstadoCarregadoMixin, models.Model):
     nome_unidade = models.CharField(max_length=200, verbose_name="Nome da Unidade")
     grupo_unidade = models.CharField(max_length=100, verbose_name="Grupo")
     tecnico_unidade = models.CharField(max_length=200, blank=True, verbose_name="Técnico da Unidade")
@@ -106,27 +115,274 @@ class UnidadeDjango(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = UnidadeQuerySet.as_manager()
+
     class Meta:
         verbose_name = "Unidade"
         verbose_name_plural = "Unidades"
         ordering = ['nome_unidade']
+        indexes = [
+            models.Index(fields=['nome_unidade', 'id'], name='unidade_nome_id_idx'),
+            models.Index(fields=['updated_at', 'id'], name='unidade_updated_id_idx'),
+            models.Index(fields=['grupo_unidade', 'id'], name='unidade_grupo_id_idx'),
+        ]
 
     def __str__(self):
         return f"{self.nome_unidade} ({self.id_unidade})"
 
-class FalhaDjango(models.Model):
+class FalhaQuerySet(models.QuerySet):
+    def com_unidade(self):
+        """Carrega a unidade no mesmo SELECT (JOIN), apenas com as colunas usadas pelo FalhaSerializer"""
+        return self.select_related('unidade').only(
+            'id', 'unidade', 'unidade__nome_unidade', 'falha_ocorrida', 'data_falha',
+            'observacao', 'ativa', 'resolvida_em', 'created_at', 'updated_at',
+        )
+
+# api_falhadjango e api_unidadedjango têm triggers em SQL bruto que mantêm a
+# busca FTS5 (migração 0009, api.busca.TRIGGERS_BUSCA). Migrações que refazem
+# essas tabelas no SQLite os descartam; o post_migrate os recria.
+class FalhaDjango(EstadoCarregadoMixin, models.Model):
     unidade = models.ForeignKey(UnidadeDjango, on_delete=models.CASCADE, related_name='falhas', verbose_name="Unidade")
     falha_ocorrida = models.CharField(max_length=500, verbose_name="Falha Ocorrida")
     data_falha = models.DateField(verbose_name="Data da Falha")
     observacao = models.TextField(blank=True, verbose_name="Observação")
     ativa = models.BooleanField(default=True, verbose_name="Ativa")
+    # Momento em que a falha deixou de estar ativa (base do MTTR, ver api.confiabilidade)
+    resolvida_em = models.DateTimeField(null=True, blank=True, verbose_name="Resolvida em")
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = FalhaQuerySet.as_manager()
+
     class Meta:
         verbose_name = "Falha"
         verbose_name_plural = "Falhas"
         ordering = ['-data_falha', '-created_at']
+        indexes = [
+            models.Index(fields=['unidade', 'ativa', 'data_falha'], name='falha_unidade_ativa_data_idx'),
+            models.Index(fields=['ativa', 'data_falha'], name='falha_ativa_data_idx'),
+            models.Index(fields=['unidade', '-data_falha', '-created_at'], name='falha_unidade_data_idx'),
+            models.Index(fields=['-data_falha', '-created_at', '-id'], name='falha_data_created_id_idx'),
+            models.Index(fields=['updated_at', 'id'], name='falha_updated_id_idx'),
+        ]
 
     def __str__(self):
         return f"{self.unidade.nome_unidade} - {self.falha_ocorrida}"
+
+    def save(self, *args, **kwargs):
+        self.marcar_resolucao()
+        super().save(*args, **kwargs)
+
+    def marcar_resolucao(self, agora=None):
+        """
+        Preenche resolvida_em quando uma falha lida como ativa passa a
+        resolvida, e limpa ao reabrir. Falhas já criadas como resolvidas
+        ficam sem data (o tempo de reparo é desconhecido).
+        """
+        if self.ativa:
+            self.resolvida_em = None
+        elif self.resolvida_em is None and getattr(self, '_estado_carregado', {}).get('ativa'):
+            self.resolvida_em = agora or timezone.now()
+
+class ResumoDiarioFalhasDjango(models.Model):
+    """Contagem diária de falhas por unidade, mantida incrementalmente (ver api.rollup)"""
+    unidade = models.ForeignKey(UnidadeDjango, on_delete=models.CASCADE, related_name='resumos_diarios', verbose_name="Unidade")
+    data = models.DateField(verbose_name="Data")
+    ativas = models.PositiveIntegerField(default=0, verbose_name="Falhas Ativas")
+    resolvidas = models.PositiveIntegerField(default=0, verbose_name="Falhas Resolvidas")
+
+    class Meta:
+        verbose_name = "Resumo Diário de Falhas"
+        verbose_name_plural = "Resumos Diários de Falhas"
+        ordering = ['data', 'unidade']
+        constraints = [
+            models.UniqueConstraint(fields=['unidade', 'data'], name='resumo_diario_unidade_data_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['data', 'unidade'], name='resumo_diario_data_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.unidade_id} - {self.data}: {self.ativas} ativas, {self.resolvidas} resolvidas"
+
+class ConfiabilidadeUnidadeDjango(models.Model):
+    """Contadores de confiabilidade por unidade, mantidos incrementalmente (ver api.confiabilidade)"""
+    unidade = models.OneToOneField(
+        UnidadeDjango, on_delete=models.CASCADE, primary_key=True, related_name='confiabilidade', verbose_name="Unidade",
+    )
+    falhas = models.PositiveIntegerField(default=0, verbose_name="Falhas")
+    abertas = models.PositiveIntegerField(default=0, verbose_name="Falhas Abertas")
+    primeira_falha = models.DateField(null=True, verbose_name="Primeira Falha")
+    ultima_falha = models.DateField(null=True, verbose_name="Última Falha")
+    reparos = models.PositiveIntegerField(default=0, verbose_name="Reparos com Duração")
+    tempo_reparo = models.DurationField(default=timedelta(0), verbose_name="Tempo Total de Reparo")
+
+    class Meta:
+        verbose_name = "Confiabilidade da Unidade"
+        verbose_name_plural = "Confiabilidade das Unidades"
+
+    def __str__(self):
+        return f"{self.unidade_id}: {self.falhas} falhas, {self.abertas} abertas"
+
+class OcorrenciaFalhaDjango(models.Model):
+    """Quantas falhas de cada falha_ocorrida uma unidade tem (ver api.confiabilidade)"""
+    unidade = models.ForeignKey(UnidadeDjango, on_delete=models.CASCADE, related_name='ocorrencias', verbose_name="Unidade")
+    falha_ocorrida = models.CharField(max_length=500, verbose_name="Falha Ocorrida")
+    total = models.PositiveIntegerField(default=0, verbose_name="Total")
+
+    class Meta:
+        verbose_name = "Ocorrência de Falha"
+        verbose_name_plural = "Ocorrências de Falhas"
+        constraints = [
+            models.UniqueConstraint(fields=['unidade', 'falha_ocorrida'], name='ocorrencia_unidade_falha_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.unidade_id} - {self.falha_ocorrida}: {self.total}"
+
+class AbertasGrupoDjango(models.Model):
+    """Falhas abertas por grupo_unidade e data da falha (ver api.confiabilidade)"""
+    grupo_unidade = models.CharField(max_length=100, verbose_name="Grupo")
+    data = models.DateField(verbose_name="Data")
+    total = models.PositiveIntegerField(default=0, verbose_name="Total")
+
+    class Meta:
+        verbose_name = "Falhas Abertas do Grupo"
+        verbose_name_plural = "Falhas Abertas dos Grupos"
+        constraints = [
+            models.UniqueConstraint(fields=['grupo_unidade', 'data'], name='abertas_grupo_data_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.grupo_unidade} - {self.data}: {self.total}"
+
+class OcorrenciaGrupoDjango(models.Model):
+    """Quantas falhas de cada falha_ocorrida um grupo_unidade tem (ver api.confiabilidade)"""
+    grupo_unidade = models.CharField(max_length=100, verbose_name="Grupo")
+    falha_ocorrida = models.CharField(max_length=500, verbose_name="Falha Ocorrida")
+    total = models.PositiveIntegerField(default=0, verbose_name="Total")
+
+    class Meta:
+        verbose_name = "Ocorrência de Falha no Grupo"
+        verbose_name_plural = "Ocorrências de Falhas nos Grupos"
+        constraints = [
+            models.UniqueConstraint(fields=['grupo_unidade', 'falha_ocorrida'], name='ocorrencia_grupo_falha_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.grupo_unidade} - {self.falha_ocorrida}: {self.total}"
+
+class VersaoTabelaDjango(models.Model):
+    """Contador de versão por tabela, incrementado a cada gravação (ver api.cache)"""
+    tabela = models.CharField(max_length=50, primary_key=True, verbose_name="Tabela")
+    versao = models.PositiveBigIntegerField(default=1, verbose_name="Versão")
+    modificado_em = models.DateTimeField(verbose_name="Modificado em")
+
+    class Meta:
+        verbose_name = "Versão de Tabela"
+        verbose_name_plural = "Versões de Tabelas"
+
+    def __str__(self):
+        return f"{self.tabela} v{self.versao}"
+
+class RegistroExcluidoDjango(models.Model):
+    """Marca de exclusão (tombstone) de uma unidade ou falha, usada pela sincronização incremental (ver api.sync)"""
+    tabela = models.CharField(max_length=50, verbose_name="Tabela")
+    registro_id = models.BigIntegerField(verbose_name="ID do Registro")
+    excluido_em = models.DateTimeField(default=timezone.now, verbose_name="Excluído em")
+
+    class Meta:
+        verbose_name = "Registro Excluído"
+        verbose_name_plural = "Registros Excluídos"
+        ordering = ['excluido_em', 'id']
+        indexes = [
+            models.Index(fields=['excluido_em', 'id'], name='registro_excluido_em_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.tabela} #{self.registro_id} excluído em {self.excluido_em}"
+
+class HistoricoImutavel(Exception):
+    """Tentativa de alterar ou excluir um evento do histórico"""
+
+class HistoricoQuerySet(models.QuerySet):
+    def update(self, **kwargs):
+        raise HistoricoImutavel('O histórico só aceita inserções')
+
+    def delete(self):
+        raise HistoricoImutavel('O histórico só aceita inserções')
+
+class HistoricoDjango(models.Model):
+    """
+    Evento do histórico de falhas e unidades, só de inserção (ver api.historico).
+    A unidade não é chave estrangeira no banco: o histórico sobrevive à exclusão.
+    """
+    TIPOS = [('falha', 'Falha'), ('unidade', 'Unidade')]
+    ACOES = [('created', 'Criação'), ('updated', 'Alteração'), ('deleted', 'Exclusão')]
+
+    unidade = models.ForeignKey(
+        UnidadeDjango, on_delete=models.DO_NOTHING, db_constraint=False,
+        related_name='historico', verbose_name="Unidade",
+    )
+    tipo = models.CharField(max_length=10, choices=TIPOS, verbose_name="Tipo")
+    registro_id = models.BigIntegerField(verbose_name="ID do Registro")
+    acao = models.CharField(max_length=10, choices=ACOES, verbose_name="Ação")
+    dados = models.JSONField(default=dict, encoder=DjangoJSONEncoder, verbose_name="Dados")
+    momento = models.DateTimeField(default=timezone.now, verbose_name="Momento")
+
+    objects = HistoricoQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = "Evento do Histórico"
+        verbose_name_plural = "Histórico"
+        ordering = ['-momento', '-id']
+        indexes = [
+            models.Index(fields=['unidade', 'momento', 'id'], name='historico_unidade_momento_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.tipo} #{self.registro_id} {self.acao} em {self.momento}"
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise HistoricoImutavel('O histórico só aceita inserções')
+        super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        raise HistoricoImutavel('O histórico só aceita inserções')
+
+class TarefaDjango(models.Model):
+    """Tarefa executada em segundo plano: exportação, importação ou reconstrução (ver api.tarefas)"""
+    TIPOS = [('exportacao', 'Exportação'), ('importacao', 'Importação'), ('reconstrucao', 'Reconstrução')]
+    STATUS = [
+        ('pendente', 'Pendente'), ('executando', 'Executando'), ('concluida', 'Concluída'), ('falhou', 'Falhou'),
+    ]
+
+    tipo = models.CharField(max_length=20, choices=TIPOS, verbose_name="Tipo")
+    status = models.CharField(max_length=20, choices=STATUS, default='pendente', verbose_name="Status")
+    parametros = models.JSONField(default=dict, encoder=DjangoJSONEncoder, verbose_name="Parâmetros")
+    # Caminhos, em API_TAREFAS['DIRETORIO'], do arquivo enviado e do arquivo gerado
+    entrada = models.CharField(max_length=500, blank=True, verbose_name="Arquivo de entrada")
+    arquivo = models.CharField(max_length=500, blank=True, verbose_name="Arquivo de resultado")
+    progresso = models.PositiveBigIntegerField(default=0, verbose_name="Progresso")
+    total = models.PositiveBigIntegerField(null=True, blank=True, verbose_name="Total")
+    resultado = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder, verbose_name="Resultado")
+    erro = models.TextField(blank=True, verbose_name="Erro")
+    # Processo (host:pid) que reservou a tarefa
+    executor = models.CharField(max_length=100, blank=True, verbose_name="Executor")
+    criada_em = models.DateTimeField(default=timezone.now, verbose_name="Criada em")
+    iniciada_em = models.DateTimeField(null=True, blank=True, verbose_name="Iniciada em")
+    # Renovado enquanto a tarefa executa; parado há muito tempo, o processo caiu
+    atualizada_em = models.DateTimeField(null=True, blank=True, verbose_name="Atualizada em")
+    concluida_em = models.DateTimeField(null=True, blank=True, verbose_name="Concluída em")
+
+    class Meta:
+        verbose_name = "Tarefa"
+        verbose_name_plural = "Tarefas"
+        ordering = ['-id']
+        indexes = [
+            models.Index(fields=['status', 'id'], name='tarefa_status_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.tipo} #{self.pk} ({self.status})"
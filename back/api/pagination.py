@@ -0,0 +1,157 @@
+import base64
+import binascii
+import json
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from .filters import FiltroInvalido, parse_bool, parse_int
+
+
+def get_pagination_setting(nome):
+    """Lê uma opção de API_PAGINATION em settings, com valores padrão"""
+    padroes = {
+        'DEFAULT_PAGE_SIZE': 100,
+        'MAX_PAGE_SIZE': 1000,
+        'PAGINATE_BY_DEFAULT': False,
+    }
+    return getattr(settings, 'API_PAGINATION', {}).get(nome, padroes[nome])
+
+
+def get_params(request):
+    """Parâmetros de consulta de um Request do DRF ou de um HttpRequest (views assíncronas)"""
+    return getattr(request, 'query_params', request.GET)
+
+
+class KeysetPagination(BasePagination):
+    """
+    Paginação por cursor (keyset) seguindo uma ordenação fixa.
+
+    Em vez de OFFSET, cada página continua a partir dos valores da última
+    linha entregue (WHERE (a, b, id) > (...)), então o custo de uma página
+    não depende da profundidade. A ordenação precisa terminar em um campo
+    único (id) para que o cursor seja determinístico.
+
+    A paginação é opcional: só é aplicada quando o cliente envia `cursor`
+    ou `page_size` (ou quando PAGINATE_BY_DEFAULT está ativo e o cliente
+    não envia `paginate=false`). Sem isso a lista completa é retornada,
+    como antes.
+    """
+    ordering = ('id',)
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    paginate_query_param = 'paginate'
+
+    def __init__(self, ordering=None):
+        if ordering is not None:
+            self.ordering = tuple(ordering)
+
+    def deve_paginar(self, request):
+        params = get_params(request)
+        if self.paginate_query_param in params:
+            return parse_bool(self.paginate_query_param, params[self.paginate_query_param])
+        if self.cursor_query_param in params or self.page_size_query_param in params:
+            return True
+        return get_pagination_setting('PAGINATE_BY_DEFAULT')
+
+    def get_page_size(self, request):
+        valor = get_params(request).get(self.page_size_query_param)
+        if not valor:
+            return get_pagination_setting('DEFAULT_PAGE_SIZE')
+        page_size = parse_int(self.page_size_query_param, valor)
+        if page_size < 1:
+            raise FiltroInvalido(f"'{self.page_size_query_param}' deve ser maior que zero")
+        return min(page_size, get_pagination_setting('MAX_PAGE_SIZE'))
+
+    def paginate_queryset(self, queryset, request, view=None):
+        """Retorna a página como lista, ou None se a paginação não foi pedida"""
+        queryset = self.preparar(queryset, request)
+        if queryset is None:
+            return None
+        # Busca uma linha a mais apenas para saber se existe próxima página
+        return self.definir_pagina(list(queryset[:self.page_size + 1]))
+
+    async def apaginate_queryset(self, queryset, request):
+        """Versão de paginate_queryset() para views assíncronas"""
+        queryset = self.preparar(queryset, request)
+        if queryset is None:
+            return None
+        return self.definir_pagina([obj async for obj in queryset[:self.page_size + 1]])
+
+    def preparar(self, queryset, request):
+        """Ordena e aplica o cursor; None se a paginação não foi pedida"""
+        if not self.deve_paginar(request):
+            return None
+
+        self.request = request
+        self.page_size = self.get_page_size(request)
+
+        queryset = queryset.order_by(*self.ordering)
+        cursor = get_params(request).get(self.cursor_query_param)
+        if cursor:
+            try:
+                queryset = queryset.filter(self.filtro_apos(self.decodificar_cursor(cursor)))
+            except (ValidationError, TypeError, ValueError):
+                raise FiltroInvalido("Cursor inválido")
+        return queryset
+
+    def definir_pagina(self, linhas):
+        self.tem_proxima = len(linhas) > self.page_size
+        self.pagina = linhas[:self.page_size]
+        return self.pagina
+
+    def get_paginated_response(self, data):
+        return Response(self.get_paginated_data(data))
+
+    def get_paginated_data(self, data):
+        return {
+            'next': self.get_next_link(),
+            'results': data,
+        }
+
+    def get_next_link(self):
+        if not self.tem_proxima:
+            return None
+        url = self.request.build_absolute_uri()
+        url = remove_query_param(url, self.paginate_query_param)
+        url = replace_query_param(url, self.page_size_query_param, self.page_size)
+        return replace_query_param(url, self.cursor_query_param, self.codificar_cursor(self.pagina[-1]))
+
+    def campos(self):
+        return [(campo.lstrip('-'), campo.startswith('-')) for campo in self.ordering]
+
+    def codificar_cursor(self, obj):
+        valores = []
+        for nome, _ in self.campos():
+            valor = getattr(obj, nome)
+            valores.append(valor.isoformat() if hasattr(valor, 'isoformat') else valor)
+        return base64.urlsafe_b64encode(json.dumps(valores).encode()).decode()
+
+    def decodificar_cursor(self, cursor):
+        try:
+            valores = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        except (binascii.Error, ValueError):
+            raise FiltroInvalido("Cursor inválido")
+        # Os cursores gerados aqui só têm valores simples, um por campo da ordenação
+        if not isinstance(valores, list) or len(valores) != len(self.ordering) \
+                or any(isinstance(valor, (list, dict)) for valor in valores):
+            raise FiltroInvalido("Cursor inválido")
+        return valores
+
+    def filtro_apos(self, valores):
+        """
+        Monta a condição "linha vem depois do cursor" para a ordenação:
+        (a > va) OR (a = va AND b > vb) OR (a = va AND b = vb AND id > vid),
+        trocando > por < nos campos descendentes.
+        """
+        condicao = Q()
+        iguais = {}
+        for (nome, descendente), valor in zip(self.campos(), valores):
+            lookup = 'lt' if descendente else 'gt'
+            condicao |= Q(**iguais, **{f'{nome}__{lookup}': valor})
+            iguais[nome] = valor
+        return condicao
@@ -0,0 +1,152 @@
+"""
+Manutenção incremental de ResumoDiarioFalhasDjango.
+
+Cada falha conta 1 na linha (unidade, data_falha) do resumo, na coluna
+`ativas` ou `resolvidas`. As views chamam estas funções dentro da mesma
+transação que grava a falha, então o resumo nunca diverge da tabela de
+falhas; `reconstruir_resumo_diario()` refaz tudo do zero.
+"""
+from collections import Counter
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q
+
+from .cache import incrementar_versao
+from .models import FalhaDjango, ResumoDiarioFalhasDjango
+
+
+def chave_resumo(falha):
+    """Tupla (unidade_id, data, ativa) que identifica onde a falha é contada"""
+    return (falha.unidade_id, falha.data_falha, falha.ativa)
+
+
+def aplicar_delta(unidade_id, data, ativa, delta):
+    """Soma `delta` à contagem de ativas/resolvidas da linha (unidade, data)"""
+    campo = 'ativas' if ativa else 'resolvidas'
+    resumos = ResumoDiarioFalhasDjango.objects.filter(unidade_id=unidade_id, data=data)
+
+    if delta < 0:
+        resumos = resumos.filter(**{f'{campo}__gte': -delta})
+    if resumos.update(**{campo: F(campo) + delta}):
+        if delta < 0:
+            ResumoDiarioFalhasDjango.objects.filter(unidade_id=unidade_id, data=data, ativas=0, resolvidas=0).delete()
+        return
+
+    if delta < 0:
+        # Nada a decrementar: o resumo já estava defasado (ver rebuild_falhas_rollup)
+        return
+    try:
+        with transaction.atomic():
+            ResumoDiarioFalhasDjango.objects.create(unidade_id=unidade_id, data=data, **{campo: delta})
+    except IntegrityError:
+        # Outra requisição criou a linha entre o UPDATE e o INSERT
+        resumos.update(**{campo: F(campo) + delta})
+
+
+def registrar_criacao(falha):
+    aplicar_delta(*chave_resumo(falha), 1)
+
+
+def registrar_exclusao(falha):
+    aplicar_delta(*chave_resumo(falha), -1)
+
+
+def registrar_alteracao(chave_anterior, falha):
+    """Move a contagem quando unidade, data_falha ou ativa mudam"""
+    chave_nova = chave_resumo(falha)
+    if chave_nova == chave_anterior:
+        return
+    aplicar_delta(*chave_anterior, -1)
+    aplicar_delta(*chave_nova, 1)
+
+
+# Acima deste número de linhas (unidade, dia) afetadas, registrar_lote troca
+# os UPDATEs individuais por uma leitura + bulk_update/bulk_create
+LIMITE_DELTAS_INDIVIDUAIS = 20
+
+
+def registrar_lote(removidas=(), adicionadas=()):
+    """
+    Aplica de uma vez as mudanças de uma operação em lote: `removidas` e
+    `adicionadas` são chaves de chave_resumo(). O custo depende do número de
+    pares (unidade, dia) distintos, não do número de falhas.
+    """
+    deltas = Counter(adicionadas)
+    deltas.subtract(removidas)
+
+    por_linha = {}
+    for (unidade_id, data, ativa), delta in deltas.items():
+        if delta:
+            ativas, resolvidas = por_linha.get((unidade_id, data), (0, 0))
+            por_linha[(unidade_id, data)] = (ativas + delta, resolvidas) if ativa else (ativas, resolvidas + delta)
+
+    if len(por_linha) <= LIMITE_DELTAS_INDIVIDUAIS:
+        for (unidade_id, data, ativa), delta in deltas.items():
+            if delta:
+                aplicar_delta(unidade_id, data, ativa, delta)
+        return
+
+    with transaction.atomic():
+        aplicar_deltas_em_massa(por_linha)
+
+
+def aplicar_deltas_em_massa(por_linha):
+    """Lê as linhas afetadas do resumo de uma vez e grava com bulk_update/bulk_create"""
+    unidades = {unidade_id for unidade_id, _ in por_linha}
+    datas = {data for _, data in por_linha}
+    existentes = {
+        (resumo.unidade_id, resumo.data): resumo
+        for resumo in ResumoDiarioFalhasDjango.objects.select_for_update()
+        .filter(unidade_id__in=unidades, data__in=datas)
+    }
+
+    atualizar, criar, vazias = [], [], []
+    for (unidade_id, data), (delta_ativas, delta_resolvidas) in por_linha.items():
+        resumo = existentes.get((unidade_id, data))
+        if resumo is None:
+            # Decrementos sem linha só ocorrem com o resumo defasado (ver rebuild_falhas_rollup)
+            resumo = ResumoDiarioFalhasDjango(unidade_id=unidade_id, data=data)
+            resumo.ativas, resumo.resolvidas = max(delta_ativas, 0), max(delta_resolvidas, 0)
+            if resumo.ativas or resumo.resolvidas:
+                criar.append(resumo)
+            continue
+        resumo.ativas = max(resumo.ativas + delta_ativas, 0)
+        resumo.resolvidas = max(resumo.resolvidas + delta_resolvidas, 0)
+        if resumo.ativas or resumo.resolvidas:
+            atualizar.append(resumo)
+        else:
+            vazias.append(resumo.pk)
+
+    ResumoDiarioFalhasDjango.objects.bulk_update(atualizar, ['ativas', 'resolvidas'], batch_size=500)
+    ResumoDiarioFalhasDjango.objects.bulk_create(criar, batch_size=500)
+    if vazias:
+        ResumoDiarioFalhasDjango.objects.filter(pk__in=vazias).delete()
+
+
+@transaction.atomic
+def reconstruir_resumo_diario(batch_size=1000):
+    """Recalcula todo o resumo diário a partir de FalhaDjango; retorna o número de linhas"""
+    ResumoDiarioFalhasDjango.objects.all().delete()
+    linhas = (
+        FalhaDjango.objects.order_by()
+        .values('unidade_id', 'data_falha')
+        .annotate(
+            ativas=Count('id', filter=Q(ativa=True)),
+            resolvidas=Count('id', filter=Q(ativa=False)),
+        )
+    )
+    resumos = ResumoDiarioFalhasDjango.objects.bulk_create(
+        (
+            ResumoDiarioFalhasDjango(
+                unidade_id=linha['unidade_id'],
+                data=linha['data_falha'],
+                ativas=linha['ativas'],
+                resolvidas=linha['resolvidas'],
+            )
+            for linha in linhas.iterator()
+        ),
+        batch_size=batch_size,
+    )
+    # As estatísticas em cache foram calculadas sobre o resumo anterior
+    incrementar_versao('falhas')
+    return len(resumos)
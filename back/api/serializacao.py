@@ -0,0 +1,171 @@
+"""
+Caminho rápido de serialização para as listagens grandes (falhas e unidades).
+
+Em vez de instanciar um modelo e percorrer os campos do serializer a cada
+linha, as colunas são derivadas uma vez do serializer (nome, caminho para
+.values_list() e conversão) e as linhas saem direto de .values_list(). Datas e
+datas/horas passam pelo to_representation do próprio campo do serializer;
+texto, inteiros, booleanos e chaves estrangeiras já chegam do banco no
+formato final.
+
+Dois formatos de resposta, escolhidos pelo cabeçalho Accept:
+
+- application/json (padrão): a mesma lista de objetos, byte a byte, que o
+  serializer com o JSONRenderer do DRF produziria;
+- application/vnd.eurounimanager.colunas+json: {"fields": [...], "rows":
+  [[...], ...]}, sem repetir os nomes dos campos em cada linha.
+
+Com o pacote opcional orjson (`pip install orjson`) a codificação do JSON
+usa orjson; sem ele, json.dumps com as mesmas opções do JSONRenderer. Os
+bytes são os mesmos nos dois casos.
+"""
+import json
+from functools import lru_cache
+
+from django.http import HttpResponse
+from rest_framework import ISO_8601, serializers
+from rest_framework.settings import api_settings
+
+from .metricas import JSONRendererMedido, medir_serializacao
+from .pagination import KeysetPagination
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+MEDIA_TYPE_COLUNAS = 'application/vnd.eurounimanager.colunas+json'
+
+# Campos cujo valor lido por .values() já é a representação final
+CAMPOS_SEM_CONVERSAO = (
+    serializers.CharField, serializers.IntegerField, serializers.BooleanField,
+    serializers.PrimaryKeyRelatedField,
+)
+
+
+class ColunasRenderer(JSONRendererMedido):
+    """
+    Tipo de mídia do formato em colunas. As views rápidas já entregam os
+    dados prontos; registrado nas views do DRF para que a negociação de
+    conteúdo aceite o Accept.
+    """
+    media_type = MEDIA_TYPE_COLUNAS
+    format = 'colunas'
+
+
+@lru_cache(maxsize=None)
+def colunas(serializer_class):
+    """
+    (nomes, caminhos, campos) dos campos de leitura do serializer; o campo
+    é None quando o valor lido já é a representação final.
+    Campos calculados (SerializerMethodField, source='*') não têm coluna.
+    """
+    nomes, caminhos, campos = [], [], []
+    for nome, campo in serializer_class().fields.items():
+        if campo.write_only:
+            continue
+        if isinstance(campo, serializers.SerializerMethodField) or campo.source == '*':
+            raise ValueError(f'{serializer_class.__name__}.{nome} não pode ser lido de .values()')
+        nomes.append(nome)
+        caminhos.append(campo.source.replace('.', '__'))
+        campos.append(None if isinstance(campo, CAMPOS_SEM_CONVERSAO) else campo)
+    return tuple(nomes), tuple(caminhos), tuple(campos)
+
+
+def valores(queryset, serializer_class):
+    """
+    QuerySet de tuplas nomeadas com as colunas do serializer; pode ser
+    filtrado e paginado (o cursor lê os campos da ordenação por nome).
+    """
+    return queryset.values_list(*colunas(serializer_class)[1], named=True)
+
+
+def conversao(campo):
+    """
+    campo.to_representation, exceto em DateTimeField ISO 8601 com datas
+    conscientes de fuso: o fuso (get_current_timezone, que passa por um
+    asgiref.Local) é lido uma vez aqui em vez de uma vez por valor.
+    """
+    formato = getattr(campo, 'format', api_settings.DATETIME_FORMAT)
+    if not isinstance(campo, serializers.DateTimeField) or not isinstance(formato, str) \
+            or formato.lower() != ISO_8601:
+        return campo.to_representation
+    fuso = campo.timezone if hasattr(campo, 'timezone') else campo.default_timezone()
+    if fuso is None:
+        return campo.to_representation
+
+    def data_hora(valor):
+        if valor.tzinfo is None:
+            return campo.to_representation(valor)
+        texto = valor.astimezone(fuso).isoformat()
+        return texto[:-6] + 'Z' if texto.endswith('+00:00') else texto
+    return data_hora
+
+
+def converter(linhas, serializer_class):
+    """Listas na ordem dos campos; só as colunas com conversão são tocadas, e None continua null"""
+    conversoes = [
+        (indice, conversao(campo)) for indice, campo in enumerate(colunas(serializer_class)[2]) if campo
+    ]
+    resultado = []
+    for tupla in linhas:
+        linha = list(tupla)
+        for indice, converte in conversoes:
+            if linha[indice] is not None:
+                linha[indice] = converte(linha[indice])
+        resultado.append(linha)
+    return resultado
+
+
+def codificar(dados):
+    """JSON compacto em UTF-8, idêntico ao do JSONRenderer do DRF para str, int, bool e None"""
+    if orjson is not None:
+        conteudo = orjson.dumps(dados)
+    else:
+        conteudo = json.dumps(dados, ensure_ascii=False, allow_nan=False, separators=(',', ':')).encode()
+    # Como o JSONRenderer: separadores de linha Unicode escapados (JSON dentro de <script>)
+    return conteudo.replace('\u2028'.encode(), b'\\u2028').replace('\u2029'.encode(), b'\\u2029')
+
+
+def pede_colunas(request):
+    tipos = (parte.split(';')[0].strip() for parte in request.META.get('HTTP_ACCEPT', '').split(','))
+    return MEDIA_TYPE_COLUNAS in tipos
+
+
+def montar(linhas, serializer_class, em_colunas):
+    """Corpo da lista: objetos, como no serializer, ou {'fields', 'rows'}"""
+    nomes = colunas(serializer_class)[0]
+    linhas = converter(linhas, serializer_class)
+    if em_colunas:
+        return {'fields': list(nomes), 'rows': linhas}
+    return [dict(zip(nomes, linha)) for linha in linhas]
+
+
+def resposta(dados, em_colunas):
+    conteudo = medir_serializacao(codificar, dados)
+    return HttpResponse(conteudo, content_type=MEDIA_TYPE_COLUNAS if em_colunas else 'application/json')
+
+
+def resposta_lista(request, queryset, serializer_class, ordenacao):
+    """
+    Lista completa ou, se pedida, a página por cursor (KeysetPagination),
+    no formato pedido pelo Accept. Levanta FiltroInvalido como a paginação.
+    """
+    em_colunas = pede_colunas(request)
+    paginator = KeysetPagination(ordenacao)
+    linhas = valores(queryset, serializer_class)
+    pagina = paginator.paginate_queryset(linhas, request)
+    corpo = medir_serializacao(montar, list(linhas) if pagina is None else pagina, serializer_class, em_colunas)
+    return resposta(corpo if pagina is None else paginator.get_paginated_data(corpo), em_colunas)
+
+
+async def aresposta_lista(request, queryset, serializer_class, ordenacao):
+    """Versão de resposta_lista() para as views assíncronas"""
+    em_colunas = pede_colunas(request)
+    paginator = KeysetPagination(ordenacao)
+    linhas = valores(queryset, serializer_class)
+    pagina = await paginator.apaginate_queryset(linhas, request)
+    lidas = [linha async for linha in linhas] if pagina is None else pagina
+    corpo = medir_serializacao(montar, lidas, serializer_class, em_colunas)
+    return resposta(corpo if pagina is None else paginator.get_paginated_data(corpo), em_colunas)
@@ -1,28 +1,51 @@
 from rest_framework import serializers
-from .models import UniversityDjango, CourseDjango, StudentDjango, UnidadeDjango, FalhaDjango
+from .metricas import medir_serializacao
+from .models import UniversityDjango, CourseDjango, StudentDjango, UnidadeDjango, FalhaDjango, HistoricoDjango, TarefaDjango
 
-class UniversitySerializer(serializers.ModelSerializer):
-    courses_count = serializers.SerializerMethodField()
+class ListSerializer(serializers.ListSerializer):
+    """ListSerializer cujo .data entra no tempo de serialização da requisição, uma medição por lista"""
+
+    @property
+    def data(self):
+        return medir_serializacao(serializers.ListSerializer.data.fget, self)
+
+
+class ModelSerializer(serializers.ModelSerializer):
+    """
+    ModelSerializer cujo .data entra no tempo de serialização da requisição
+    (api.metricas). Mede-se o .data, e não o to_representation de cada
+    linha, para não pagar a medição por linha em listas (many=True usa o
+    ListSerializer acima).
+    """
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        meta = cls.__dict__.get('Meta')
+        if meta is not None and not hasattr(meta, 'list_serializer_class'):
+            meta.list_serializer_class = ListSerializer
+
+    @property
+    def data(self):
+        return medir_serializacao(serializers.ModelSerializer.data.fget, self)
+
+class UniversitySerializer(ModelSerializer):
+    # Anotação de UniversityDjango.objects.com_contagens()
+    courses_count = serializers.IntegerField(read_only=True)
     
     class Meta:
         model = UniversityDjango
         fields = ['id', 'name', 'country', 'city', 'website', 'established_year', 'description', 'created_at', 'courses_count']
-    
-    def get_courses_count(self, obj):
-        return obj.courses.count()
 
-class CourseSerializer(serializers.ModelSerializer):
+class CourseSerializer(ModelSerializer):
     university_name = serializers.CharField(source='university.name', read_only=True)
-    students_count = serializers.SerializerMethodField()
+    # Anotação de CourseDjango.objects.com_contagens()
+    students_count = serializers.IntegerField(read_only=True)
     
     class Meta:
         model = CourseDjango
         fields = ['id', 'name', 'code', 'duration_months', 'language', 'tuition_fee', 'description', 'university', 'university_name', 'created_at', 'students_count']
-    
-    def get_students_count(self, obj):
-        return obj.students.count()
 
-class StudentSerializer(serializers.ModelSerializer):
+class StudentSerializer(ModelSerializer):
     course_name = serializers.CharField(source='course.name', read_only=True)
     university_name = serializers.CharField(source='course.university.name', read_only=True)
     full_name = serializers.SerializerMethodField()
@@ -46,16 +69,75 @@ class UniversityDetailSerializer(UniversitySerializer):
     class Meta(UniversitySerializer.Meta):
         fields = UniversitySerializer.Meta.fields + ['courses']
 
-class UnidadeSerializer(serializers.ModelSerializer):
+class UnidadeSerializer(ModelSerializer):
     class Meta:
         model = UnidadeDjango
         fields = ['id', 'nome_unidade', 'grupo_unidade', 'tecnico_unidade', 'id_unidade', 'observacoes', 'created_at', 'updated_at']
         read_only_fields = ['id', 'created_at', 'updated_at']
 
-class FalhaSerializer(serializers.ModelSerializer):
+class UnidadeLoteSerializer(UnidadeSerializer):
+    """UnidadeSerializer sem o UniqueValidator de id_unidade: em lotes a unicidade é verificada com uma única consulta"""
+    class Meta(UnidadeSerializer.Meta):
+        extra_kwargs = {'id_unidade': {'validators': []}}
+
+class UnidadeRelatedField(serializers.PrimaryKeyRelatedField):
+    """
+    Igual ao PrimaryKeyRelatedField, mas quando o contexto traz `unidades_por_id`
+    (operações em lote) resolve a unidade nesse mapa em vez de um SELECT por item.
+    """
+    def to_internal_value(self, data):
+        unidades_por_id = self.context.get('unidades_por_id')
+        if unidades_por_id is None:
+            return super().to_internal_value(data)
+        try:
+            if isinstance(data, bool):
+                raise TypeError
+            pk = int(data)
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        if pk not in unidades_por_id:
+            self.fail('does_not_exist', pk_value=data)
+        return unidades_por_id[pk]
+
+class FalhaSerializer(ModelSerializer):
+    unidade = UnidadeRelatedField(queryset=UnidadeDjango.objects.all(), label="Unidade")
     unidade_nome = serializers.CharField(source='unidade.nome_unidade', read_only=True)
     
     class Meta:
         model = FalhaDjango
-        fields = ['id', 'unidade', 'unidade_nome', 'falha_ocorrida', 'data_falha', 'observacao', 'ativa', 'created_at', 'updated_at']
-        read_only_fields = ['id', 'created_at', 'updated_at']
\ No newline at end of file
+        fields = ['id', 'unidade', 'unidade_nome', 'falha_ocorrida', 'data_falha', 'observacao', 'ativa', 'resolvida_em', 'created_at', 'updated_at']
+        # resolvida_em é preenchido pelo modelo quando a falha deixa de estar ativa
+        read_only_fields = ['id', 'resolvida_em', 'created_at', 'updated_at']
+
+class UnidadeResumoSerializer(ModelSerializer):
+    """Linha compacta por unidade; lê as anotações de UnidadeDjango.objects.com_resumo_falhas()"""
+    total_falhas = serializers.IntegerField(read_only=True)
+    falhas_ativas = serializers.IntegerField(read_only=True)
+    ultima_falha = serializers.SerializerMethodField()
+
+    class Meta:
+        model = UnidadeDjango
+        fields = ['id', 'nome_unidade', 'grupo_unidade', 'tecnico_unidade', 'id_unidade', 'created_at', 'total_falhas', 'falhas_ativas', 'ultima_falha']
+
+    def get_ultima_falha(self, obj):
+        if obj.ultima_falha_id is None:
+            return None
+        return {
+            'id': obj.ultima_falha_id,
+            'falha_ocorrida': obj.ultima_falha_ocorrida,
+            'data_falha': obj.ultima_falha_data.isoformat(),
+            'ativa': obj.ultima_falha_ativa,
+        }
+
+class HistoricoSerializer(ModelSerializer):
+    class Meta:
+        model = HistoricoDjango
+        fields = ['id', 'tipo', 'registro_id', 'acao', 'dados', 'momento']
+
+class TarefaSerializer(ModelSerializer):
+    class Meta:
+        model = TarefaDjango
+        fields = [
+            'id', 'tipo', 'status', 'parametros', 'progresso', 'total', 'resultado', 'erro',
+            'criada_em', 'iniciada_em', 'concluida_em',
+        ]
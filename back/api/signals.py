@@ -0,0 +1,198 @@
+"""
+Receivers de sinais dos modelos. Conectados em ApiConfig.ready().
+
+bulk_create/bulk_update não disparam sinais: quem os usa (api.bulk,
+api.importacao) chama incrementar_versao(), registra o histórico
+(api.historico) e publica os eventos diretamente. Um delete() de queryset
+dispara os sinais linha a linha; excluir_em_lote() os dispensa e grava as
+marcas de exclusão, o histórico e os eventos de uma vez.
+"""
+import threading
+import weakref
+from contextlib import contextmanager
+
+from django.db.models import QuerySet
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from .cache import incrementar_versao
+from . import confiabilidade, eventos, historico
+from .models import (
+    UniversityDjango, CourseDjango, StudentDjango, UnidadeDjango, FalhaDjango, RegistroExcluidoDjango,
+)
+from .serializers import UnidadeSerializer, FalhaSerializer
+
+TABELAS = {
+    UniversityDjango: 'universidades',
+    CourseDjango: 'cursos',
+    StudentDjango: 'estudantes',
+    UnidadeDjango: 'unidades',
+    FalhaDjango: 'falhas',
+}
+
+# (tipo do evento, serializer dos dados) por modelo
+EVENTOS = {
+    UnidadeDjango: ('unidade', UnidadeSerializer),
+    FalhaDjango: ('falha', FalhaSerializer),
+}
+
+_local = threading.local()
+
+
+@receiver(post_save, sender=UniversityDjango)
+@receiver(post_save, sender=CourseDjango)
+@receiver(post_save, sender=StudentDjango)
+@receiver(post_save, sender=UnidadeDjango)
+@receiver(post_save, sender=FalhaDjango)
+def invalidar_ao_salvar(sender, **kwargs):
+    incrementar_versao(TABELAS[sender])
+
+
+@receiver(post_delete, sender=UniversityDjango)
+@receiver(post_delete, sender=CourseDjango)
+@receiver(post_delete, sender=StudentDjango)
+@receiver(post_delete, sender=UnidadeDjango)
+@receiver(post_delete, sender=FalhaDjango)
+def invalidar_ao_excluir(sender, origin=None, **kwargs):
+    """
+    Um delete() que remove várias linhas (queryset ou cascata de uma unidade
+    para suas falhas, de uma universidade para cursos e estudantes) dispara post_delete por linha; a versão de cada tabela
+    é incrementada só uma vez por `origin`.
+    """
+    tabela = TABELAS[sender]
+    estado = getattr(_local, 'exclusao', None)
+    if origin is None or estado is None or estado[0]() is not origin:
+        estado = (weakref.ref(origin) if origin is not None else lambda: None, set())
+        _local.exclusao = estado
+    if tabela in estado[1]:
+        return
+    estado[1].add(tabela)
+    incrementar_versao(tabela)
+
+
+@receiver(post_save, sender=UnidadeDjango)
+@receiver(post_save, sender=FalhaDjango)
+def publicar_ao_salvar(sender, instance, created, **kwargs):
+    tipo, serializer_class = EVENTOS[sender]
+    eventos.publicar(tipo, 'created' if created else 'updated', serializer_class(instance).data)
+
+
+@receiver(post_delete, sender=UnidadeDjango)
+@receiver(post_delete, sender=FalhaDjango)
+def publicar_ao_excluir(sender, instance, origin=None, **kwargs):
+    # As falhas excluídas em cascata saem num evento só (registrar_exclusao_em_cascata)
+    if em_lote(origin) or sender is FalhaDjango and excluida_com_unidade(origin):
+        return
+    tipo, _ = EVENTOS[sender]
+    dados = {'id': instance.pk}
+    if sender is FalhaDjango:
+        dados['unidade'] = instance.unidade_id
+    eventos.publicar(tipo, 'deleted', dados)
+
+
+def em_lote(origin):
+    """Se o delete partiu de excluir_em_lote(): os receivers por linha não gravam nada"""
+    return origin is not None and any(origem is origin for origem in getattr(_local, 'lotes', ()))
+
+
+@contextmanager
+def _lote(origin):
+    lotes = _local.__dict__.setdefault('lotes', [])
+    lotes.append(origin)
+    try:
+        yield
+    finally:
+        lotes.remove(origin)
+
+
+def registrar_exclusoes(modelo, linhas, unidades=None):
+    """
+    Marcas de exclusão, histórico e eventos de linhas removidas em lote
+    (dicts com 'id' e os campos de historico.campos(modelo), lidos antes do
+    delete). Falhas excluídas em cascata com as `unidades` saem num evento só.
+    """
+    RegistroExcluidoDjango.objects.bulk_create(
+        [RegistroExcluidoDjango(tabela=TABELAS[modelo], registro_id=linha['id']) for linha in linhas],
+        batch_size=1000,
+    )
+    historico.registrar_exclusoes(modelo, linhas)
+    tipo, _ = EVENTOS[modelo]
+    if unidades is not None:
+        if linhas:
+            eventos.publicar(tipo, 'deleted', {'ids': [linha['id'] for linha in linhas], 'unidades': unidades})
+        return
+    eventos.publicar_lote(tipo, 'deleted', [
+        {'id': linha['id'], 'unidade': linha['unidade_id']} if modelo is FalhaDjango else {'id': linha['id']}
+        for linha in linhas
+    ])
+
+
+def colunas_exclusao(modelo, *extras):
+    """Colunas a ler antes de um delete em lote (ver registrar_exclusoes)"""
+    return ['id', *(attname for _, attname in historico.campos(modelo)), *extras]
+
+
+def excluir_em_lote(queryset, linhas):
+    """
+    Exclui o queryset (falhas ou unidades, com as falhas em cascata) com
+    uma gravação por tabela em vez de uma por linha. `linhas` são as linhas
+    do queryset lidas com colunas_exclusao(); as falhas das unidades são
+    lidas aqui. As versões das tabelas continuam com invalidar_ao_excluir.
+    """
+    modelo = queryset.model
+    if modelo is UnidadeDjango:
+        unidades = [linha['id'] for linha in linhas]
+        falhas = list(FalhaDjango.objects.filter(unidade__in=unidades).values(*colunas_exclusao(FalhaDjango)))
+        registrar_exclusoes(FalhaDjango, falhas, unidades)
+        confiabilidade.mover_unidades({linha['id']: (linha['grupo_unidade'], None) for linha in linhas})
+    registrar_exclusoes(modelo, linhas)
+    with _lote(queryset):
+        return queryset.delete()
+
+
+def excluida_com_unidade(origin):
+    """Se o delete partiu de uma unidade (instância ou queryset), com as falhas em cascata"""
+    if isinstance(origin, QuerySet):
+        return origin.model is UnidadeDjango
+    return isinstance(origin, UnidadeDjango)
+
+
+@receiver(pre_delete, sender=UnidadeDjango)
+def registrar_exclusao_em_cascata(sender, instance, **kwargs):
+    """
+    Grava de uma vez as marcas de exclusão, o histórico e o evento das
+    falhas que serão removidas em cascata com a unidade, com uma leitura só,
+    e tira a unidade das métricas de confiabilidade do grupo
+    (uma linha por falha no post_delete deixaria a exclusão de uma unidade
+    grande várias vezes mais lenta).
+    """
+    if em_lote(kwargs.get('origin')):
+        return
+    falhas = list(instance.falhas.values(*colunas_exclusao(FalhaDjango)))
+    registrar_exclusoes(FalhaDjango, falhas, [instance.pk])
+    # As tabelas por unidade saem em cascata; as por grupo perdem as contagens da unidade
+    confiabilidade.mover_unidades({instance.pk: (instance.grupo_unidade, None)})
+
+
+@receiver(post_delete, sender=UnidadeDjango)
+@receiver(post_delete, sender=FalhaDjango)
+def registrar_exclusao(sender, instance, origin=None, **kwargs):
+    """Grava a marca de exclusão na mesma transação do delete"""
+    if em_lote(origin) or sender is FalhaDjango and excluida_com_unidade(origin):
+        return
+    RegistroExcluidoDjango.objects.create(tabela=TABELAS[sender], registro_id=instance.pk)
+
+
+@receiver(post_save, sender=UnidadeDjango)
+@receiver(post_save, sender=FalhaDjango)
+def registrar_historico_ao_salvar(sender, instance, created, **kwargs):
+    historico.registrar(instance, 'created' if created else 'updated')
+
+
+@receiver(post_delete, sender=UnidadeDjango)
+@receiver(post_delete, sender=FalhaDjango)
+def registrar_historico_ao_excluir(sender, instance, origin=None, **kwargs):
+    # As falhas excluídas em cascata já foram registradas em registrar_exclusao_em_cascata
+    if em_lote(origin) or sender is FalhaDjango and excluida_com_unidade(origin):
+        return
+    historico.registrar(instance, 'deleted')
@@ -0,0 +1,96 @@
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import Coalesce, TruncDay, TruncMonth, TruncWeek
+
+from .filters import FiltroInvalido
+
+
+# Funções de truncamento de data aceitas em ?periodo=
+PERIODOS = {
+    'dia': TruncDay,
+    'semana': TruncWeek,
+    'mes': TruncMonth,
+}
+
+# Contagens sobre FalhaDjango (uma linha por falha)
+CONTAGENS = {
+    'total': Count('id'),
+    'ativas': Count('id', filter=Q(ativa=True)),
+    'resolvidas': Count('id', filter=Q(ativa=False)),
+}
+
+# Mesmas contagens sobre ResumoDiarioFalhasDjango (uma linha por unidade e dia)
+SOMAS_RESUMO = {
+    'total': Coalesce(Sum(F('ativas') + F('resolvidas')), 0),
+    'ativas': Coalesce(Sum('ativas'), 0),
+    'resolvidas': Coalesce(Sum('resolvidas'), 0),
+}
+
+
+def get_trunc(periodo):
+    """Retorna a função de truncamento de data para o período pedido"""
+    try:
+        return PERIODOS[periodo]
+    except KeyError:
+        raise FiltroInvalido(f"Valor inválido para 'periodo': use {', '.join(PERIODOS)}")
+
+
+def consultas_agregadas(queryset, campo_data, agregados, periodo):
+    """
+    Agregações no banco (GROUP BY) por período, por grupo de unidade e no
+    total. O custo cresce com o número de grupos retornados, não com o
+    número de linhas transferidas.
+    """
+    trunc = get_trunc(periodo)
+    queryset = queryset.order_by()
+
+    por_periodo = (
+        queryset.annotate(periodo=trunc(campo_data))
+        .values('periodo')
+        .annotate(**agregados)
+        .order_by('periodo')
+    )
+    por_grupo = (
+        queryset.values(grupo=F('unidade__grupo_unidade'))
+        .annotate(**agregados)
+        .order_by('grupo')
+    )
+    return queryset, por_periodo, por_grupo
+
+
+def agregar(queryset, campo_data, agregados, periodo):
+    queryset, por_periodo, por_grupo = consultas_agregadas(queryset, campo_data, agregados, periodo)
+    return {
+        'periodo': periodo,
+        'totais': queryset.aggregate(**agregados),
+        'por_periodo': list(por_periodo),
+        'por_grupo': list(por_grupo),
+    }
+
+
+async def aagregar(queryset, campo_data, agregados, periodo):
+    """Versão de agregar() para views assíncronas"""
+    queryset, por_periodo, por_grupo = consultas_agregadas(queryset, campo_data, agregados, periodo)
+    return {
+        'periodo': periodo,
+        'totais': await queryset.aaggregate(**agregados),
+        'por_periodo': [linha async for linha in por_periodo],
+        'por_grupo': [linha async for linha in por_grupo],
+    }
+
+
+def estatisticas_falhas(falhas, periodo='dia'):
+    """Estatísticas calculadas diretamente sobre as falhas (ativas x resolvidas)"""
+    return agregar(falhas, 'data_falha', CONTAGENS, periodo)
+
+
+def estatisticas_resumo_diario(resumos, periodo='dia'):
+    """Estatísticas lidas do resumo diário: O(dias x unidades) linhas em vez de O(falhas)"""
+    return agregar(resumos, 'data', SOMAS_RESUMO, periodo)
+
+
+async def aestatisticas_falhas(falhas, periodo='dia'):
+    return await aagregar(falhas, 'data_falha', CONTAGENS, periodo)
+
+
+async def aestatisticas_resumo_diario(resumos, periodo='dia'):
+    return await aagregar(resumos, 'data', SOMAS_RESUMO, periodo)
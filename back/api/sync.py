@@ -0,0 +1,158 @@
+"""
+Sincronização incremental ("o que mudou desde") de unidades e falhas.
+
+Cada chamada devolve as linhas com updated_at depois da posição do cursor,
+os ids excluídos depois dela (RegistroExcluidoDjango, gravado pelos sinais
+de exclusão, inclusive em cascata) e um novo cursor. O custo é proporcional
+ao número de alterações, não ao tamanho das tabelas.
+
+O cursor guarda uma posição (updated_at, id) por fluxo e é percorrido por
+keyset, então páginas grandes continuam de onde pararam. Ao terminar, a
+posição é recuada até MARGEM_SEGUNDOS antes de agora: uma transação que
+gravou updated_at e ainda não tinha feito commit aparece na próxima
+sincronização. Linhas podem ser entregues mais de uma vez; o cliente aplica
+os dados por id (alterações antes das exclusões).
+"""
+import base64
+import binascii
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .filters import FiltroInvalido, parse_int
+from .models import UnidadeDjango, FalhaDjango, RegistroExcluidoDjango
+from .pagination import KeysetPagination, get_pagination_setting
+from .serializers import UnidadeSerializer, FalhaSerializer
+
+
+class CursorExpirado(Exception):
+    """O cursor é mais antigo que as marcas de exclusão guardadas"""
+
+
+CONFIG_PADRAO = {
+    'MARGEM_SEGUNDOS': 5,
+    'RETENCAO_EXCLUSOES_DIAS': 90,
+}
+
+
+def get_config(nome):
+    return getattr(settings, 'API_SYNC', {}).get(nome, CONFIG_PADRAO[nome])
+
+
+# fluxo: (queryset, campo de data, serializer)
+FLUXOS = {
+    'unidades': (lambda: UnidadeDjango.objects.all(), 'updated_at', UnidadeSerializer),
+    'falhas': (lambda: FalhaDjango.objects.com_unidade(), 'updated_at', FalhaSerializer),
+    'excluidos': (lambda: RegistroExcluidoDjango.objects.all(), 'excluido_em', None),
+}
+
+
+def codificar_cursor(posicoes):
+    return base64.urlsafe_b64encode(json.dumps(posicoes).encode()).decode()
+
+
+def decodificar_cursor(cursor):
+    try:
+        posicoes = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        for fluxo in FLUXOS:
+            momento, pk = posicoes[fluxo]
+            momento = parse_datetime(momento)
+            # Os cursores gerados aqui têm sempre o fuso; sem ele a comparação com agora falharia
+            if momento is None or timezone.is_naive(momento) or isinstance(pk, bool) or not isinstance(pk, int):
+                raise ValueError
+    except (binascii.Error, ValueError, TypeError, KeyError):
+        raise FiltroInvalido("Cursor inválido")
+    return posicoes
+
+
+def parse_since(valor):
+    """Momento ISO 8601 de ?since=; sem fuso, usa o fuso do projeto"""
+    momento = parse_datetime(valor)
+    if momento is None:
+        raise FiltroInvalido("Valor inválido para 'since': use data e hora ISO 8601")
+    if timezone.is_naive(momento):
+        momento = timezone.make_aware(momento)
+    return momento
+
+
+def posicoes_iniciais(params, agora):
+    """
+    Posição de cada fluxo: do cursor, de ?since= ou, sem nenhum dos dois,
+    o início das tabelas (carga completa). Na carga completa as exclusões
+    só interessam a partir de agora.
+    """
+    if params.get('cursor'):
+        return decodificar_cursor(params['cursor'])
+    if params.get('since'):
+        momento = parse_since(params['since']).isoformat()
+        return {fluxo: [momento, 0] for fluxo in FLUXOS}
+    return {'unidades': None, 'falhas': None, 'excluidos': [agora.isoformat(), 0]}
+
+
+def get_limite(params):
+    maximo = get_pagination_setting('MAX_PAGE_SIZE')
+    if not params.get('page_size'):
+        return maximo
+    limite = parse_int('page_size', params['page_size'])
+    if limite < 1:
+        raise FiltroInvalido("'page_size' deve ser maior que zero")
+    return min(limite, maximo)
+
+
+def ler_fluxo(fluxo, posicao, limite):
+    """Até `limite` linhas do fluxo depois de `posicao`, e se há mais"""
+    queryset, campo, _ = FLUXOS[fluxo]
+    paginacao = KeysetPagination((campo, 'id'))
+    linhas = queryset().order_by(campo, 'id')
+    if posicao is not None:
+        linhas = linhas.filter(paginacao.filtro_apos(posicao))
+    linhas = list(linhas[:limite + 1])
+    return linhas[:limite], len(linhas) > limite
+
+
+def sincronizar(params):
+    """
+    Retorna {'unidades', 'falhas', 'deleted': {'unidades', 'falhas'},
+    'cursor', 'has_more'} a partir de ?cursor=, ?since= ou do zero.
+    """
+    agora = timezone.now()
+    limite = get_limite(params)
+    posicoes = posicoes_iniciais(params, agora)
+
+    excluidos = posicoes['excluidos']
+    if parse_datetime(excluidos[0]) < agora - timedelta(days=get_config('RETENCAO_EXCLUSOES_DIAS')):
+        raise CursorExpirado('Cursor expirado: refaça a sincronização completa (sem cursor)')
+
+    resultado = {'deleted': {'unidades': [], 'falhas': []}}
+    tem_mais = False
+    limite_seguro = agora - timedelta(seconds=get_config('MARGEM_SEGUNDOS'))
+    for fluxo, (_, campo, serializer_class) in FLUXOS.items():
+        linhas, mais = ler_fluxo(fluxo, posicoes[fluxo], limite)
+        if linhas:
+            ultima = linhas[-1]
+            posicoes[fluxo] = [getattr(ultima, campo).isoformat(), ultima.pk]
+        if not mais and (posicoes[fluxo] is None or parse_datetime(posicoes[fluxo][0]) > limite_seguro):
+            # Recua até a margem para reentregar gravações ainda sem commit
+            posicoes[fluxo] = [limite_seguro.isoformat(), 0]
+        tem_mais = tem_mais or mais
+
+        if serializer_class is not None:
+            resultado[fluxo] = serializer_class(linhas, many=True).data
+        else:
+            for registro in linhas:
+                resultado['deleted'][registro.tabela].append(registro.registro_id)
+
+    resultado['cursor'] = codificar_cursor(posicoes)
+    resultado['has_more'] = tem_mais
+    return resultado
+
+
+def limpar_exclusoes(dias=None):
+    """Apaga marcas de exclusão mais antigas que a retenção; retorna quantas"""
+    dias = get_config('RETENCAO_EXCLUSOES_DIAS') if dias is None else dias
+    limite = timezone.now() - timedelta(days=dias)
+    apagados, _ = RegistroExcluidoDjango.objects.filter(excluido_em__lt=limite).delete()
+    return apagados
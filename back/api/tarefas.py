@@ -0,0 +1,460 @@
+"""
+Tarefas em segundo plano (TarefaDjango): exportações, importações e a
+reconstrução das tabelas derivadas das falhas saem da thread da requisição.
+
+Submeter uma tarefa só grava uma linha pendente; a resposta (202) traz o
+id para acompanhar o status e o progresso em /api/tarefas/{id}/ e baixar o
+resultado em /api/tarefas/{id}/resultado/.
+
+Quem executa é o Despachante, com um pool de THREADS threads. Cada
+processo web inicia o seu na primeira requisição que atende (ver
+iniciar()). Ele reserva a tarefa pendente mais antiga com um UPDATE condicional (só um
+processo ganha cada tarefa), executa e grava o resultado. O despachante
+acorda a cada submissão do próprio processo e, fora isso, consulta a
+tabela a cada INTERVALO segundos: tarefas submetidas em outro processo ou
+antes de um reinício também são executadas. Enquanto executa, a tarefa
+tem atualizada_em renovado por uma thread (Renovacao); se o processo cair,
+depois de EXPIRACAO segundos sem renovação ela é marcada como falha (uma
+importação pela metade não é repetida) e o resultado que o executor ainda
+venha a gravar é descartado. Tarefas terminadas há mais de RETENCAO_DIAS são
+apagadas junto com os arquivos.
+
+As gravações de status e progresso são UPDATEs, que não disparam sinais:
+cada uma incrementa a versão 'tarefas' (ver alterada()), da qual dependem
+as respostas de /api/tarefas/ em cache.
+
+Com INICIAR=False os processos web só gravam as tarefas, e quem executa é
+`python manage.py executar_tarefas`, em um processo separado: o trabalho
+pesado deixa de disputar CPU (e o GIL) com as requisições.
+"""
+import logging
+import os
+import socket
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DatabaseError, close_old_connections, connection, transaction
+from django.utils import timezone
+
+from . import confiabilidade, export, importacao, rollup
+from .cache import incrementar_versao
+from .filters import FiltroInvalido, filtrar_falhas
+from .models import FalhaDjango, ResumoDiarioFalhasDjango, TarefaDjango
+from .pagination import KeysetPagination
+
+logger = logging.getLogger(__name__)
+
+CONFIG_PADRAO = {
+    # Inicia um despachante em cada processo web (False: só executar_tarefas executa)
+    'INICIAR': True,
+    'THREADS': 2,
+    # Segundos entre as consultas à tabela quando não há submissões no processo
+    'INTERVALO': 5,
+    # Segundos sem renovação até uma tarefa em execução ser dada como interrompida
+    'EXPIRACAO': 600,
+    'RETENCAO_DIAS': 7,
+    # Arquivos enviados e gerados (padrão: media/tarefas)
+    'DIRETORIO': None,
+}
+
+# Filtros de /api/falhas/ aceitos nos parâmetros da exportação
+FILTROS_EXPORTACAO = ('unidade', 'ativa', 'data_inicio', 'data_fim', 'falha_ocorrida')
+
+ORDENACAO = ('-id',)
+
+
+def get_config(nome):
+    return getattr(settings, 'API_TAREFAS', {}).get(nome, CONFIG_PADRAO[nome])
+
+
+def diretorio():
+    caminho = get_config('DIRETORIO') or os.path.join(settings.BASE_DIR, 'media', 'tarefas')
+    os.makedirs(caminho, exist_ok=True)
+    return caminho
+
+
+def remover_arquivo(caminho):
+    if caminho:
+        try:
+            os.remove(caminho)
+        except FileNotFoundError:
+            pass
+
+
+def alterada(linhas):
+    """Incrementa a versão 'tarefas' se a gravação alterou alguma linha; retorna `linhas`"""
+    if linhas:
+        incrementar_versao('tarefas')
+    return linhas
+
+
+# Submissão
+
+def criar(tipo, parametros, entrada=''):
+    """Grava a tarefa pendente e acorda o despachante quando a transação for confirmada"""
+    tarefa = TarefaDjango.objects.create(tipo=tipo, parametros=parametros, entrada=entrada)
+    alterada(1)
+    transaction.on_commit(acordar)
+    return tarefa
+
+
+def parametros_exportacao(parametros):
+    """Formato e filtros da exportação, validados na submissão (levanta FiltroInvalido)"""
+    formato = export.get_formato(parametros.get('formato', 'ndjson'))
+    filtros = {
+        nome: str(parametros[nome]) for nome in FILTROS_EXPORTACAO if parametros.get(nome) not in (None, '')
+    }
+    filtrar_falhas(FalhaDjango.objects.all(), filtros)
+    return {'formato': formato, **filtros}
+
+
+# Tipos submetidos com JSON em POST /api/tarefas/; importações vêm com o
+# arquivo em /api/importacao/<tipo>/ (submeter_importacao)
+PARAMETROS = {
+    'exportacao': parametros_exportacao,
+    'reconstrucao': lambda parametros: {},
+}
+
+
+def submeter(tipo, parametros):
+    # Um tipo que não é texto (lista, objeto) não pode ser chave do dicionário
+    if not isinstance(tipo, str) or tipo not in PARAMETROS:
+        raise FiltroInvalido(
+            f"Tipo inválido: use {', '.join(PARAMETROS)} (importações em /api/importacao/<tipo>/)"
+        )
+    if not isinstance(parametros, dict):
+        raise FiltroInvalido("'parametros' deve ser um objeto")
+    return criar(tipo, PARAMETROS[tipo](parametros))
+
+
+def submeter_importacao(tipo, arquivo, formato):
+    """Guarda o arquivo enviado em DIRETORIO e cria a tarefa que o importa"""
+    importacao.get_tipo(tipo)
+    entrada = os.path.join(diretorio(), f'entrada-{uuid.uuid4().hex}.{formato}')
+    with open(entrada, 'wb') as destino:
+        for pedaco in arquivo.chunks():
+            destino.write(pedaco)
+    try:
+        return criar('importacao', {'tipo': tipo, 'formato': formato, 'nome': arquivo.name}, entrada)
+    except Exception:
+        remover_arquivo(entrada)
+        raise
+
+
+# Execução
+
+def reservada(tarefa):
+    """
+    A tarefa, se ainda está em execução pelo executor que a reservou; as
+    gravações do executor passam por aqui para não sobrescrever o status
+    gravado por expirar()
+    """
+    return TarefaDjango.objects.filter(pk=tarefa.pk, status='executando', executor=tarefa.executor)
+
+
+class Progresso:
+    """Grava o progresso da tarefa (e renova atualizada_em) a cada chamada"""
+
+    def __init__(self, tarefa):
+        self.tarefa = tarefa
+
+    def __call__(self, feitos, total=None):
+        self.tarefa.progresso = feitos
+        campos = {'progresso': feitos, 'atualizada_em': timezone.now()}
+        if total is not None:
+            self.tarefa.total = campos['total'] = total
+        alterada(reservada(self.tarefa).update(**campos))
+
+
+class Renovacao:
+    """
+    Renova atualizada_em da tarefa a cada `intervalo` segundos, numa thread,
+    enquanto o bloco `with` executa: etapas longas que não chamam o
+    Progresso não deixam a tarefa expirar
+    """
+
+    def __init__(self, tarefa, intervalo):
+        self.tarefa = tarefa
+        self.intervalo = intervalo
+        self._parar = threading.Event()
+        self._thread = threading.Thread(target=self._laco, name=f'tarefa-{tarefa.pk}-renovacao', daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._parar.set()
+        self._thread.join()
+
+    def renovar(self):
+        reservada(self.tarefa).update(atualizada_em=timezone.now())
+
+    def _laco(self):
+        try:
+            while not self._parar.wait(self.intervalo):
+                try:
+                    self.renovar()
+                except DatabaseError:
+                    # Banco ocupado (no SQLite, pela própria transação da tarefa): tenta no próximo intervalo
+                    logger.warning('Não foi possível renovar a tarefa %s', self.tarefa.pk, exc_info=True)
+        finally:
+            connection.close()
+
+
+def intervalo_renovacao():
+    # Várias renovações cabem em EXPIRACAO: uma que falhe não expira a tarefa
+    return get_config('EXPIRACAO') / 4
+
+
+def exportar(tarefa, progresso):
+    parametros = tarefa.parametros
+    formato = parametros['formato']
+    falhas = filtrar_falhas(FalhaDjango.objects.all(), parametros)
+    progresso(0, falhas.count())
+
+    linhas = 0
+
+    def contar(tuplas):
+        nonlocal linhas
+        for linhas, tupla in enumerate(tuplas, start=1):
+            if linhas % export.CHUNK_SIZE == 0:
+                progresso(linhas)
+            yield tupla
+
+    tarefa.arquivo = os.path.join(diretorio(), f'tarefa-{tarefa.pk}.{formato}')
+    with open(tarefa.arquivo, 'w', encoding='utf-8', newline='') as saida:
+        saida.writelines(export.GERADORES[formato](contar(export.linhas_falhas(falhas))))
+    progresso(linhas)
+    return {'formato': formato, 'linhas': linhas, 'bytes': os.path.getsize(tarefa.arquivo)}
+
+
+def importar(tarefa, progresso):
+    parametros = tarefa.parametros
+    with open(tarefa.entrada, 'rb') as arquivo:
+        relatorio = importacao.importar(parametros['tipo'], arquivo, parametros['formato'], progresso=progresso)
+    return relatorio.como_dict()
+
+
+def reconstruir(tarefa, progresso):
+    progresso(0, 2)
+    totais = {ResumoDiarioFalhasDjango._meta.db_table: rollup.reconstruir_resumo_diario()}
+    progresso(1)
+    totais.update(confiabilidade.reconstruir())
+    progresso(2)
+    return totais
+
+
+EXECUTORES = {
+    'exportacao': exportar,
+    'importacao': importar,
+    'reconstrucao': reconstruir,
+}
+
+
+def nome_executor():
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def reservar(executor):
+    """Reserva para `executor` a tarefa pendente mais antiga; None se não houver"""
+    while True:
+        pk = TarefaDjango.objects.filter(status='pendente').order_by('id').values_list('pk', flat=True).first()
+        if pk is None:
+            return None
+        agora = timezone.now()
+        reservada = TarefaDjango.objects.filter(pk=pk, status='pendente').update(
+            status='executando', executor=executor, iniciada_em=agora, atualizada_em=agora,
+        )
+        if alterada(reservada):
+            return TarefaDjango.objects.get(pk=pk)
+        # Outro processo reservou antes: tenta a próxima
+
+
+def executar(tarefa):
+    """Executa uma tarefa reservada e grava o resultado ou o erro"""
+    try:
+        with Renovacao(tarefa, intervalo_renovacao()):
+            tarefa.resultado = EXECUTORES[tarefa.tipo](tarefa, Progresso(tarefa))
+        tarefa.status = 'concluida'
+    except Exception as e:
+        logger.exception('Tarefa %s falhou', tarefa.pk)
+        tarefa.status = 'falhou'
+        tarefa.erro = str(e) or type(e).__name__
+        remover_arquivo(tarefa.arquivo)
+        tarefa.arquivo = ''
+    finally:
+        remover_arquivo(tarefa.entrada)
+    tarefa.entrada = ''
+    tarefa.concluida_em = tarefa.atualizada_em = timezone.now()
+    campos = ['status', 'resultado', 'erro', 'entrada', 'arquivo', 'progresso', 'total', 'concluida_em', 'atualizada_em']
+    if not alterada(reservada(tarefa).update(**{campo: getattr(tarefa, campo) for campo in campos})):
+        # expirar() já deu a tarefa como interrompida: o status gravado prevalece
+        logger.warning('Tarefa %s expirou durante a execução; resultado descartado', tarefa.pk)
+        remover_arquivo(tarefa.arquivo)
+        tarefa.refresh_from_db()
+    return tarefa
+
+
+def executar_pendentes(executor=None):
+    """Executa, nesta thread, as tarefas pendentes até a fila esvaziar; retorna quantas"""
+    executor = executor or nome_executor()
+    executadas = 0
+    while (tarefa := reservar(executor)) is not None:
+        executar(tarefa)
+        executadas += 1
+    return executadas
+
+
+def expirar():
+    """Marca como falhas as tarefas em execução que pararam de ser renovadas"""
+    agora = timezone.now()
+    return alterada(TarefaDjango.objects.filter(
+        status='executando', atualizada_em__lt=agora - timedelta(seconds=get_config('EXPIRACAO')),
+    ).update(status='falhou', erro='Interrompida: o processo que a executava parou', concluida_em=agora))
+
+
+def limpar():
+    """Apaga as tarefas terminadas há mais de RETENCAO_DIAS e os seus arquivos"""
+    antigas = TarefaDjango.objects.filter(
+        status__in=['concluida', 'falhou'],
+        concluida_em__lt=timezone.now() - timedelta(days=get_config('RETENCAO_DIAS')),
+    )
+    for caminho in antigas.exclude(arquivo='').values_list('arquivo', flat=True):
+        remover_arquivo(caminho)
+    return alterada(antigas.delete()[0])
+
+
+class Despachante:
+    """Reserva tarefas pendentes e as executa num pool de threads (ver o docstring do módulo)"""
+
+    def __init__(self, threads, intervalo):
+        self.threads = threads
+        self.intervalo = intervalo
+        self.executor = nome_executor()
+        self._executando = set()
+        self._lock = threading.Lock()
+        self._acordar = threading.Event()
+        self._parar = threading.Event()
+        self._pool = ThreadPoolExecutor(max_workers=threads, thread_name_prefix='tarefa')
+        self._thread = threading.Thread(target=self._laco, name='tarefas', daemon=True)
+
+    def iniciar(self):
+        self._thread.start()
+        return self
+
+    def acordar(self):
+        self._acordar.set()
+
+    def esperar(self):
+        """Bloqueia até o despachante parar (processo dedicado, ver executar_tarefas)"""
+        self._thread.join()
+
+    def parar(self):
+        self._parar.set()
+        self._acordar.set()
+        self._thread.join()
+        self._pool.shutdown()
+
+    def _laco(self):
+        while not self._parar.is_set():
+            # Limpa antes de consultar: uma submissão durante o ciclo não se perde
+            self._acordar.clear()
+            try:
+                close_old_connections()
+                self.ciclo()
+            except Exception:
+                logger.exception('Falha no despachante de tarefas')
+            self._acordar.wait(self.intervalo)
+        connection.close()
+
+    def ciclo(self):
+        with self._lock:
+            executando = set(self._executando)
+        expirar()
+        limpar()
+        while len(executando) < self.threads:
+            tarefa = reservar(self.executor)
+            if tarefa is None:
+                return
+            with self._lock:
+                self._executando.add(tarefa.pk)
+            executando.add(tarefa.pk)
+            try:
+                self._pool.submit(self._executar, tarefa)
+            except RuntimeError:
+                # Interpretador encerrando: a tarefa volta para a fila
+                alterada(TarefaDjango.objects.filter(pk=tarefa.pk).update(
+                    status='pendente', executor='', iniciada_em=None,
+                ))
+                return
+
+    def _executar(self, tarefa):
+        try:
+            executar(tarefa)
+        except Exception:
+            logger.exception('Falha ao gravar o resultado da tarefa %s', tarefa.pk)
+        finally:
+            connection.close()
+            with self._lock:
+                self._executando.discard(tarefa.pk)
+            self._acordar.set()
+
+
+# Despachante de cada processo, pelo pid: um processo criado por fork herda
+# o dicionário, mas não as threads do despachante do pai
+_despachantes = {}
+_lock_despachantes = threading.Lock()
+
+
+def get_despachante():
+    """Despachante deste processo, iniciado na primeira chamada"""
+    pid = os.getpid()
+    with _lock_despachantes:
+        if pid not in _despachantes:
+            _despachantes[pid] = Despachante(get_config('THREADS'), get_config('INTERVALO')).iniciar()
+        return _despachantes[pid]
+
+
+def acordar():
+    """Acorda o despachante do processo, se houver (um shell que submete tarefas não inicia um)"""
+    despachante = _despachantes.get(os.getpid())
+    if despachante is not None:
+        despachante.acordar()
+
+
+def iniciar(**kwargs):
+    """
+    Receiver de request_started (ver ApiConfig.ready()): o despachante nasce
+    no processo que atende requisições, uma vez por processo. Iniciado ao
+    importar wsgi.py, ele ficaria só no master do gunicorn --preload e
+    rodaria duas vezes com o autoreload do runserver.
+    """
+    if os.getpid() not in _despachantes and get_config('INICIAR'):
+        get_despachante()
+
+
+# Consulta
+
+class PaginacaoTarefas(KeysetPagination):
+    """A lista de tarefas é sempre paginada, da mais recente para a mais antiga"""
+    ordering = ORDENACAO
+
+    def deve_paginar(self, request):
+        return True
+
+
+def listar(params):
+    """Tarefas com os filtros opcionais ?status= e ?tipo="""
+    tarefas = TarefaDjango.objects.all()
+    for campo, opcoes in (('status', TarefaDjango.STATUS), ('tipo', TarefaDjango.TIPOS)):
+        valor = params.get(campo)
+        if valor:
+            validos = [opcao for opcao, _ in opcoes]
+            if valor not in validos:
+                raise FiltroInvalido(f"Valor inválido para '{campo}': use {', '.join(validos)}")
+            tarefas = tarefas.filter(**{campo: valor})
+    return tarefas
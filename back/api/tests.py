@@ -1,3 +1,1364 @@
-from django.test import TestCase
+import asyncio
+import base64
+import csv
+import gzip
+import json
+import os
+import shutil
+import tempfile
+import threading
+from datetime import date, timedelta
+from unittest import mock, skipUnless
+from functools import partial
+from itertools import count
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.management.sql import emit_post_migrate_signal
+from django.db import IntegrityError, connection, reset_queries
+from django.db.models import Sum
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import AsyncClient, RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from .models import (
+    UniversityDjango, CourseDjango, StudentDjango,
+    UnidadeDjango, FalhaDjango, ResumoDiarioFalhasDjango, HistoricoDjango, HistoricoImutavel, RegistroExcluidoDjango,
+    ConfiabilidadeUnidadeDjango, OcorrenciaFalhaDjango, AbertasGrupoDjango, OcorrenciaGrupoDjango, TarefaDjango,
+)
+from .rollup import reconstruir_resumo_diario
+from .dados_sinteticos import gerar_dados, volumes_para
+from .cache import get_cache, get_versoes
+from . import busca, compressao, confiabilidade, eventos, export, importacao, metricas, serializacao, tarefas, views
+from .serializers import FalhaSerializer, UnidadeSerializer
+
+
+_sequencia_unidades = count()
+_sequencia_estudantes = count()
+
+# Consulta às versões das tabelas feita por api.cache antes de cada GET
+QUERY_VERSOES = 1
+
+# Tarefas executadas pelo próprio teste (tarefas.executar_pendentes), sem despachante
+TAREFAS_TESTES = {'INICIAR': False, 'DIRETORIO': os.path.join(tempfile.gettempdir(), 'eurounimanager-testes-tarefas')}
+
+
+def criar_falhas(quantidade, unidades=3):
+    """Cria `quantidade` falhas distribuídas entre `unidades` unidades"""
+    lista_unidades = []
+    for _ in range(unidades):
+        n = next(_sequencia_unidades)
+        lista_unidades.append(UnidadeDjango.objects.create(
+            nome_unidade=f'Unidade {n}', grupo_unidade='Grupo A', id_unidade=f'UN-{n}'
+        ))
+    for i in range(quantidade):
+        FalhaDjango.objects.create(
+            unidade=lista_unidades[i % unidades],
+            falha_ocorrida=f'Falha {i}',
+            data_falha=date(2025, 1, 1 + i % 28),
+        )
+    return lista_unidades
+
+
+class FalhaQueryCountTests(TestCase):
+    def test_falha_list_numero_constante_de_queries(self):
+        criar_falhas(2)
+        with self.assertNumQueries(QUERY_VERSOES + 1):
+            resposta = self.client.get(reverse('falha-list'))
+        self.assertEqual(len(resposta.json()), 2)
+
+        criar_falhas(30)
+        with self.assertNumQueries(QUERY_VERSOES + 1):
+            resposta = self.client.get(reverse('falha-list'))
+        self.assertEqual(len(resposta.json()), 32)
+
+    def test_falha_list_paginada_numero_constante_de_queries(self):
+        criar_falhas(30)
+        with self.assertNumQueries(QUERY_VERSOES + 1):
+            resposta = self.client.get(reverse('falha-list'), {'page_size': 10})
+        self.assertEqual(len(resposta.json()['results']), 10)
+
+    def test_falha_detail_uma_query(self):
+        criar_falhas(1)
+        falha = FalhaDjango.objects.get()
+        with self.assertNumQueries(QUERY_VERSOES + 1):
+            resposta = self.client.get(reverse('falha-detail', args=[falha.pk]))
+        self.assertEqual(resposta.json()['unidade_nome'], falha.unidade.nome_unidade)
+
+
+class FiltroFalhasTests(TestCase):
+    def setUp(self):
+        self.unidade, self.outra = criar_falhas(0, unidades=2)
+        FalhaDjango.objects.create(unidade=self.unidade, falha_ocorrida='Motor parado', data_falha=date(2025, 1, 5))
+        FalhaDjango.objects.create(
+            unidade=self.unidade, falha_ocorrida='Sensor', data_falha=date(2025, 2, 1), ativa=False,
+        )
+        FalhaDjango.objects.create(unidade=self.outra, falha_ocorrida='MOTOR quente', data_falha=date(2025, 3, 1))
+
+    def filtrar(self, **params):
+        resposta = self.client.get(reverse('falha-list'), params)
+        self.assertEqual(resposta.status_code, 200)
+        return sorted(falha['falha_ocorrida'] for falha in resposta.json())
+
+    def test_cada_filtro(self):
+        self.assertEqual(self.filtrar(unidade=self.outra.pk), ['MOTOR quente'])
+        self.assertEqual(self.filtrar(ativa='false'), ['Sensor'])
+        self.assertEqual(self.filtrar(ativa='sim'), ['MOTOR quente', 'Motor parado'])
+        self.assertEqual(self.filtrar(data_inicio='2025-02-01'), ['MOTOR quente', 'Sensor'])
+        # Intervalo inclusivo nas duas pontas
+        self.assertEqual(self.filtrar(data_fim='2025-02-01'), ['Motor parado', 'Sensor'])
+        self.assertEqual(self.filtrar(falha_ocorrida=' motor '), ['MOTOR quente', 'Motor parado'])
+
+    def test_filtros_combinados(self):
+        self.assertEqual(self.filtrar(falha_ocorrida='motor', unidade=self.unidade.pk), ['Motor parado'])
+        self.assertEqual(self.filtrar(ativa='true', data_inicio='2025-01-06', data_fim='2025-03-01'), ['MOTOR quente'])
+        self.assertEqual(self.filtrar(ativa='false', unidade=self.outra.pk), [])
+
+    def test_valores_invalidos(self):
+        for params in (
+            {'unidade': 'abc'},
+            {'ativa': 'talvez'},
+            {'data_inicio': '2025-13-01'},
+            {'data_fim': '05/01/2025'},
+            {'data_inicio': '2025-03-01', 'data_fim': '2025-01-01'},
+        ):
+            with self.subTest(params=params):
+                resposta = self.client.get(reverse('falha-list'), params)
+                self.assertEqual(resposta.status_code, 400)
+                self.assertIn('error', resposta.json())
+
+
+class KeysetPaginationTests(TestCase):
+    def percorrer(self, nome, page_size, **params):
+        """Segue os links `next` até o fim; retorna os ids na ordem recebida"""
+        ids = []
+        resposta = self.client.get(reverse(nome), {'page_size': page_size, **params})
+        while True:
+            self.assertEqual(resposta.status_code, 200)
+            pagina = resposta.json()
+            self.assertLessEqual(len(pagina['results']), page_size)
+            ids += [linha['id'] for linha in pagina['results']]
+            if pagina['next'] is None:
+                return ids
+            resposta = self.client.get(pagina['next'])
+
+    def test_paginas_reproduzem_a_lista_completa_com_empates(self):
+        # Nomes repetidos: o desempate pelo id decide a ordem dentro do mesmo nome
+        for n, nome in enumerate(['B', 'A', 'B', 'C', 'A', 'B', 'A']):
+            UnidadeDjango.objects.create(nome_unidade=nome, grupo_unidade='G', id_unidade=f'PAG-{n}')
+        completa = [unidade['id'] for unidade in self.client.get(reverse('unidade-list')).json()]
+        for page_size in (1, 2, 3, 7, 50):
+            with self.subTest(page_size=page_size):
+                self.assertEqual(self.percorrer('unidade-list', page_size), completa)
+
+        # Falhas: ordem descendente, com muitas na mesma data_falha
+        unidade = UnidadeDjango.objects.first()
+        for n in range(9):
+            FalhaDjango.objects.create(unidade=unidade, falha_ocorrida=f'F{n}', data_falha=date(2025, 1, 1 + n % 2))
+        completa = [falha['id'] for falha in self.client.get(reverse('falha-list')).json()]
+        self.assertEqual(self.percorrer('falha-list', 2), completa)
+        self.assertEqual(
+            self.percorrer('falha-list', 2, ativa='true'),
+            [falha['id'] for falha in self.client.get(reverse('falha-list'), {'ativa': 'true'}).json()],
+        )
+
+    def test_cursor_e_page_size_invalidos(self):
+        criar_falhas(0, unidades=3)
+
+        def cursor(valores):
+            return base64.urlsafe_b64encode(json.dumps(valores).encode()).decode()
+
+        for params in (
+            {'cursor': 'não é base64!'},
+            {'cursor': base64.urlsafe_b64encode(b'{"a": 1').decode()},
+            {'cursor': cursor({'nome_unidade': 'A', 'id': 1})},
+            {'cursor': cursor(['A'])},
+            {'cursor': cursor(['A', 1, 2])},
+            {'cursor': cursor(['A', 'x'])},
+            {'cursor': cursor([{'a': 1}, 1])},
+            {'page_size': '0'},
+            {'page_size': '-5'},
+            {'page_size': 'dez'},
+        ):
+            with self.subTest(params=params):
+                resposta = self.client.get(reverse('unidade-list'), params)
+                self.assertEqual(resposta.status_code, 400)
+
+        # Acima do máximo, o page_size é limitado em vez de recusado
+        with override_settings(API_PAGINATION={'MAX_PAGE_SIZE': 2}):
+            resposta = self.client.get(reverse('unidade-list'), {'page_size': 1000})
+        self.assertEqual(len(resposta.json()['results']), 2)
+        self.assertIn('page_size=2', resposta.json()['next'])
+
+
+class UnidadeSummaryTests(TestCase):
+    def test_summary_contagens_e_ultima_falha(self):
+        unidade, vazia = criar_falhas(0, unidades=2)
+        FalhaDjango.objects.create(unidade=unidade, falha_ocorrida='Motor', data_falha=date(2025, 1, 1))
+        FalhaDjango.objects.create(unidade=unidade, falha_ocorrida='Sensor', data_falha=date(2025, 2, 1), ativa=False)
+
+        with self.assertNumQueries(QUERY_VERSOES + 1):
+            resposta = self.client.get(reverse('unidade-summary'))
+
+        resumo = {linha['id']: linha for linha in resposta.json()}
+        self.assertEqual(resumo[unidade.pk]['total_falhas'], 2)
+        self.assertEqual(resumo[unidade.pk]['falhas_ativas'], 1)
+        self.assertEqual(resumo[unidade.pk]['ultima_falha']['falha_ocorrida'], 'Sensor')
+        self.assertEqual(resumo[vazia.pk]['total_falhas'], 0)
+        self.assertIsNone(resumo[vazia.pk]['ultima_falha'])
+
+
+class FalhaStatsTests(TestCase):
+    def test_agrega_por_mes_e_grupo(self):
+        unidade, = criar_falhas(0, unidades=1)
+        FalhaDjango.objects.create(unidade=unidade, falha_ocorrida='A', data_falha=date(2025, 1, 5))
+        FalhaDjango.objects.create(unidade=unidade, falha_ocorrida='B', data_falha=date(2025, 1, 20), ativa=False)
+        FalhaDjango.objects.create(unidade=unidade, falha_ocorrida='C', data_falha=date(2025, 3, 2))
+        reconstruir_resumo_diario()
+
+        resposta = self.client.get(reverse('falha-stats'), {'periodo': 'mes', 'data_inicio': '2025-01-01'})
+
+        stats = resposta.json()
+        self.assertEqual(stats['totais'], {'total': 3, 'ativas': 2, 'resolvidas': 1})
+        self.assertEqual(
+            [(linha['periodo'], linha['total']) for linha in stats['por_periodo']],
+            [('2025-01-01', 2), ('2025-03-01', 1)],
+        )
+        self.assertEqual(stats['por_grupo'], [{'grupo': 'Grupo A', 'total': 3, 'ativas': 2, 'resolvidas': 1}])
+
+    def test_periodo_invalido(self):
+        resposta = self.client.get(reverse('falha-stats'), {'periodo': 'ano'})
+        self.assertEqual(resposta.status_code, 400)
+
+
+class ResumoDiarioTests(TestCase):
+    def resumo(self):
+        return sorted(ResumoDiarioFalhasDjango.objects.values_list('data', 'ativas', 'resolvidas'))
+
+    def test_resumo_acompanha_criacao_edicao_e_exclusao(self):
+        unidade, = criar_falhas(0, unidades=1)
+        dados = {'unidade': unidade.pk, 'falha_ocorrida': 'Motor', 'data_falha': '2025-01-05', 'ativa': True}
+
+        falha_id = self.client.post(reverse('falha-list'), dados, content_type='application/json').json()['id']
+        self.client.post(reverse('falha-list'), dados, content_type='application/json')
+        self.assertEqual(self.resumo(), [(date(2025, 1, 5), 2, 0)])
+
+        dados.update(ativa=False, data_falha='2025-01-06')
+        self.client.put(reverse('falha-detail', args=[falha_id]), dados, content_type='application/json')
+        self.assertEqual(self.resumo(), [(date(2025, 1, 5), 1, 0), (date(2025, 1, 6), 0, 1)])
+
+        self.client.delete(reverse('falha-detail', args=[falha_id]))
+        self.assertEqual(self.resumo(), [(date(2025, 1, 5), 1, 0)])
+
+    def test_estatisticas_do_resumo_iguais_as_da_tabela_de_falhas(self):
+        criar_falhas(40)
+        FalhaDjango.objects.filter(pk__in=FalhaDjango.objects.values('pk')[:15]).update(ativa=False)
+        self.assertEqual(self.resumo(), [])
+        reconstruir_resumo_diario()
+
+        do_resumo = self.client.get(reverse('falha-stats'), {'periodo': 'semana'}).json()
+        # falha_ocorrida força a leitura direta de FalhaDjango
+        da_tabela = self.client.get(reverse('falha-stats'), {'periodo': 'semana', 'falha_ocorrida': 'Falha'}).json()
+        self.assertEqual(do_resumo, da_tabela)
+        self.assertEqual(do_resumo['totais'], {'total': 40, 'ativas': 25, 'resolvidas': 15})
+
+
+class BulkTests(TestCase):
+    def post(self, nome_url, dados, metodo='post'):
+        return getattr(self.client, metodo)(reverse(nome_url), dados, content_type='application/json')
+
+    def test_cria_falhas_em_lote_com_erros_por_item(self):
+        unidade, = criar_falhas(0, unidades=1)
+        itens = [
+            {'unidade': unidade.pk, 'falha_ocorrida': f'Falha {i}', 'data_falha': '2025-01-05'}
+            for i in range(20)
+        ]
+        itens.insert(3, {'unidade': 999999, 'falha_ocorrida': 'X', 'data_falha': '2025-01-05'})
+
+        resposta = self.post('falha-bulk', itens)
+
+        self.assertEqual(resposta.status_code, 207)
+        self.assertEqual(len(resposta.json()['created']), 20)
+        self.assertEqual([erro['index'] for erro in resposta.json()['errors']], [3])
+        self.assertEqual(FalhaDjango.objects.count(), 20)
+        self.assertEqual(self.resumo_total(), 20)
+
+    def test_atualiza_e_exclui_falhas_em_lote(self):
+        criar_falhas(10)
+        falhas = self.client.get(reverse('falha-list')).json()
+        for falha in falhas:
+            falha['ativa'] = False
+        reconstruir_resumo_diario()
+
+        resposta = self.post('falha-bulk', falhas, 'put')
+        self.assertEqual(resposta.status_code, 200)
+        self.assertFalse(FalhaDjango.objects.filter(ativa=True).exists())
+
+        resposta = self.post('falha-bulk', [falha['id'] for falha in falhas[:4]], 'delete')
+        self.assertEqual(len(resposta.json()['deleted']), 4)
+        self.assertEqual(self.resumo_total(), 6)
+
+    def test_cria_unidades_rejeita_id_unidade_repetido(self):
+        criar_falhas(0, unidades=1)
+        existente = UnidadeDjango.objects.get().id_unidade
+        itens = [
+            {'nome_unidade': 'A', 'grupo_unidade': 'G', 'id_unidade': 'NOVA-1'},
+            {'nome_unidade': 'B', 'grupo_unidade': 'G', 'id_unidade': 'NOVA-1'},
+            {'nome_unidade': 'C', 'grupo_unidade': 'G', 'id_unidade': existente},
+        ]
+
+        resposta = self.post('unidade-bulk', itens)
+
+        self.assertEqual(resposta.status_code, 207)
+        self.assertEqual([u['id_unidade'] for u in resposta.json()['created']], ['NOVA-1'])
+        self.assertEqual([erro['index'] for erro in resposta.json()['errors']], [1, 2])
+
+    def test_atualizacao_com_id_nao_inteiro_vira_erro_do_item(self):
+        criar_falhas(1)
+        falha = self.client.get(reverse('falha-list')).json()[0]
+        unidade = self.client.get(reverse('unidade-list')).json()[0]
+        for nome_url, item in (('falha-bulk', falha), ('unidade-bulk', unidade)):
+            with self.subTest(nome_url=nome_url):
+                invalidos = [{**item, 'id': [item['id']]}, {**item, 'id': {'id': item['id']}}, {**item, 'id': True}]
+                resposta = self.post(nome_url, invalidos + [item], 'put')
+                self.assertEqual(resposta.status_code, 207)
+                self.assertEqual(len(resposta.json()['updated']), 1)
+                self.assertEqual([erro['index'] for erro in resposta.json()['errors']], [0, 1, 2])
+                self.assertIn('id', resposta.json()['errors'][0]['errors'])
+
+                resposta = self.post(nome_url, [{'id': [1]}], 'put')
+                self.assertEqual(resposta.status_code, 400)
+
+    def test_exclusao_em_lote_grava_uma_vez_por_tabela(self):
+        unidades = criar_falhas(30, unidades=3)
+        ids = list(FalhaDjango.objects.order_by('pk').values_list('pk', flat=True))
+        eventos.get_feed.cache_clear()
+
+        def excluir(nome_url, ids):
+            with CaptureQueriesContext(connection) as consultas, \
+                    self.captureOnCommitCallbacks(execute=True) as callbacks:
+                resposta = self.post(nome_url, ids, 'delete')
+            self.assertEqual(resposta.status_code, 200)
+            tabelas = ('INSERT INTO "api_historicodjango"', 'INSERT INTO "api_registroexcluidodjango"')
+            insercoes = [c['sql'] for c in consultas if c['sql'].startswith(tabelas)]
+            # Uma gravação por tabela (falhas e unidades) e um callback por tipo de evento, não um por linha
+            self.assertEqual(len(insercoes), 4 if nome_url == 'unidade-bulk' else 2)
+            self.assertLessEqual(len(callbacks), 2)
+
+        excluir('falha-bulk', ids[:12])
+        excluir('unidade-bulk', [unidades[0].pk, unidades[1].pk])
+
+        restantes = FalhaDjango.objects.count()
+        self.assertEqual(restantes, 6)
+        self.assertEqual(RegistroExcluidoDjango.objects.filter(tabela='falhas').count(), 24)
+        self.assertEqual(RegistroExcluidoDjango.objects.filter(tabela='unidades').count(), 2)
+        self.assertEqual(HistoricoDjango.objects.filter(acao='deleted').count(), 26)
+        recebidos = [(e['tipo'], e['acao']) for _, e in eventos.get_feed()._recentes]
+        # Um evento por falha excluída e um só para as falhas em cascata das unidades
+        self.assertEqual(recebidos.count(('falha', 'deleted')), 13)
+        cascata = [e['dados'] for _, e in eventos.get_feed()._recentes if 'ids' in e['dados']]
+        self.assertEqual(len(cascata), 1)
+        self.assertEqual(len(cascata[0]['ids']), 12)
+        self.assertEqual(cascata[0]['unidades'], [unidades[0].pk, unidades[1].pk])
+        self.assertEqual(recebidos.count(('unidade', 'deleted')), 2)
+        self.assertEqual(
+            sorted(ConfiabilidadeUnidadeDjango.objects.values_list('unidade_id', flat=True)), [unidades[2].pk],
+        )
+
+    def resumo_total(self):
+        return sum(r.ativas + r.resolvidas for r in ResumoDiarioFalhasDjango.objects.all())
+
+
+class CacheRespostaTests(TestCase):
+    def test_if_none_match_retorna_304_sem_consultar_dados(self):
+        criar_falhas(3)
+        resposta = self.client.get(reverse('falha-list'))
+        etag = resposta['ETag']
+
+        with self.assertNumQueries(QUERY_VERSOES):
+            resposta = self.client.get(reverse('falha-list'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resposta.status_code, 304)
+
+        with self.assertNumQueries(QUERY_VERSOES):
+            resposta = self.client.get(reverse('falha-list'))
+        self.assertEqual(len(resposta.json()), 3)
+
+    def test_gravacao_invalida_respostas(self):
+        unidade, = criar_falhas(1, unidades=1)
+        etag_unidades = self.client.get(reverse('unidade-list'))['ETag']
+        etag_falhas = self.client.get(reverse('falha-list'))['ETag']
+
+        self.client.put(
+            reverse('unidade-detail', args=[unidade.pk]),
+            {'nome_unidade': 'Renomeada', 'grupo_unidade': 'G', 'id_unidade': unidade.id_unidade},
+            content_type='application/json',
+        )
+
+        resposta = self.client.get(reverse('falha-list'), HTTP_IF_NONE_MATCH=etag_falhas)
+        self.assertEqual(resposta.status_code, 200)
+        self.assertEqual(resposta.json()[0]['unidade_nome'], 'Renomeada')
+        self.assertNotEqual(self.client.get(reverse('unidade-list'))['ETag'], etag_unidades)
+
+    def test_exclusao_em_cascata_invalida_falhas(self):
+        unidade, = criar_falhas(5, unidades=1)
+        self.assertEqual(len(self.client.get(reverse('falha-list')).json()), 5)
+
+        self.client.delete(reverse('unidade-detail', args=[unidade.pk]))
+
+        self.assertEqual(self.client.get(reverse('falha-list')).json(), [])
+
+    @override_settings(CACHES={
+        'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+        'api': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': os.path.join(tempfile.gettempdir(), 'eurounimanager-testes-cache')},
+    })
+    def test_backend_baseado_em_arquivo(self):
+        criar_falhas(2)
+        self.client.get(reverse('falha-list'))
+        with self.assertNumQueries(QUERY_VERSOES):
+            resposta = self.client.get(reverse('falha-list'))
+        self.assertEqual(len(resposta.json()), 2)
+
+
+class ExportTests(TestCase):
+    def test_exporta_ndjson_e_csv(self):
+        unidade, = criar_falhas(3, unidades=1)
+
+        resposta = self.client.get(reverse('falha-export'), {'formato': 'ndjson'})
+        linhas = [json.loads(linha) for linha in b''.join(resposta.streaming_content).decode().splitlines()]
+        self.assertEqual(len(linhas), 3)
+        self.assertEqual(linhas[0]['unidade_nome'], unidade.nome_unidade)
+        self.assertEqual(linhas[0]['data_falha'], '2025-01-01')
+
+        resposta = self.client.get(reverse('falha-export'), {'formato': 'csv', 'data_inicio': '2025-01-02'})
+        linhas = list(csv.reader(b''.join(resposta.streaming_content).decode().splitlines()))
+        self.assertEqual(linhas[0][:3], ['id', 'unidade', 'unidade_nome'])
+        self.assertEqual(len(linhas), 3)
+
+    async def test_asgi_em_streaming_assincrono(self):
+        def exportacao_wsgi():
+            criar_falhas(5, unidades=1)
+            return b''.join(self.client.get(reverse('falha-export')).streaming_content)
+
+        esperado = await sync_to_async(exportacao_wsgi)()
+
+        em_blocos_de_2 = partial(export.exportar_falhas_async, chunk_size=2)
+        for cabecalhos in ({}, {'Accept-Encoding': 'gzip'}):
+            with self.subTest(**cabecalhos):
+                with mock.patch.object(views, 'exportar_falhas_async', em_blocos_de_2):
+                    response = await AsyncClient().get(reverse('falha-export'), headers=cabecalhos)
+                # Um iterador assíncrono, não a lista montada por sync_to_async(list)
+                self.assertTrue(response.is_async)
+                self.assertFalse(isinstance(response.streaming_content, (list, tuple)))
+                pedacos = [pedaco async for pedaco in response.streaming_content]
+                corpo = b''.join(pedacos)
+                if cabecalhos:
+                    corpo = gzip.decompress(corpo)
+                else:
+                    self.assertEqual(len(pedacos), 3)
+                self.assertEqual(corpo, esperado)
+
+
+@override_settings(API_TAREFAS=TAREFAS_TESTES)
+class ImportacaoTests(TestCase):
+    def enviar(self, tipo, conteudo):
+        """Envia o arquivo, executa a tarefa e retorna o relatório"""
+        arquivo = SimpleUploadedFile(f'{tipo}.csv', conteudo.encode(), content_type='text/csv')
+        resposta = self.client.post(reverse('importacao', args=[tipo]), {'arquivo': arquivo})
+        self.assertEqual(resposta.status_code, 202)
+        tarefas.executar_pendentes()
+        return self.client.get(reverse('tarefa-resultado', args=[resposta.json()['id']])).json()
+
+    def test_importa_unidades_e_falhas_reportando_erros_por_linha(self):
+        criar_falhas(0, unidades=1)
+        existente = UnidadeDjango.objects.get().id_unidade
+
+        relatorio = self.enviar('unidades', (
+            'nome_unidade,grupo_unidade,id_unidade\n'
+            'Nova A,G,IMP-1\n'
+            f'Repetida,G,{existente}\n'
+            'Nova B,G,IMP-2\n'
+        ))
+        self.assertEqual(relatorio['created'], 2)
+        self.assertEqual(relatorio['errors'], [{'line': 3, 'error': f"id_unidade '{existente}' já existe"}])
+
+        relatorio = self.enviar('falhas', (
+            'id_unidade,falha_ocorrida,data_falha,ativa\n'
+            'IMP-1,Motor,2025-01-05,true\n'
+            'IMP-2,Sensor,2025-01-05,false\n'
+            'IMP-9,Sensor,2025-01-05,false\n'
+        ))
+        self.assertEqual(relatorio['created'], 2)
+        self.assertEqual([erro['line'] for erro in relatorio['errors']], [4])
+        self.assertEqual(
+            sorted(ResumoDiarioFalhasDjango.objects.values_list('ativas', 'resolvidas')),
+            [(0, 1), (1, 0)],
+        )
+
+
+    def test_bloco_refeito_linha_a_linha_gera_os_mesmos_eventos(self):
+        unidade, = criar_falhas(0, unidades=1)
+        bulk_create = UnidadeDjango.objects.bulk_create
+
+        def colidir(unidades, **kwargs):
+            # Simula outra gravação criando IMP-2 entre a verificação e a inserção do bloco
+            if any(u.id_unidade == 'IMP-2' for u in unidades):
+                raise IntegrityError
+            return bulk_create(unidades, **kwargs)
+
+        linhas = [
+            {'nome_unidade': 'A', 'grupo_unidade': 'G', 'id_unidade': 'IMP-1'},
+            {'nome_unidade': 'B', 'grupo_unidade': 'G', 'id_unidade': 'IMP-2'},
+            {'nome_unidade': 'C', 'grupo_unidade': 'G', 'id_unidade': 'IMP-3'},
+        ]
+        with mock.patch.object(UnidadeDjango.objects, 'bulk_create', side_effect=colidir), \
+                mock.patch.object(eventos, 'publicar') as publicar:
+            relatorio = importacao.importar_unidades(linhas)
+
+        self.assertEqual(relatorio.criados, 2)
+        self.assertEqual(relatorio.erros, [{'line': 3, 'error': "id_unidade 'IMP-2' já existe"}])
+        publicar.assert_called_once_with('unidade', 'imported', {'count': 2})
+        self.assertEqual(
+            sorted(
+                HistoricoDjango.objects.filter(tipo='unidade', acao='created').exclude(unidade=unidade)
+                .values_list('unidade__id_unidade', flat=True)
+            ),
+            ['IMP-1', 'IMP-3'],
+        )
+
+
+class BuscaTests(TestCase):
+    def buscar(self, **params):
+        return [falha['falha_ocorrida'] for falha in self.client.get(reverse('falha-busca'), params).json()]
+
+    def test_busca_ordenada_e_sincronizada(self):
+        unidade, = criar_falhas(0, unidades=1)
+        oleo = FalhaDjango.objects.create(
+            unidade=unidade, falha_ocorrida='Vazamento de óleo', observacao='motor quente', data_falha=date(2025, 1, 1)
+        )
+        FalhaDjango.objects.create(unidade=unidade, falha_ocorrida='Motor parado', data_falha=date(2025, 1, 2))
+
+        # falha_ocorrida pesa mais que observacao no ranking
+        self.assertEqual(self.buscar(q='motor'), ['Motor parado', 'Vazamento de óleo'])
+        self.assertEqual(self.buscar(q='oleo'), ['Vazamento de óleo'])
+        self.assertEqual(self.buscar(q='vaza'), ['Vazamento de óleo'])
+
+        oleo.falha_ocorrida = 'Correia partida'
+        oleo.save()
+        self.assertEqual(self.buscar(q='oleo'), [])
+
+        unidade.nome_unidade = 'Compressor Leste'
+        unidade.save()
+        self.assertEqual(len(self.buscar(q='compressor leste')), 2)
+
+        oleo.delete()
+        self.assertEqual(self.buscar(q='motor'), ['Motor parado'])
+
+    def test_busca_sem_termo(self):
+        self.assertEqual(self.client.get(reverse('falha-busca'), {'q': '  '}).status_code, 400)
+
+    @skipUnless(connection.vendor == 'sqlite', 'triggers FTS5 só no SQLite')
+    def test_triggers_existem_e_sao_recriados_no_post_migrate(self):
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT name FROM sqlite_master WHERE type = 'trigger'")
+            self.assertLessEqual(set(busca.TRIGGERS_BUSCA), {linha[0] for linha in cursor.fetchall()})
+            # Como faria um remake de api_falhadjango por uma migração posterior
+            cursor.execute('DROP TRIGGER api_falha_busca_insert')
+
+        unidade, = criar_falhas(0, unidades=1)
+        FalhaDjango.objects.create(unidade=unidade, falha_ocorrida='Correia partida', data_falha=date(2025, 1, 1))
+        self.assertEqual(self.buscar(q='correia'), [])
+
+        with self.assertLogs('api.busca', 'WARNING'):
+            emit_post_migrate_signal(verbosity=0, interactive=False, db='default')
+        self.assertEqual(self.buscar(q='correia'), ['Correia partida'])
+        self.assertEqual(busca.garantir_triggers(), [])
+
+
+class EventosTests(TestCase):
+    def setUp(self):
+        eventos.get_feed.cache_clear()
+
+    def ler_eventos(self, quantidade, **extra):
+        response = self.client.get(reverse('eventos'), {'tipos': 'falha'}, **extra)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        blocos = iter(response.streaming_content)
+        self.assertEqual(next(blocos), b'retry: 3000\n\n')
+        lidos = [next(blocos).decode() for _ in range(quantidade)]
+        response.close()
+        self.assertEqual(eventos.get_feed().total_assinantes, 0)
+        return [json.loads(bloco.split('data: ', 1)[1]) for bloco in lidos]
+
+    def test_publica_apos_commit_e_retoma_pelo_last_event_id(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            unidade, = criar_falhas(0, unidades=1)
+            falha = FalhaDjango.objects.create(unidade=unidade, falha_ocorrida='Queda', data_falha=date(2025, 1, 1))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(
+                reverse('falha-bulk'),
+                [{'unidade': unidade.pk, 'falha_ocorrida': 'Pane', 'data_falha': '2025-01-02'}],
+                content_type='application/json',
+            )
+        falha_id = falha.pk
+        with self.captureOnCommitCallbacks(execute=True):
+            falha.delete()
+
+        # O evento da unidade (número 1) é filtrado por ?tipos=falha
+        epoca = eventos.get_feed().epoca
+        recebidos = self.ler_eventos(3, HTTP_LAST_EVENT_ID=f'{epoca}-0')
+        self.assertEqual([(e['acao'], e['dados']['falha_ocorrida'] if e['acao'] != 'deleted' else e['dados']['id'])
+                          for e in recebidos], [('created', 'Queda'), ('created', 'Pane'), ('deleted', falha_id)])
+        self.assertEqual(len(self.ler_eventos(1, HTTP_LAST_EVENT_ID=f'{epoca}-3')), 1)
+
+    def test_last_event_id_de_outro_feed_e_ignorado(self):
+        unidade, = criar_falhas(0, unidades=1)
+        with self.captureOnCommitCallbacks(execute=True):
+            FalhaDjango.objects.create(unidade=unidade, falha_ocorrida='Queda', data_falha=date(2025, 1, 1))
+        evento_id = eventos.get_feed()._recentes[-1][1]['id']
+        self.assertTrue(evento_id.startswith(eventos.get_feed().epoca + '-'))
+
+        # Outro processo (ou o mesmo depois de reiniciar) numera os eventos do zero
+        eventos.get_feed.cache_clear()
+        with self.captureOnCommitCallbacks(execute=True):
+            FalhaDjango.objects.create(unidade=unidade, falha_ocorrida='Pane', data_falha=date(2025, 1, 2))
+        for ultimo_id in ('0', evento_id, 'outra-0'):
+            with self.subTest(ultimo_id=ultimo_id):
+                assinante = eventos.get_feed().assinar(eventos.AssinanteSync(), eventos.parse_ultimo_id(ultimo_id))
+                self.assertIsNone(assinante.proximo(0))
+                eventos.get_feed().cancelar(assinante)
+        self.assertEqual(self.client.get(reverse('eventos'), HTTP_LAST_EVENT_ID='abc-x').status_code, 400)
+
+    def test_exclusao_de_unidade_publica_um_evento_para_as_falhas(self):
+        unidade, = criar_falhas(5, unidades=1)
+        falhas = sorted(unidade.falhas.values_list('pk', flat=True))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(reverse('unidade-detail', args=[unidade.pk]))
+        publicados = [e for _, e in eventos.get_feed()._recentes]
+        self.assertEqual([(e['tipo'], e['acao']) for e in publicados], [('falha', 'deleted'), ('unidade', 'deleted')])
+        self.assertEqual(sorted(publicados[0]['dados']['ids']), falhas)
+        self.assertEqual(publicados[0]['dados']['unidades'], [unidade.pk])
+
+    def test_assinante_sem_entregar_nao_instancia(self):
+        with self.assertRaises(TypeError):
+            eventos.Assinante()
+
+    def test_sem_commit_nao_publica(self):
+        unidade, = criar_falhas(0, unidades=1)
+        FalhaDjango.objects.create(unidade=unidade, falha_ocorrida='Queda', data_falha=date(2025, 1, 1))
+        self.assertEqual(len(eventos.get_feed()._recentes), 0)
+
+    def test_tipos_invalidos(self):
+        self.assertEqual(self.client.get(reverse('eventos'), {'tipos': 'curso'}).status_code, 400)
+
+    def test_assinante_com_loop_fechado_e_cancelado(self):
+        async def assinar():
+            return eventos.get_feed().assinar(eventos.AssinanteAsync())
+
+        # asyncio.run() fecha o loop ao terminar, sem cancelar a assinatura
+        asyncio.run(assinar())
+        self.assertEqual(eventos.get_feed().total_assinantes, 1)
+
+        unidade, = criar_falhas(0, unidades=1)
+        with self.captureOnCommitCallbacks(execute=True):
+            FalhaDjango.objects.create(unidade=unidade, falha_ocorrida='Queda', data_falha=date(2025, 1, 1))
+        self.assertEqual(eventos.get_feed().total_assinantes, 0)
+
+
+@override_settings(API_SYNC={'MARGEM_SEGUNDOS': 0})
+class SyncTests(TestCase):
+    def sincronizar(self, **params):
+        response = self.client.get(reverse('sync'), params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_alteracoes_e_exclusoes_em_cascata(self):
+        unidades = criar_falhas(4, unidades=2)
+        inicial = self.sincronizar()
+        self.assertEqual((len(inicial['unidades']), len(inicial['falhas'])), (2, 4))
+        self.assertFalse(inicial['has_more'])
+
+        sem_mudancas = self.sincronizar(cursor=inicial['cursor'])
+        self.assertEqual((sem_mudancas['unidades'], sem_mudancas['falhas']), ([], []))
+
+        falha = FalhaDjango.objects.filter(unidade=unidades[0]).first()
+        falha.ativa = False
+        falha.save()
+        removidas = sorted(unidades[1].falhas.values_list('pk', flat=True))
+        self.client.delete(reverse('unidade-detail', args=[unidades[1].pk]))
+
+        delta = self.sincronizar(cursor=inicial['cursor'])
+        self.assertEqual([f['id'] for f in delta['falhas']], [falha.pk])
+        self.assertEqual(delta['deleted']['unidades'], [unidades[1].pk])
+        self.assertEqual(sorted(delta['deleted']['falhas']), removidas)
+
+    def test_paginas_pelo_cursor(self):
+        criar_falhas(5, unidades=1)
+        ids, params = [], {'page_size': 2}
+        while True:
+            pagina = self.sincronizar(**params)
+            ids += [f['id'] for f in pagina['falhas']]
+            params['cursor'] = pagina['cursor']
+            if not pagina['has_more']:
+                break
+        self.assertEqual(sorted(ids), sorted(FalhaDjango.objects.values_list('pk', flat=True)))
+
+    def test_since_antigo_expirado(self):
+        self.assertEqual(self.client.get(reverse('sync'), {'since': '2000-01-01T00:00:00'}).status_code, 410)
+
+    def test_cursor_adulterado(self):
+        cursor = self.sincronizar()['cursor']
+        posicoes = json.loads(base64.urlsafe_b64decode(cursor))
+        momento_sem_fuso = posicoes['excluidos'][0][:19]
+        for adulterado in ({**posicoes, 'excluidos': [momento_sem_fuso, 0]},
+                           {**posicoes, 'falhas': [posicoes['falhas'][0], True]},
+                           {**posicoes, 'unidades': None}):
+            with self.subTest(adulterado=adulterado):
+                cursor = base64.urlsafe_b64encode(json.dumps(adulterado).encode()).decode()
+                self.assertEqual(self.client.get(reverse('sync'), {'cursor': cursor}).status_code, 400)
+        self.assertEqual(self.client.get(reverse('sync'), {'cursor': 'x'}).status_code, 400)
+
+
+class ViewsAsyncTests(TestCase):
+    def test_mesmo_json_das_views_sincronas(self):
+        unidade = criar_falhas(6)[0]
+        reconstruir_resumo_diario()
+        falha = FalhaDjango.objects.first()
+        casos = [
+            ('unidade-list', [], {}, views.unidade_list),
+            ('unidade-list', [], {'page_size': 2}, views.unidade_list),
+            ('unidade-summary', [], {}, views.unidade_summary),
+            ('unidade-detail', [unidade.pk], {}, views.unidade_detail),
+            ('falha-list', [], {'ativa': 'true', 'page_size': 2}, views.falha_list),
+            ('falha-detail', [falha.pk], {}, views.falha_detail),
+            ('falha-detail', [0], {}, views.falha_detail),
+            ('falha-stats', [], {'periodo': 'mes'}, views.falha_stats),
+            ('falha-stats', [], {'ativa': 'x'}, views.falha_stats),
+        ]
+        for nome, args, params, view_sync in casos:
+            with self.subTest(nome=nome, params=params):
+                get_cache().clear()
+                url = reverse(nome, args=args)
+                esperado = view_sync(RequestFactory().get(url, params), *args)
+                if hasattr(esperado, 'render'):
+                    esperado.render()
+                get_cache().clear()
+                response = self.client.get(url, params)
+                self.assertEqual(response.status_code, esperado.status_code)
+                self.assertEqual(response.content, esperado.content)
+
+    def test_escrita_repassada_para_view_sincrona(self):
+        unidade = criar_falhas(0, unidades=1)[0]
+        response = self.client.put(
+            reverse('unidade-detail', args=[unidade.pk]),
+            {'nome_unidade': 'Nova', 'grupo_unidade': 'G', 'id_unidade': unidade.id_unidade},
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.client.get(reverse('unidade-detail', args=[unidade.pk])).json()['nome_unidade'], 'Nova')
+
+
+class PerfilBancoTests(TestCase):
+    def test_pragmas_do_sqlite_aplicados_na_conexao(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest('Pragmas específicos do SQLite')
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA synchronous')
+            self.assertEqual(cursor.fetchone()[0], 1)  # NORMAL
+            cursor.execute('PRAGMA cache_size')
+            self.assertEqual(cursor.fetchone()[0], -65536)
+        self.assertEqual(connection.transaction_mode, 'IMMEDIATE')
+
+
+class UniversidadesTests(TestCase):
+    fixtures = ['universidades']
+
+    def test_listas_com_contagens_e_nomes_relacionados(self):
+        universidades = self.client.get(reverse('university-list')).json()
+        self.assertEqual([u['courses_count'] for u in universidades], [2, 1, 1, 1, 1])
+        cursos = self.client.get(reverse('course-list')).json()
+        self.assertEqual(cursos[0]['university_name'], 'Universidade de Oxford')
+        self.assertEqual([c['students_count'] for c in cursos], [2, 1, 1, 1, 1, 1])
+        estudante = self.client.get(reverse('student-list')).json()[2]
+        self.assertEqual(
+            (estudante['full_name'], estudante['course_name'], estudante['university_name']),
+            ('Sophie Dubois', 'Mestrado em Literatura Francesa', 'Sorbonne Université'),
+        )
+
+    def test_detalhes_com_relacoes_aninhadas(self):
+        universidade = self.client.get(reverse('university-detail', args=[1])).json()
+        self.assertEqual([c['students_count'] for c in universidade['courses']], [2, 1])
+        curso = self.client.get(reverse('course-detail', args=[1])).json()
+        self.assertEqual([e['full_name'] for e in curso['students']], ['Ana Silva', 'Marco Rossi'])
+        for nome in ('university-detail', 'course-detail', 'student-detail'):
+            self.assertEqual(self.client.get(reverse(nome, args=[99])).status_code, 404)
+
+    def test_dashboard_stats(self):
+        stats = self.client.get(reverse('dashboard-stats')).json()
+        self.assertEqual((stats['total_universities'], stats['total_courses'], stats['total_students']), (5, 6, 7))
+        self.assertEqual(stats['languages'], ['Alemão', 'Espanhol', 'Francês', 'Inglês'])
+        get_cache().clear()
+        esperado = views.dashboard_stats(RequestFactory().get(reverse('dashboard-stats')))
+        esperado.render()
+        get_cache().clear()
+        self.assertEqual(self.client.get(reverse('dashboard-stats')).content, esperado.content)
+
+    def test_etag_invalidado_por_gravacao(self):
+        etag = self.client.get(reverse('university-list'))['ETag']
+        self.assertEqual(self.client.get(reverse('university-list'), HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        CourseDjango.objects.create(name='Novo', code='N-1', university_id=1)
+        response = self.client.get(reverse('university-list'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()[0]['courses_count'], 3)
+
+
+class UniversidadesQueryCountTests(TestCase):
+    fixtures = ['universidades']
+
+    def ampliar(self, cursos_por_universidade=3, estudantes_por_curso=4):
+        """Mais cursos por universidade e estudantes por curso: o número de queries não deve mudar"""
+        for universidade in UniversityDjango.objects.all():
+            for i in range(cursos_por_universidade):
+                CourseDjango.objects.create(name=f'Curso {i}', code=f'C-{i}', university=universidade)
+        StudentDjango.objects.bulk_create(
+            StudentDjango(first_name='E', last_name=str(n), email=f'e{n}@email.com', course=curso)
+            for curso in CourseDjango.objects.all()
+            for n in (next(_sequencia_estudantes) for _ in range(estudantes_por_curso))
+        )
+
+    def assertQueriesConstantes(self, numero, nome, args=()):
+        """`numero` consultas da view, além da leitura das versões (o corpo em cache é descartado)"""
+        for ampliar in (False, True):
+            if ampliar:
+                self.ampliar()
+            get_cache().clear()
+            with self.subTest(nome=nome, ampliado=ampliar), self.assertNumQueries(QUERY_VERSOES + numero):
+                self.assertEqual(self.client.get(reverse(nome, args=args)).status_code, 200)
+
+    def test_listas_uma_query(self):
+        for nome in ('university-list', 'course-list', 'student-list'):
+            self.assertQueriesConstantes(1, nome)
+
+    def test_detalhes_com_relacoes_aninhadas(self):
+        self.assertQueriesConstantes(2, 'university-detail', [1])
+        self.assertQueriesConstantes(2, 'course-detail', [1])
+        self.assertQueriesConstantes(1, 'student-detail', [1])
+
+
+class DadosSinteticosTests(TestCase):
+    def test_mesma_semente_mesmo_conteudo(self):
+        criados = gerar_dados(seed=7, **volumes_para(200))
+        self.assertEqual(criados, {'unidades': 4, 'falhas': 200, 'universidades': 1, 'cursos': 2, 'estudantes': 200})
+        self.assertEqual(StudentDjango.objects.count(), 200)
+        self.assertEqual(ResumoDiarioFalhasDjango.objects.aggregate(total=Sum('ativas') + Sum('resolvidas'))['total'], 200)
+        primeira_carga = list(FalhaDjango.objects.order_by('pk').values_list('falha_ocorrida', 'data_falha', 'ativa'))
+
+        FalhaDjango.objects.all().delete()
+        gerar_dados(seed=7, **volumes_para(200))
+        self.assertEqual(
+            list(FalhaDjango.objects.order_by('pk').values_list('falha_ocorrida', 'data_falha', 'ativa')),
+            primeira_carga,
+        )
+
+    def test_carga_repetida_acrescenta_e_incrementa_versoes(self):
+        tabelas = ['unidades', 'falhas', 'universidades', 'cursos', 'estudantes']
+        gerar_dados(seed=3, unidades=2, falhas=10, universidades=1, cursos=1, estudantes=5)
+        antes = get_versoes(tabelas)
+        # Ids de unidade e e-mails levam o lote, então rodar de novo não colide
+        gerar_dados(seed=3, unidades=2, falhas=10, universidades=1, cursos=1, estudantes=5)
+        self.assertEqual(UnidadeDjango.objects.count(), 4)
+        self.assertEqual(FalhaDjango.objects.count(), 20)
+        self.assertEqual(StudentDjango.objects.count(), 10)
+        depois = get_versoes(tabelas)
+        for tabela in tabelas:
+            self.assertGreater(depois[tabela][0], antes[tabela][0], tabela)
+
+
+class FixtureUniversidadesTests(TestCase):
+    def contagens(self):
+        return (UniversityDjango.objects.count(), CourseDjango.objects.count(), StudentDjango.objects.count())
+
+    def test_loaddata_idempotente_e_incrementa_versoes(self):
+        tabelas = ['universidades', 'cursos', 'estudantes']
+        antes = get_versoes(tabelas)
+        call_command('loaddata', 'universidades', verbosity=0)
+        self.assertEqual(self.contagens(), (5, 6, 7))
+        depois = get_versoes(tabelas)
+        for tabela in tabelas:
+            self.assertGreater(depois[tabela][0], antes[tabela][0], tabela)
+
+        # A fixture tem pks fixas: carregar de novo sobrescreve em vez de duplicar
+        call_command('loaddata', 'universidades', verbosity=0)
+        self.assertEqual(self.contagens(), (5, 6, 7))
+        self.assertEqual(len(self.client.get(reverse('university-list')).json()), 5)
+
+
+class MetricasTests(TestCase):
+    def setUp(self):
+        metricas.registro.limpar()
+
+    def test_serializacao_medida_uma_vez_por_data(self):
+        criar_falhas(5, unidades=2)
+        falhas = list(FalhaDjango.objects.select_related('unidade'))
+        medicao = metricas.Medicao()
+        token = metricas._medicao.set(medicao)
+        try:
+            with mock.patch('api.serializers.medir_serializacao', wraps=metricas.medir_serializacao) as medir:
+                dados = FalhaSerializer(falhas, many=True).data
+                self.assertEqual(medir.call_count, 1)
+                self.assertEqual(FalhaSerializer(falhas[0]).data, dados[0])
+                self.assertEqual(medir.call_count, 2)
+        finally:
+            metricas._medicao.reset(token)
+        self.assertGreater(medicao.serializacao, 0)
+
+    def test_server_timing_e_histogramas_por_view(self):
+        criar_falhas(5)
+        # Versões do cache + SELECT das falhas (ver FalhaQueryCountTests)
+        consultas = QUERY_VERSOES + 1
+        response = self.client.get(reverse('falha-list'))
+        cabecalho = response['Server-Timing']
+        self.assertIn(f'desc="{consultas} consultas"', cabecalho)
+        self.assertIn(f'resposta;desc="{len(response.content)} bytes"', cabecalho)
+        self.assertRegex(cabecalho, r'serializacao;dur=\d')
+
+        texto = self.client.get(reverse('metricas')).content.decode()
+        self.assertIn('api_requisicoes_total{view="falha-list",metodo="GET",status="200"} 1', texto)
+        self.assertIn(f'api_sql_consultas_sum{{view="falha-list",metodo="GET"}} {consultas}', texto)
+        self.assertIn('api_resposta_bytes_bucket{view="falha-list",metodo="GET",le="+Inf"} 1', texto)
+
+    async def test_consultas_do_orm_assincrono_contadas(self):
+        await UnidadeDjango.objects.acreate(nome_unidade='U', grupo_unidade='G', id_unidade='MET-1')
+        response = await AsyncClient().get(reverse('unidade-list'))
+        self.assertRegex(response['Server-Timing'], r'db;dur=[\d.]+;desc="[1-9]\d* consultas"')
+
+
+class SerializacaoRapidaTests(TestCase):
+    def setUp(self):
+        unidade = criar_falhas(6)[0]
+        unidade.tecnico_unidade = 'José "Zé" \\ \u2028 \x07'
+        unidade.save()
+        FalhaDjango.objects.filter(pk=FalhaDjango.objects.first().pk).update(observacao='linha\nnova\tção 🚧')
+
+    def test_mesmos_bytes_do_serializer_com_e_sem_orjson(self):
+        casos = [
+            ('unidade-list', UnidadeSerializer(UnidadeDjango.objects.all(), many=True)),
+            ('falha-list', FalhaSerializer(FalhaDjango.objects.com_unidade(), many=True)),
+        ]
+        for codificador in (serializacao.orjson, None):
+            for nome, serializer in casos:
+                with self.subTest(nome=nome, orjson=codificador is not None), \
+                        mock.patch.object(serializacao, 'orjson', codificador):
+                    get_cache().clear()
+                    response = self.client.get(reverse(nome))
+                    self.assertEqual(response.content, JSONRenderer().render(serializer.data))
+
+    def test_datas_no_fuso_corrente(self):
+        # O fuso é resolvido uma vez por resposta; o resultado é o do DateTimeField
+        with timezone.override('America/Sao_Paulo'):
+            esperado = JSONRenderer().render(FalhaSerializer(FalhaDjango.objects.com_unidade(), many=True).data)
+            linhas = serializacao.valores(FalhaDjango.objects.all(), FalhaSerializer)
+            self.assertEqual(serializacao.codificar(serializacao.montar(linhas, FalhaSerializer, False)), esperado)
+        self.assertIn(b'-03:00', esperado)
+
+    def test_formato_em_colunas_tem_os_mesmos_valores(self):
+        for params in ({}, {'page_size': 4}):
+            with self.subTest(params=params):
+                objetos = self.client.get(reverse('falha-list'), params).json()
+                response = self.client.get(
+                    reverse('falha-list'), params, HTTP_ACCEPT=serializacao.MEDIA_TYPE_COLUNAS
+                )
+                self.assertEqual(response['Content-Type'], serializacao.MEDIA_TYPE_COLUNAS)
+                colunas = response.json()
+                if params:
+                    self.assertEqual(colunas['next'], objetos['next'])
+                    colunas, objetos = colunas['results'], objetos['results']
+                self.assertEqual([dict(zip(colunas['fields'], linha)) for linha in colunas['rows']], objetos)
+
+
+class CompressaoTests(TestCase):
+    def test_gzip_com_etag_forte_e_304(self):
+        criar_falhas(30)
+        sem_compressao = self.client.get(reverse('falha-list'))
+        response = self.client.get(reverse('falha-list'), HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertEqual(gzip.decompress(response.content), sem_compressao.content)
+        self.assertLess(len(response.content), len(sem_compressao.content) / 4)
+        etag = response['ETag']
+        self.assertEqual(etag, sem_compressao['ETag'][:-1] + '-gzip"')
+
+        response = self.client.get(reverse('falha-list'), HTTP_ACCEPT_ENCODING='gzip', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_sem_compressao_quando_pequena_ou_nao_aceita(self):
+        unidade, = criar_falhas(30, unidades=1)
+        pequena = self.client.get(reverse('unidade-detail', args=[unidade.pk]), HTTP_ACCEPT_ENCODING='gzip')
+        self.assertFalse(pequena.has_header('Content-Encoding'))
+        for aceita in ('', 'gzip;q=0', 'identity'):
+            response = self.client.get(reverse('falha-list'), HTTP_ACCEPT_ENCODING=aceita)
+            self.assertFalse(response.has_header('Content-Encoding'), aceita)
+
+    def test_streaming_comprimido_exceto_eventos(self):
+        criar_falhas(30)
+        esperado = b''.join(self.client.get(reverse('falha-export')).streaming_content)
+        response = self.client.get(reverse('falha-export'), HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(b''.join(response.streaming_content)), esperado)
+
+        request = RequestFactory().get('/', HTTP_ACCEPT_ENCODING='gzip')
+        middleware = compressao.CompressaoMiddleware(
+            lambda request: StreamingHttpResponse(iter([b'data: 1\n\n'] * 500), content_type='text/event-stream')
+        )
+        self.assertFalse(middleware(request).has_header('Content-Encoding'))
+
+    @skipUnless(compressao.brotli, 'pacote brotli não instalado')
+    def test_brotli_preferido(self):
+        criar_falhas(30)
+        response = self.client.get(reverse('falha-list'), HTTP_ACCEPT_ENCODING='gzip, br')
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertEqual(compressao.brotli.decompress(response.content), self.client.get(reverse('falha-list')).content)
+
+    async def test_views_assincronas(self):
+        conteudo = json.dumps([{'texto': 'observação ' * 10}] * 50).encode()
+
+        async def view(request):
+            return HttpResponse(conteudo, content_type='application/json')
+
+        middleware = compressao.CompressaoMiddleware(view)
+        response = await middleware(RequestFactory().get('/', HTTP_ACCEPT_ENCODING='gzip'))
+        self.assertEqual(gzip.decompress(response.content), conteudo)
+
+
+class HistoricoTests(TestCase):
+    def linha_do_tempo(self, unidade, **params):
+        return self.client.get(reverse('unidade-historico', args=[unidade.pk]), params).json()
+
+    def test_criacao_alteracao_e_exclusao_de_uma_falha(self):
+        unidade, = criar_falhas(0, unidades=1)
+        falha = self.client.post(reverse('falha-list'), {
+            'unidade': unidade.pk, 'falha_ocorrida': 'Vazamento', 'data_falha': '2025-01-10',
+        }, content_type='application/json').json()
+        self.client.put(reverse('falha-detail', args=[falha['id']]), {
+            **falha, 'ativa': False, 'observacao': 'Vedação trocada',
+        }, content_type='application/json')
+        self.client.delete(reverse('falha-detail', args=[falha['id']]))
+
+        eventos = self.linha_do_tempo(unidade, tipo='falha')['results']
+        self.assertEqual([e['acao'] for e in eventos], ['deleted', 'updated', 'created'])
+        self.assertEqual(eventos[1]['dados'], {'ativa': [True, False], 'observacao': ['', 'Vedação trocada']})
+        self.assertEqual(eventos[2]['dados']['data_falha'], '2025-01-10')
+        self.assertEqual(eventos[0]['dados']['ativa'], False)
+
+    def test_uma_insercao_por_gravacao_sem_leituras(self):
+        unidade, = criar_falhas(1, unidades=1)
+        falha = self.client.get(reverse('falha-list')).json()[0]
+        # O sinal request_started limpa o log de queries; zerado antes, a captura não se perde
+        reset_queries()
+        with CaptureQueriesContext(connection) as consultas:
+            self.client.put(reverse('falha-detail', args=[falha['id']]), {**falha, 'ativa': False},
+                            content_type='application/json')
+        no_historico = [q['sql'] for q in consultas if 'api_historicodjango' in q['sql']]
+        self.assertEqual(len(no_historico), 1)
+        self.assertTrue(no_historico[0].startswith('INSERT'))
+
+    def test_lote_cascata_e_paginacao(self):
+        unidade, = criar_falhas(4, unidades=1)
+        falhas = self.client.get(reverse('falha-list')).json()
+        self.client.put(reverse('falha-bulk'), [{**f, 'ativa': False} for f in falhas], content_type='application/json')
+        self.client.delete(reverse('unidade-detail', args=[unidade.pk]))
+
+        eventos, url = [], reverse('unidade-historico', args=[unidade.pk]) + '?page_size=3'
+        while url:
+            with self.assertNumQueries(QUERY_VERSOES + 1):
+                pagina = self.client.get(url).json()
+            eventos += pagina['results']
+            url = pagina['next']
+        # Unidade: criada e excluída; cada falha: criada, alterada e excluída em cascata
+        self.assertEqual(len(eventos), 2 + 4 * 3)
+        self.assertEqual((eventos[0]['tipo'], eventos[0]['acao']), ('unidade', 'deleted'))
+        self.assertEqual(eventos, self.linha_do_tempo(unidade, page_size=100)['results'])
+        atualizados = [e for e in eventos if e['acao'] == 'updated']
+        self.assertTrue(all(e['dados'] == {'ativa': [True, False]} for e in atualizados))
+
+    def test_somente_insercao(self):
+        criar_falhas(1, unidades=1)
+        evento = HistoricoDjango.objects.first()
+        for operacao in (evento.save, evento.delete, HistoricoDjango.objects.all().delete,
+                         lambda: HistoricoDjango.objects.update(acao='deleted')):
+            with self.assertRaises(HistoricoImutavel):
+                operacao()
+
+
+class ConfiabilidadeTests(TestCase):
+    def tabelas(self):
+        return (
+            sorted(ConfiabilidadeUnidadeDjango.objects.values_list('unidade_id', *confiabilidade.CAMPOS_UNIDADE)),
+            sorted(OcorrenciaFalhaDjango.objects.values_list('unidade_id', 'falha_ocorrida', 'total')),
+            sorted(AbertasGrupoDjango.objects.values_list('grupo_unidade', 'data', 'total')),
+            sorted(OcorrenciaGrupoDjango.objects.values_list('grupo_unidade', 'falha_ocorrida', 'total')),
+        )
+
+    def test_gravacoes_mantem_as_tabelas_iguais_a_reconstrucao(self):
+        a, b = criar_falhas(0, unidades=2)
+        url = reverse('falha-list')
+        ids = [
+            self.client.post(url, {'unidade': unidade.pk, 'falha_ocorrida': texto, 'data_falha': data},
+                             content_type='application/json').json()['id']
+            for unidade, texto, data in [(a, 'Motor', '2025-01-05'), (a, 'Motor', '2025-01-09'), (b, 'Sensor', '2025-01-02')]
+        ]
+        falha = self.client.get(reverse('falha-detail', args=[ids[0]])).json()
+        resolvida = self.client.put(reverse('falha-detail', args=[ids[0]]), {**falha, 'ativa': False},
+                                    content_type='application/json').json()
+        self.assertIsNotNone(resolvida['resolvida_em'])
+        # Muda unidade e data: primeira/última data das duas unidades são recalculadas
+        falha = self.client.get(reverse('falha-detail', args=[ids[1]])).json()
+        self.client.put(reverse('falha-detail', args=[ids[1]]), {**falha, 'unidade': b.pk, 'data_falha': '2024-12-30'},
+                        content_type='application/json')
+        lote = [{'unidade': a.pk, 'falha_ocorrida': f'Lote {i % 3}', 'data_falha': f'2025-02-{1 + i:02d}'} for i in range(25)]
+        criadas = self.client.post(reverse('falha-bulk'), lote, content_type='application/json').json()['created']
+        self.client.put(reverse('falha-bulk'), [{**f, 'ativa': False} for f in criadas[:10]], content_type='application/json')
+        self.client.delete(reverse('falha-bulk'), [{'id': f['id']} for f in criadas[20:]], content_type='application/json')
+        self.client.delete(reverse('falha-detail', args=[ids[2]]))
+        # Unidade que muda de grupo e unidade excluída com as falhas em cascata
+        self.client.put(reverse('unidade-detail', args=[a.pk]), {
+            'nome_unidade': a.nome_unidade, 'grupo_unidade': 'Grupo B', 'id_unidade': a.id_unidade,
+        }, content_type='application/json')
+        c, = criar_falhas(2, unidades=1)
+        confiabilidade.registrar_lote(adicionadas=[confiabilidade.contribuicao(f) for f in c.falhas.all()])
+        self.client.delete(reverse('unidade-detail', args=[c.pk]))
+
+        incrementais = self.tabelas()
+        confiabilidade.reconstruir()
+        self.assertEqual(incrementais, self.tabelas())
+        linha_a = ConfiabilidadeUnidadeDjango.objects.get(unidade=a)
+        self.assertEqual((linha_a.falhas, linha_a.abertas, linha_a.reparos), (21, 10, 11))
+
+    @override_settings(TIME_ZONE='America/Sao_Paulo')
+    def test_tempo_de_reparo_igual_a_reconstrucao_fora_de_utc(self):
+        unidade, = criar_falhas(0, unidades=1)
+        falha = self.client.post(reverse('falha-list'), {
+            'unidade': unidade.pk, 'falha_ocorrida': 'Motor', 'data_falha': '2025-01-05',
+        }, content_type='application/json').json()
+        # Resolvida às 02:00 UTC de 05/01, que ainda é 04/01 em São Paulo
+        resolucao = confiabilidade.inicio_do_dia(date(2025, 1, 5)) + timedelta(hours=2)
+        with mock.patch.object(timezone, 'now', return_value=resolucao):
+            self.client.put(reverse('falha-detail', args=[falha['id']]), {**falha, 'ativa': False},
+                            content_type='application/json')
+
+        incrementais = self.tabelas()
+        self.assertEqual(ConfiabilidadeUnidadeDjango.objects.get().tempo_reparo, timedelta(hours=2))
+        confiabilidade.reconstruir()
+        self.assertEqual(incrementais, self.tabelas())
+
+    def test_metricas_por_unidade_e_grupo(self):
+        unidade, sem_falhas = criar_falhas(0, unidades=2)
+        hoje = timezone.localdate()
+        for dias, texto, ativa in [(30, 'Motor', True), (20, 'Motor', True), (10, 'Sensor', True), (0, 'Motor', False)]:
+            data = hoje - timedelta(days=dias)
+            FalhaDjango.objects.create(
+                unidade=unidade, falha_ocorrida=texto, data_falha=data, ativa=ativa,
+                resolvida_em=None if ativa else confiabilidade.inicio_do_dia(data) + timedelta(hours=6),
+            )
+        reconstruir_resumo_diario()
+        confiabilidade.reconstruir()
+
+        url = reverse('confiabilidade-unidades')
+        reset_queries()
+        # Página, idades das abertas e recorrentes, mais a consulta às versões
+        with self.assertNumQueries(QUERY_VERSOES + 3):
+            pagina = self.client.get(url, {'page_size': 1}).json()
+        primeira = pagina['results'][0]
+        self.assertEqual(primeira['id'], unidade.pk)
+        self.assertEqual((primeira['falhas'], primeira['abertas'], primeira['mttr_horas'], primeira['mtbf_dias']),
+                         (4, 3, 6.0, 10.0))
+        self.assertEqual(primeira['idade_abertas_dias'], {'p50': 20, 'p90': 30, 'max': 30})
+        self.assertEqual(primeira['recorrentes'], [{'falha_ocorrida': 'Motor', 'total': 3},
+                                                   {'falha_ocorrida': 'Sensor', 'total': 1}])
+
+        segunda = self.client.get(pagina['next']).json()
+        self.assertIsNone(segunda['next'])
+        self.assertEqual(segunda['results'][0]['id'], sem_falhas.pk)
+        self.assertEqual((segunda['results'][0]['falhas'], segunda['results'][0]['idade_abertas_dias']), (0, None))
+
+        grupo, = self.client.get(reverse('confiabilidade-grupos')).json()
+        self.assertEqual((grupo['grupo_unidade'], grupo['unidades'], grupo['falhas']), ('Grupo A', 2, 4))
+        self.assertEqual((grupo['mttr_horas'], grupo['mtbf_dias']), (6.0, 10.0))
+        self.assertEqual(grupo['idade_abertas_dias'], primeira['idade_abertas_dias'])
+        self.assertEqual(grupo['recorrentes'], primeira['recorrentes'])
+        self.assertEqual(self.client.get(url, {'grupo': 'Outro'}).json()['results'], [])
+
+    def test_resolvida_em_acompanha_ativa(self):
+        criar_falhas(1, unidades=1)
+        falha = FalhaDjango.objects.get()
+        falha.ativa = False
+        falha.save()
+        resolvida_em = FalhaDjango.objects.get().resolvida_em
+        self.assertIsNotNone(resolvida_em)
+
+        falha = FalhaDjango.objects.get()
+        falha.observacao = 'Revisada'
+        falha.save()
+        self.assertEqual(FalhaDjango.objects.get().resolvida_em, resolvida_em)
+
+        falha.ativa = True
+        falha.save()
+        self.assertIsNone(FalhaDjango.objects.get().resolvida_em)
+
+
+@override_settings(API_TAREFAS=TAREFAS_TESTES)
+class TarefasTests(TestCase):
+    def tearDown(self):
+        shutil.rmtree(TAREFAS_TESTES['DIRETORIO'], ignore_errors=True)
+
+    def submeter(self, corpo):
+        return self.client.post(reverse('tarefa-list'), corpo, content_type='application/json')
+
+    def test_exportacao_em_segundo_plano(self):
+        criar_falhas(3, unidades=1)
+
+        resposta = self.submeter({'tipo': 'exportacao', 'parametros': {'formato': 'csv', 'data_inicio': '2025-01-02'}})
+        self.assertEqual(resposta.status_code, 202)
+        tarefa = resposta.json()
+        self.assertEqual(tarefa['status'], 'pendente')
+        self.assertTrue(resposta['Location'].endswith(reverse('tarefa-detail', args=[tarefa['id']])))
+        self.assertEqual(self.client.get(reverse('tarefa-resultado', args=[tarefa['id']])).status_code, 409)
+
+        self.assertEqual(tarefas.executar_pendentes(), 1)
+        tarefa = self.client.get(reverse('tarefa-detail', args=[tarefa['id']])).json()
+        self.assertEqual(tarefa['status'], 'concluida')
+        self.assertEqual((tarefa['progresso'], tarefa['total'], tarefa['resultado']['linhas']), (2, 2, 2))
+
+        resposta = self.client.get(reverse('tarefa-resultado', args=[tarefa['id']]))
+        self.assertIn('attachment; filename="falhas.csv"', resposta['Content-Disposition'])
+        esperado = self.client.get(reverse('falha-export'), {'formato': 'csv', 'data_inicio': '2025-01-02'})
+        self.assertEqual(b''.join(resposta.streaming_content), b''.join(esperado.streaming_content))
+
+        self.assertEqual(self.submeter({'tipo': 'exportacao', 'parametros': {'ativa': 'talvez'}}).status_code, 400)
+        self.assertEqual(self.submeter({'tipo': 'importacao'}).status_code, 400)
+        for tipo in ([], {}, ['exportacao'], None, 1):
+            with self.subTest(tipo=tipo):
+                self.assertEqual(self.submeter({'tipo': tipo}).status_code, 400)
+
+    def test_etag_muda_com_status_e_progresso(self):
+        criar_falhas(3, unidades=1)
+        tarefa = tarefas.submeter('reconstrucao', {})
+        url = reverse('tarefa-detail', args=[tarefa.pk])
+
+        def revalidar(etag):
+            return self.client.get(url, headers={'If-None-Match': etag})
+
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(revalidar(etag).status_code, 304)
+        lista = self.client.get(reverse('tarefa-list'))['ETag']
+
+        reservada = tarefas.reservar('a')
+        self.assertEqual(revalidar(etag).status_code, 200)
+        etag = self.client.get(url)['ETag']
+        tarefas.Progresso(reservada)(1, 2)
+        resposta = revalidar(etag)
+        self.assertEqual((resposta.status_code, resposta.json()['progresso']), (200, 1))
+        self.assertNotEqual(self.client.get(reverse('tarefa-list'))['ETag'], lista)
+
+        tarefas.executar(reservada)
+        resultado = self.client.get(reverse('tarefa-resultado', args=[tarefa.pk]))
+        self.assertEqual(resultado.status_code, 200)
+        resposta = self.client.get(reverse('tarefa-resultado', args=[tarefa.pk]), headers={'If-None-Match': resultado['ETag']})
+        self.assertEqual(resposta.status_code, 304)
+
+    def test_reserva_falhas_expiracao_e_limpeza(self):
+        criar_falhas(2, unidades=1)
+        reconstrucao = tarefas.submeter('reconstrucao', {})
+        reservada = tarefas.reservar('a')
+        self.assertEqual(reservada.pk, reconstrucao.pk)
+        # Uma tarefa reservada não é entregue a outro executor
+        self.assertIsNone(tarefas.reservar('b'))
+        tarefas.executar(reservada)
+        reconstrucao.refresh_from_db()
+        self.assertEqual(reconstrucao.status, 'concluida')
+        self.assertEqual(reconstrucao.resultado['api_resumodiariofalhasdjango'], 2)
+
+        # Importação cujo arquivo sumiu: falha com o erro gravado
+        sem_arquivo = TarefaDjango.objects.create(
+            tipo='importacao', parametros={'tipo': 'falhas', 'formato': 'csv'}, entrada='/inexistente/falhas.csv',
+        )
+        with self.assertLogs('api.tarefas', 'ERROR'):
+            tarefas.executar_pendentes()
+        sem_arquivo.refresh_from_db()
+        self.assertEqual(sem_arquivo.status, 'falhou')
+        self.assertIn('inexistente', sem_arquivo.erro)
+
+        # Processo que caiu durante a execução: sem renovação, a tarefa expira
+        interrompida = TarefaDjango.objects.create(
+            tipo='reconstrucao', status='executando', atualizada_em=timezone.now() - timedelta(hours=1),
+        )
+        self.assertEqual(tarefas.expirar(), 1)
+        interrompida.refresh_from_db()
+        self.assertEqual(interrompida.status, 'falhou')
+
+        lista = self.client.get(reverse('tarefa-list'), {'status': 'falhou'}).json()
+        self.assertEqual([tarefa['id'] for tarefa in lista['results']], [interrompida.pk, sem_arquivo.pk])
+        self.assertEqual(self.client.get(reverse('tarefa-list'), {'status': 'parada'}).status_code, 400)
+
+        TarefaDjango.objects.update(concluida_em=timezone.now() - timedelta(days=30))
+        self.assertEqual(tarefas.limpar(), 3)
+
+    def test_expirada_durante_a_execucao_continua_como_falha(self):
+        criar_falhas(2, unidades=1)
+        tarefas.submeter('exportacao', {'formato': 'csv'})
+        tarefa = tarefas.reservar('a')
+
+        def exportar_devagar(tarefa, progresso):
+            # O processo pareceu parado por mais de EXPIRACAO e outro executor expirou a tarefa
+            TarefaDjango.objects.filter(pk=tarefa.pk).update(atualizada_em=timezone.now() - timedelta(hours=1))
+            tarefas.expirar()
+            return tarefas.exportar(tarefa, progresso)
+
+        with mock.patch.dict(tarefas.EXECUTORES, {'exportacao': exportar_devagar}), \
+                self.assertLogs('api.tarefas', 'WARNING'):
+            tarefas.executar(tarefa)
+        self.assertEqual(tarefa.status, 'falhou')
+        self.assertIn('Interrompida', tarefa.erro)
+        self.assertEqual(TarefaDjango.objects.get().status, 'falhou')
+        # O arquivo gerado depois da expiração não fica órfão
+        self.assertEqual(os.listdir(TAREFAS_TESTES['DIRETORIO']), [])
+
+    def test_despachante_iniciado_pela_primeira_requisicao_do_processo(self):
+        with mock.patch.object(tarefas, 'Despachante') as despachante, \
+                mock.patch.dict(tarefas._despachantes, clear=True):
+            with override_settings(API_TAREFAS={**TAREFAS_TESTES, 'INICIAR': True}):
+                self.client.get(reverse('tarefa-list'))
+                self.client.get(reverse('tarefa-list'))
+            despachante.assert_called_once()
+            self.assertIn(os.getpid(), tarefas._despachantes)
+
+            # Submissões acordam o despachante do processo
+            with self.captureOnCommitCallbacks(execute=True):
+                self.assertEqual(self.submeter({'tipo': 'reconstrucao'}).status_code, 202)
+            despachante.return_value.iniciar.return_value.acordar.assert_called_once()
+
+        # Com INICIAR=False as requisições não iniciam nenhum
+        with mock.patch.object(tarefas, 'Despachante') as despachante, \
+                mock.patch.dict(tarefas._despachantes, clear=True):
+            self.client.get(reverse('tarefa-list'))
+            despachante.assert_not_called()
+
+    def test_renovacao_durante_etapa_longa(self):
+        tarefas.submeter('reconstrucao', {})
+        tarefa = tarefas.reservar('a')
+        renovada = threading.Event()
+
+        def etapa_longa(tarefa, progresso):
+            # Nenhuma chamada ao Progresso: só a thread de renovação mantém a tarefa viva
+            self.assertTrue(renovada.wait(5))
+            return {}
+
+        with mock.patch.dict(tarefas.EXECUTORES, {'reconstrucao': etapa_longa}), \
+                mock.patch.object(tarefas, 'intervalo_renovacao', return_value=0.01), \
+                mock.patch.object(tarefas.Renovacao, 'renovar', side_effect=renovada.set):
+            tarefas.executar(tarefa)
+        self.assertEqual(TarefaDjango.objects.get().status, 'concluida')
@@ -1,6 +1,8 @@
 from django.urls import path
-from . import views
+from . import metricas, views, views_async
 
+# As leituras de unidades, falhas e estatísticas usam as views assíncronas
+# (views_async), que repassam os outros métodos para as síncronas (views)
 urlpatterns = [
     # Universities
     path('universities/', views.university_list, name='university-list'),
@@ -15,13 +17,41 @@ urlpatterns = [
     path('students/<int:pk>/', views.student_detail, name='student-detail'),
     
     # Dashboard
-    path('dashboard/stats/', views.dashboard_stats, name='dashboard-stats'),
+    path('dashboard/stats/', views_async.dashboard_stats, name='dashboard-stats'),
+    path('dashboard/falhas/', views_async.falha_stats, name='falha-stats'),
     
     # Unidades
-    path('unidades/', views.unidade_list, name='unidade-list'),
-    path('unidades/<int:pk>/', views.unidade_detail, name='unidade-detail'),
+    path('unidades/', views_async.unidade_list, name='unidade-list'),
+    path('unidades/summary/', views_async.unidade_summary, name='unidade-summary'),
+    path('unidades/bulk/', views.unidade_bulk, name='unidade-bulk'),
+    path('unidades/<int:pk>/', views_async.unidade_detail, name='unidade-detail'),
+    path('unidades/<int:pk>/historico/', views.unidade_historico, name='unidade-historico'),
+
+    # Métricas de confiabilidade (MTTR, MTBF, idade das abertas, recorrentes)
+    path('confiabilidade/unidades/', views.confiabilidade_unidades, name='confiabilidade-unidades'),
+    path('confiabilidade/grupos/', views.confiabilidade_grupos, name='confiabilidade-grupos'),
     
     # Falhas
-    path('falhas/', views.falha_list, name='falha-list'),
-    path('falhas/<int:pk>/', views.falha_detail, name='falha-detail'),
+    path('falhas/', views_async.falha_list, name='falha-list'),
+    path('falhas/bulk/', views.falha_bulk, name='falha-bulk'),
+    path('falhas/export/', views.falha_export, name='falha-export'),
+    path('falhas/busca/', views.falha_busca, name='falha-busca'),
+    path('falhas/<int:pk>/', views_async.falha_detail, name='falha-detail'),
+
+    # Sincronização incremental
+    path('sync/', views.sync, name='sync'),
+
+    # Feed de eventos em tempo real (Server-Sent Events)
+    path('eventos/', views.eventos_stream, name='eventos'),
+
+    # Métricas por view no formato do Prometheus
+    path('metricas/', metricas.metricas, name='metricas'),
+
+    # Importação em massa (tipo: unidades ou falhas), executada como tarefa
+    path('importacao/<str:tipo>/', views.importacao, name='importacao'),
+
+    # Tarefas em segundo plano (exportação, importação, reconstrução)
+    path('tarefas/', views.tarefa_list, name='tarefa-list'),
+    path('tarefas/<int:pk>/', views.tarefa_detail, name='tarefa-detail'),
+    path('tarefas/<int:pk>/resultado/', views.tarefa_resultado, name='tarefa-resultado'),
 ]
\ No newline at end of file
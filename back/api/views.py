@@ -1,137 +1,157 @@
+from django.db import transaction
+from django.core.handlers.asgi import ASGIRequest
+from django.http import FileResponse, JsonResponse, StreamingHttpResponse
+from django.urls import reverse
 from rest_framework import status
-from rest_framework.decorators import api_view
+from rest_framework.decorators import api_view, parser_classes, renderer_classes
+from rest_framework.parsers import MultiPartParser
 from rest_framework.response import Response
-from .models import UnidadeDjango, FalhaDjango
-from .serializers import UnidadeSerializer, FalhaSerializer
-from .mock_data import (
-    MOCK_UNIVERSITIES, MOCK_COURSES, MOCK_STUDENTS,
-    get_university_by_id, get_course_by_id, get_student_by_id,
-    get_courses_by_university, get_students_by_course
+from .models import (
+    UniversityDjango, CourseDjango, StudentDjango,
+    UnidadeDjango, FalhaDjango, ResumoDiarioFalhasDjango, TarefaDjango,
 )
+from .serializers import (
+    UniversitySerializer, UniversityDetailSerializer, CourseSerializer, CourseDetailSerializer,
+    StudentSerializer, UnidadeSerializer, UnidadeResumoSerializer, FalhaSerializer, HistoricoSerializer,
+    TarefaSerializer,
+)
+from .filters import FiltroInvalido, filtrar_falhas, filtrar_resumos_diarios
+from .stats import estatisticas_falhas, estatisticas_resumo_diario
+from . import bulk, confiabilidade, historico, rollup, serializacao, tarefas
+from .cache import cache_resposta
+from .metricas import JSONRendererMedido
+from .export import FORMATOS, exportar_falhas, exportar_falhas_async
+from .importacao import detectar_formato
+from .busca import buscar_falhas
+from .sync import CursorExpirado, sincronizar
+from . import eventos
+# Ordenações usadas pela paginação por cursor (sempre terminam no id)
+ORDENACAO_UNIDADES = ('nome_unidade', 'id')
+ORDENACAO_FALHAS = ('-data_falha', '-created_at', '-id')
+# Universidades, cursos e estudantes aparecem uns nas respostas dos outros (contagens e nomes)
+TABELAS_UNIVERSIDADES = ('universidades', 'cursos', 'estudantes')
 
+@cache_resposta(*TABELAS_UNIVERSIDADES)
 @api_view(['GET'])
 def university_list(request):
-    """Lista todas as universidades"""
-    # Adiciona contagem de cursos para cada universidade
-    universities_with_counts = []
-    for uni in MOCK_UNIVERSITIES:
-        uni_copy = uni.copy()
-        uni_copy['courses_count'] = len(get_courses_by_university(uni['id']))
-        universities_with_counts.append(uni_copy)
-    
-    return Response(universities_with_counts)
+    """Lista todas as universidades com a contagem de cursos"""
+    universities = UniversityDjango.objects.com_contagens().order_by('id')
+    return Response(UniversitySerializer(universities, many=True).data)
 
+@cache_resposta(*TABELAS_UNIVERSIDADES)
 @api_view(['GET'])
 def university_detail(request, pk):
-    """Detalhes de uma universidade específica"""
-    university = get_university_by_id(pk)
-    if not university:
+    """Detalhes de uma universidade específica, com seus cursos"""
+    try:
+        university = UniversityDjango.objects.com_cursos().get(pk=pk)
+    except UniversityDjango.DoesNotExist:
         return Response({'error': 'Universidade não encontrada'}, status=status.HTTP_404_NOT_FOUND)
-    
-    # Adiciona cursos da universidade
-    university_copy = university.copy()
-    courses = get_courses_by_university(pk)
-    university_copy['courses'] = courses
-    university_copy['courses_count'] = len(courses)
-    
-    return Response(university_copy)
+    return Response(UniversityDetailSerializer(university).data)
 
+@cache_resposta(*TABELAS_UNIVERSIDADES)
 @api_view(['GET'])
 def course_list(request):
-    """Lista todos os cursos"""
-    # Adiciona informações da universidade e contagem de estudantes
-    courses_with_details = []
-    for course in MOCK_COURSES:
-        course_copy = course.copy()
-        university = get_university_by_id(course['university_id'])
-        course_copy['university_name'] = university['name'] if university else 'N/A'
-        course_copy['students_count'] = len(get_students_by_course(course['id']))
-        courses_with_details.append(course_copy)
-    
-    return Response(courses_with_details)
+    """Lista todos os cursos com a universidade e a contagem de estudantes"""
+    courses = CourseDjango.objects.com_contagens().order_by('id')
+    return Response(CourseSerializer(courses, many=True).data)
 
+@cache_resposta(*TABELAS_UNIVERSIDADES)
 @api_view(['GET'])
 def course_detail(request, pk):
-    """Detalhes de um curso específico"""
-    course = get_course_by_id(pk)
-    if not course:
+    """Detalhes de um curso específico, com seus estudantes"""
+    try:
+        course = CourseDjango.objects.com_estudantes().get(pk=pk)
+    except CourseDjango.DoesNotExist:
         return Response({'error': 'Curso não encontrado'}, status=status.HTTP_404_NOT_FOUND)
-    
-    # Adiciona informações da universidade e estudantes
-    course_copy = course.copy()
-    university = get_university_by_id(course['university_id'])
-    course_copy['university_name'] = university['name'] if university else 'N/A'
-    
-    students = get_students_by_course(pk)
-    course_copy['students'] = students
-    course_copy['students_count'] = len(students)
-    
-    return Response(course_copy)
+    return Response(CourseDetailSerializer(course).data)
 
+@cache_resposta(*TABELAS_UNIVERSIDADES)
 @api_view(['GET'])
 def student_list(request):
-    """Lista todos os estudantes"""
-    # Adiciona informações do curso e universidade
-    students_with_details = []
-    for student in MOCK_STUDENTS:
-        student_copy = student.copy()
-        course = get_course_by_id(student['course_id'])
-        if course:
-            student_copy['course_name'] = course['name']
-            university = get_university_by_id(course['university_id'])
-            student_copy['university_name'] = university['name'] if university else 'N/A'
-        else:
-            student_copy['course_name'] = 'N/A'
-            student_copy['university_name'] = 'N/A'
-        
-        student_copy['full_name'] = f"{student['first_name']} {student['last_name']}"
-        students_with_details.append(student_copy)
-    
-    return Response(students_with_details)
+    """Lista todos os estudantes com o curso e a universidade"""
+    students = StudentDjango.objects.com_curso().order_by('id')
+    return Response(StudentSerializer(students, many=True).data)
 
+@cache_resposta(*TABELAS_UNIVERSIDADES)
 @api_view(['GET'])
 def student_detail(request, pk):
     """Detalhes de um estudante específico"""
-    student = get_student_by_id(pk)
-    if not student:
+    try:
+        student = StudentDjango.objects.com_curso().get(pk=pk)
+    except StudentDjango.DoesNotExist:
         return Response({'error': 'Estudante não encontrado'}, status=status.HTTP_404_NOT_FOUND)
-    
-    # Adiciona informações do curso e universidade
-    student_copy = student.copy()
-    course = get_course_by_id(student['course_id'])
-    if course:
-        student_copy['course_name'] = course['name']
-        university = get_university_by_id(course['university_id'])
-        student_copy['university_name'] = university['name'] if university else 'N/A'
-    else:
-        student_copy['course_name'] = 'N/A'
-        student_copy['university_name'] = 'N/A'
-    
-    student_copy['full_name'] = f"{student['first_name']} {student['last_name']}"
-    
-    return Response(student_copy)
+    return Response(StudentSerializer(student).data)
 
+@cache_resposta(*TABELAS_UNIVERSIDADES)
 @api_view(['GET'])
 def dashboard_stats(request):
     """Estatísticas gerais do dashboard"""
-    stats = {
-        'total_universities': len(MOCK_UNIVERSITIES),
-        'total_courses': len(MOCK_COURSES),
-        'total_students': len(MOCK_STUDENTS),
-        'countries': list(set(uni['country'] for uni in MOCK_UNIVERSITIES)),
-        'languages': list(set(course['language'] for course in MOCK_COURSES if course['language'])),
+    return Response(dashboard_stats_dados())
+
+def dashboard_stats_dados():
+    consultas = consultas_dashboard()
+    return {
+        'total_universities': consultas['total_universities'].count(),
+        'total_courses': consultas['total_courses'].count(),
+        'total_students': consultas['total_students'].count(),
+        'countries': list(consultas['countries']),
+        'languages': list(consultas['languages']),
     }
-    
+
+def consultas_dashboard():
+    """Consultas de dashboard_stats: três contagens e os países e idiomas distintos"""
+    return {
+        'total_universities': UniversityDjango.objects.all(),
+        'total_courses': CourseDjango.objects.all(),
+        'total_students': StudentDjango.objects.all(),
+        'countries': UniversityDjango.objects.order_by('country').values_list('country', flat=True).distinct(),
+        'languages': CourseDjango.objects.exclude(language='').order_by('language')
+                     .values_list('language', flat=True).distinct(),
+    }
+
+# Filtros de falha_stats que o resumo diário consegue responder sozinho
+FILTROS_RESUMO_DIARIO = {'periodo', 'unidade', 'data_inicio', 'data_fim'}
+
+@cache_resposta('falhas', 'unidades')
+@api_view(['GET'])
+def falha_stats(request):
+    """
+    Estatísticas de falhas agregadas por período (?periodo=dia|semana|mes),
+    por grupo de unidade e ativas x resolvidas. Aceita os mesmos filtros de
+    /api/falhas/ (unidade, ativa, data_inicio, data_fim, falha_ocorrida).
+
+    Sem filtros por ativa ou texto, lê o resumo diário em vez da tabela de falhas.
+    """
+    params = request.query_params
+    periodo = params.get('periodo', 'dia')
+    try:
+        if set(params) <= FILTROS_RESUMO_DIARIO:
+            resumos = filtrar_resumos_diarios(ResumoDiarioFalhasDjango.objects.all(), params)
+            stats = estatisticas_resumo_diario(resumos, periodo)
+        else:
+            falhas = filtrar_falhas(FalhaDjango.objects.all(), params)
+            stats = estatisticas_falhas(falhas, periodo)
+    except FiltroInvalido as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
     return Response(stats)
 
 # CRUD para Unidades
+@cache_resposta('unidades')
 @api_view(['GET', 'POST'])
+@renderer_classes([JSONRendererMedido, serializacao.ColunasRenderer])
 def unidade_list(request):
-    """Lista todas as unidades ou cria uma nova"""
+    """
+    Lista todas as unidades (com paginação por cursor opcional; em colunas
+    com o Accept de api.serializacao) ou cria uma nova
+    """
     if request.method == 'GET':
-        unidades = UnidadeDjango.objects.all()
-        serializer = UnidadeSerializer(unidades, many=True)
-        return Response(serializer.data)
+        try:
+            return serializacao.resposta_lista(
+                request, UnidadeDjango.objects.all(), UnidadeSerializer, ORDENACAO_UNIDADES
+            )
+        except FiltroInvalido as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
     
     elif request.method == 'POST':
         serializer = UnidadeSerializer(data=request.data)
@@ -140,6 +160,19 @@ def unidade_list(request):
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+@cache_resposta('unidades', 'falhas')
+@api_view(['GET'])
+def unidade_summary(request):
+    """Resumo por unidade: total de falhas, falhas ativas e última falha"""
+    serializer = UnidadeResumoSerializer(unidades_com_resumo(), many=True)
+    return Response(serializer.data)
+
+def unidades_com_resumo():
+    return UnidadeDjango.objects.only(
+        'id', 'nome_unidade', 'grupo_unidade', 'tecnico_unidade', 'id_unidade', 'created_at'
+    ).com_resumo_falhas()
+
+@cache_resposta('unidades')
 @api_view(['GET', 'PUT', 'DELETE'])
 def unidade_detail(request, pk):
     """Detalhes, atualização ou exclusão de uma unidade específica"""
@@ -155,7 +188,10 @@ def unidade_detail(request, pk):
     elif request.method == 'PUT':
         serializer = UnidadeSerializer(unidade, data=request.data)
         if serializer.is_valid():
-            serializer.save()
+            grupo_anterior = unidade.grupo_unidade
+            with transaction.atomic():
+                unidade = serializer.save()
+                confiabilidade.mover_unidades({unidade.pk: (grupo_anterior, unidade.grupo_unidade)})
             return Response(serializer.data)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
@@ -163,30 +199,79 @@ def unidade_detail(request, pk):
         unidade.delete()
         return Response(status=status.HTTP_204_NO_CONTENT)
 
+# O histórico só muda junto com unidades e falhas, então as versões delas bastam
+@cache_resposta('unidades', 'falhas')
+@api_view(['GET'])
+def unidade_historico(request, pk):
+    """
+    Linha do tempo da unidade e das suas falhas (criações, alterações e
+    exclusões), do evento mais recente para o mais antigo, sempre paginada
+    por cursor. Aceita ?tipo=falha|unidade e ?registro=<id>; continua
+    disponível depois que a unidade é excluída.
+    """
+    paginator = historico.PaginacaoHistorico()
+    try:
+        pagina = paginator.paginate_queryset(historico.linha_do_tempo(pk, request.query_params), request)
+    except FiltroInvalido as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    return paginator.get_paginated_response(HistoricoSerializer(pagina, many=True).data)
+
+# As tabelas de confiabilidade e o resumo diário mudam junto com as falhas
+@cache_resposta('falhas', 'unidades')
+@api_view(['GET'])
+def confiabilidade_unidades(request):
+    """
+    MTTR, MTBF, idade das falhas abertas (p50, p90, máx.) e falhas mais
+    recorrentes de cada unidade, sempre paginado por cursor (ordem de id).
+    Aceita ?grupo=<grupo_unidade>.
+    """
+    paginator = confiabilidade.PaginacaoConfiabilidade()
+    try:
+        pagina = paginator.paginate_queryset(confiabilidade.unidades_com_contadores(request.query_params), request)
+    except FiltroInvalido as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    return paginator.get_paginated_response(confiabilidade.metricas_unidades(pagina))
+
+@cache_resposta('falhas', 'unidades')
+@api_view(['GET'])
+def confiabilidade_grupos(request):
+    """As mesmas métricas de confiabilidade, por grupo_unidade"""
+    return Response(confiabilidade.metricas_grupos())
+
+@cache_resposta('falhas', 'unidades')
 @api_view(['GET', 'POST'])
+@renderer_classes([JSONRendererMedido, serializacao.ColunasRenderer])
 def falha_list(request):
     """
-    Lista todas as falhas ou cria uma nova falha
+    Lista as falhas (com filtros opcionais por unidade, ativa, data_inicio,
+    data_fim e falha_ocorrida, paginação por cursor opcional e formato em
+    colunas pelo Accept) ou cria uma nova falha
     """
     if request.method == 'GET':
-        falhas = FalhaDjango.objects.all()
-        serializer = FalhaSerializer(falhas, many=True)
-        return Response(serializer.data)
+        try:
+            falhas = filtrar_falhas(FalhaDjango.objects.all(), request.query_params)
+            return serializacao.resposta_lista(request, falhas, FalhaSerializer, ORDENACAO_FALHAS)
+        except FiltroInvalido as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
     
     elif request.method == 'POST':
         serializer = FalhaSerializer(data=request.data)
         if serializer.is_valid():
-            serializer.save()
+            with transaction.atomic():
+                falha = serializer.save()
+                rollup.registrar_criacao(falha)
+                confiabilidade.registrar_criacao(falha)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+@cache_resposta('falhas', 'unidades')
 @api_view(['GET', 'PUT', 'DELETE'])
 def falha_detail(request, pk):
     """
     Recupera, atualiza ou deleta uma falha específica
     """
     try:
-        falha = FalhaDjango.objects.get(pk=pk)
+        falha = FalhaDjango.objects.com_unidade().get(pk=pk)
     except FalhaDjango.DoesNotExist:
         return Response({'error': 'Falha não encontrada'}, status=status.HTTP_404_NOT_FOUND)
     
@@ -197,10 +282,229 @@ def falha_detail(request, pk):
     elif request.method == 'PUT':
         serializer = FalhaSerializer(falha, data=request.data)
         if serializer.is_valid():
-            serializer.save()
+            chave_anterior = rollup.chave_resumo(falha)
+            anterior = confiabilidade.contribuicao(falha)
+            with transaction.atomic():
+                falha = serializer.save()
+                rollup.registrar_alteracao(chave_anterior, falha)
+                confiabilidade.registrar_alteracao(anterior, falha)
             return Response(serializer.data)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
     elif request.method == 'DELETE':
-        falha.delete()
+        with transaction.atomic():
+            rollup.registrar_exclusao(falha)
+            falha.delete()
+            confiabilidade.registrar_exclusao(falha)
         return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+@cache_resposta('falhas', 'unidades')
+@api_view(['GET'])
+def falha_busca(request):
+    """
+    Busca de texto em falha_ocorrida, observacao e nome da unidade (?q=),
+    ordenada por relevância. Aceita unidade, ativa e limit.
+    """
+    try:
+        falhas = buscar_falhas(request.query_params)
+    except FiltroInvalido as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    serializer = FalhaSerializer(falhas, many=True)
+    return Response(serializer.data)
+
+@cache_resposta('unidades', 'falhas')
+@api_view(['GET'])
+def sync(request):
+    """
+    Sincronização incremental: unidades e falhas alteradas e ids excluídos
+    desde ?cursor= (retornado pela chamada anterior) ou ?since= (ISO 8601).
+    Sem nenhum dos dois, retorna a carga completa. Repita com o novo cursor
+    enquanto has_more for true.
+    """
+    try:
+        return Response(sincronizar(request.query_params))
+    except FiltroInvalido as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    except CursorExpirado as e:
+        return Response({'error': str(e)}, status=status.HTTP_410_GONE)
+
+@cache_resposta('falhas', 'unidades')
+@api_view(['GET'])
+def falha_export(request):
+    """
+    Exporta o histórico de falhas com os dados da unidade em NDJSON ou CSV
+    (?formato=ndjson|csv), em streaming. Aceita os filtros de /api/falhas/.
+    """
+    formato = request.query_params.get('formato', 'ndjson')
+    try:
+        falhas = filtrar_falhas(FalhaDjango.objects.all(), request.query_params)
+        # Sob ASGI um iterador síncrono seria lido inteiro antes do envio (ver api.export)
+        exportar = exportar_falhas_async if isinstance(request._request, ASGIRequest) else exportar_falhas
+        conteudo = exportar(formato, falhas)
+    except FiltroInvalido as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    response = StreamingHttpResponse(conteudo, content_type=FORMATOS[formato])
+    response['Content-Disposition'] = f'attachment; filename="falhas.{formato}"'
+    return response
+
+async def eventos_stream(request):
+    """
+    Feed de eventos (Server-Sent Events) com criações, alterações e exclusões
+    de falhas e unidades. Aceita ?tipos=falha,unidade e retoma a partir do
+    cabeçalho Last-Event-ID enviado pelo EventSource ao reconectar.
+    """
+    if request.method != 'GET':
+        return JsonResponse({'error': 'Método não permitido'}, status=405)
+    try:
+        tipos = eventos.parse_tipos(request.GET.get('tipos'))
+        ultimo_id = eventos.parse_ultimo_id(
+            request.headers.get('Last-Event-ID') or request.GET.get('last_event_id')
+        )
+    except FiltroInvalido as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+    feed = eventos.get_feed()
+    if isinstance(request, ASGIRequest):
+        conteudo = eventos.transmitir_async(feed.assinar(eventos.AssinanteAsync(tipos), ultimo_id))
+    else:
+        # Em servidores WSGI (runserver) cada cliente ocupa uma thread
+        conteudo = eventos.transmitir_sync(feed.assinar(eventos.AssinanteSync(tipos), ultimo_id))
+
+    response = StreamingHttpResponse(conteudo, content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Impede que proxies (nginx) acumulem o stream antes de repassar
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+@api_view(['POST'])
+@parser_classes([MultiPartParser])
+def importacao(request, tipo):
+    """
+    Importa unidades ou falhas de um arquivo CSV/XLSX enviado no campo
+    'arquivo' (multipart), em segundo plano: responde 202 com a tarefa, cujo
+    resultado traz quantas linhas foram criadas e os erros por linha.
+    """
+    arquivo = request.FILES.get('arquivo')
+    if arquivo is None:
+        return Response({'error': "Envie o arquivo no campo 'arquivo'"}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        formato = detectar_formato(arquivo.name, request.query_params.get('formato'))
+        tarefa = tarefas.submeter_importacao(tipo, arquivo, formato)
+    except FiltroInvalido as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    return resposta_tarefa(request, tarefa)
+
+# Tarefas em segundo plano
+def resposta_tarefa(request, tarefa):
+    """202 com a tarefa submetida e o endereço para acompanhá-la"""
+    return Response(
+        TarefaSerializer(tarefa).data, status=status.HTTP_202_ACCEPTED,
+        headers={'Location': request.build_absolute_uri(reverse('tarefa-detail', args=[tarefa.pk]))},
+    )
+
+@cache_resposta('tarefas')
+@api_view(['GET', 'POST'])
+def tarefa_list(request):
+    """
+    GET: tarefas da mais recente para a mais antiga, sempre paginadas por
+    cursor; aceita ?status= e ?tipo=.
+    POST: submete {"tipo": "exportacao", "parametros": {"formato": ..., filtros
+    de /api/falhas/}} ou {"tipo": "reconstrucao"} e responde 202 com a tarefa.
+    """
+    if request.method == 'POST':
+        if not isinstance(request.data, dict):
+            return Response({'error': 'Envie um objeto com tipo e parametros'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            tarefa = tarefas.submeter(request.data.get('tipo'), request.data.get('parametros') or {})
+        except FiltroInvalido as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return resposta_tarefa(request, tarefa)
+
+    paginator = tarefas.PaginacaoTarefas()
+    try:
+        pagina = paginator.paginate_queryset(tarefas.listar(request.query_params), request)
+    except FiltroInvalido as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    return paginator.get_paginated_response(TarefaSerializer(pagina, many=True).data)
+
+@cache_resposta('tarefas')
+@api_view(['GET'])
+def tarefa_detail(request, pk):
+    """Status, progresso (progresso de total, quando conhecido) e resultado de uma tarefa"""
+    try:
+        tarefa = TarefaDjango.objects.get(pk=pk)
+    except TarefaDjango.DoesNotExist:
+        return Response({'error': 'Tarefa não encontrada'}, status=status.HTTP_404_NOT_FOUND)
+    return Response(TarefaSerializer(tarefa).data)
+
+@cache_resposta('tarefas')
+@api_view(['GET'])
+def tarefa_resultado(request, pk):
+    """
+    Resultado de uma tarefa concluída: o arquivo gerado (exportação) ou o
+    resultado em JSON. 409 enquanto a tarefa não termina ou se ela falhou.
+    """
+    try:
+        tarefa = TarefaDjango.objects.get(pk=pk)
+    except TarefaDjango.DoesNotExist:
+        return Response({'error': 'Tarefa não encontrada'}, status=status.HTTP_404_NOT_FOUND)
+    if tarefa.status != 'concluida':
+        return Response(
+            {'error': f'Tarefa {tarefa.get_status_display().lower()}', 'status': tarefa.status},
+            status=status.HTTP_409_CONFLICT,
+        )
+    if not tarefa.arquivo:
+        return Response(tarefa.resultado)
+
+    formato = tarefa.parametros['formato']
+    try:
+        arquivo = open(tarefa.arquivo, 'rb')
+    except FileNotFoundError:
+        return Response({'error': 'Arquivo do resultado não encontrado'}, status=status.HTTP_410_GONE)
+    return FileResponse(
+        arquivo, as_attachment=True, filename=f'falhas.{formato}', content_type=FORMATOS[formato],
+    )
+
+# Operações em lote
+OPERACOES_LOTE = {
+    'falhas': {'POST': bulk.criar_falhas, 'PUT': bulk.atualizar_falhas, 'DELETE': bulk.excluir_falhas},
+    'unidades': {'POST': bulk.criar_unidades, 'PUT': bulk.atualizar_unidades, 'DELETE': bulk.excluir_unidades},
+}
+
+def executar_lote(request, recurso):
+    """Executa a operação em lote e escolhe o status conforme os erros por item"""
+    try:
+        resultado = OPERACOES_LOTE[recurso][request.method](request.data)
+    except FiltroInvalido as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    except bulk.ErroLote as e:
+        return Response({'error': str(e)}, status=status.HTTP_409_CONFLICT)
+
+    processados = len(resultado.get('created', resultado.get('updated', resultado.get('deleted', []))))
+    if not resultado['errors']:
+        codigo = status.HTTP_201_CREATED if request.method == 'POST' else status.HTTP_200_OK
+    elif processados:
+        codigo = status.HTTP_207_MULTI_STATUS
+    else:
+        codigo = status.HTTP_400_BAD_REQUEST
+    return Response(resultado, status=codigo)
+
+@api_view(['POST', 'PUT', 'DELETE'])
+def unidade_bulk(request):
+    """
+    Cria (POST), atualiza (PUT, cada item com 'id') ou exclui (DELETE, lista
+    de ids) várias unidades em uma única transação
+    """
+    return executar_lote(request, 'unidades')
+
+@api_view(['POST', 'PUT', 'DELETE'])
+def falha_bulk(request):
+    """
+    Cria (POST), atualiza (PUT, cada item com 'id') ou exclui (DELETE, lista
+    de ids) várias falhas em uma única transação
+    """
+    return executar_lote(request, 'falhas')
@@ -0,0 +1,137 @@
+"""
+Versões assíncronas das views de leitura (unidades, falhas, detalhes e
+estatísticas), usadas nas rotas de /api/.
+
+Servidas pelo ASGI (eurounimanager/asgi.py), as requisições GET usam o ORM
+assíncrono e não prendem uma thread do servidor por requisição. Os demais
+métodos (POST/PUT/DELETE) continuam nas views síncronas de api.views, que
+recebem a requisição sem alteração. O JSON gerado é o mesmo das views
+síncronas (mesmo serializer e mesmo renderer JSON).
+"""
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import status
+
+from . import serializacao, views
+from .cache import cache_resposta
+from .filters import FiltroInvalido, filtrar_falhas, filtrar_resumos_diarios
+from .metricas import JSONRendererMedido
+from .models import UnidadeDjango, FalhaDjango, ResumoDiarioFalhasDjango
+from .serializers import UnidadeSerializer, UnidadeResumoSerializer, FalhaSerializer
+from .stats import aestatisticas_falhas, aestatisticas_resumo_diario
+
+
+def resposta(dados, status=status.HTTP_200_OK):
+    return HttpResponse(JSONRendererMedido().render(dados), status=status, content_type='application/json')
+
+
+def erro(mensagem, status):
+    return resposta({'error': mensagem}, status=status)
+
+
+def leitura_async(view_sync):
+    """
+    Atende GET/HEAD com a view assíncrona decorada e repassa os outros
+    métodos para `view_sync`.
+    """
+    def decorator(view):
+        @csrf_exempt
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            if request.method in ('GET', 'HEAD'):
+                return await view(request, *args, **kwargs)
+            return await sync_to_async(view_sync)(request, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+async def listar(queryset):
+    return [obj async for obj in queryset]
+
+
+@leitura_async(views.dashboard_stats)
+@cache_resposta(*views.TABELAS_UNIVERSIDADES)
+async def dashboard_stats(request):
+    """Estatísticas gerais do dashboard"""
+    consultas = views.consultas_dashboard()
+    return resposta({
+        'total_universities': await consultas['total_universities'].acount(),
+        'total_courses': await consultas['total_courses'].acount(),
+        'total_students': await consultas['total_students'].acount(),
+        'countries': await listar(consultas['countries']),
+        'languages': await listar(consultas['languages']),
+    })
+
+
+@leitura_async(views.falha_stats)
+@cache_resposta('falhas', 'unidades')
+async def falha_stats(request):
+    """Estatísticas de falhas por período e por grupo (ver api.views.falha_stats)"""
+    params = request.GET
+    periodo = params.get('periodo', 'dia')
+    try:
+        if set(params) <= views.FILTROS_RESUMO_DIARIO:
+            resumos = filtrar_resumos_diarios(ResumoDiarioFalhasDjango.objects.all(), params)
+            stats = await aestatisticas_resumo_diario(resumos, periodo)
+        else:
+            falhas = filtrar_falhas(FalhaDjango.objects.all(), params)
+            stats = await aestatisticas_falhas(falhas, periodo)
+    except FiltroInvalido as e:
+        return erro(str(e), status.HTTP_400_BAD_REQUEST)
+    return resposta(stats)
+
+
+@leitura_async(views.unidade_list)
+@cache_resposta('unidades')
+async def unidade_list(request):
+    """Lista todas as unidades (com paginação por cursor opcional e formato em colunas)"""
+    try:
+        return await serializacao.aresposta_lista(
+            request, UnidadeDjango.objects.all(), UnidadeSerializer, views.ORDENACAO_UNIDADES
+        )
+    except FiltroInvalido as e:
+        return erro(str(e), status.HTTP_400_BAD_REQUEST)
+
+
+@leitura_async(views.unidade_summary)
+@cache_resposta('unidades', 'falhas')
+async def unidade_summary(request):
+    """Resumo por unidade: total de falhas, falhas ativas e última falha"""
+    unidades = await listar(views.unidades_com_resumo())
+    return resposta(UnidadeResumoSerializer(unidades, many=True).data)
+
+
+@leitura_async(views.unidade_detail)
+@cache_resposta('unidades')
+async def unidade_detail(request, pk):
+    """Detalhes de uma unidade específica"""
+    try:
+        unidade = await UnidadeDjango.objects.aget(pk=pk)
+    except UnidadeDjango.DoesNotExist:
+        return erro('Unidade não encontrada', status.HTTP_404_NOT_FOUND)
+    return resposta(UnidadeSerializer(unidade).data)
+
+
+@leitura_async(views.falha_list)
+@cache_resposta('falhas', 'unidades')
+async def falha_list(request):
+    """Lista as falhas com os filtros e a paginação por cursor opcionais de api.views.falha_list"""
+    try:
+        falhas = filtrar_falhas(FalhaDjango.objects.all(), request.GET)
+        return await serializacao.aresposta_lista(request, falhas, FalhaSerializer, views.ORDENACAO_FALHAS)
+    except FiltroInvalido as e:
+        return erro(str(e), status.HTTP_400_BAD_REQUEST)
+
+
+@leitura_async(views.falha_detail)
+@cache_resposta('falhas', 'unidades')
+async def falha_detail(request, pk):
+    """Detalhes de uma falha específica"""
+    try:
+        falha = await FalhaDjango.objects.com_unidade().aget(pk=pk)
+    except FalhaDjango.DoesNotExist:
+        return erro('Falha não encontrada', status.HTTP_404_NOT_FOUND)
+    return resposta(FalhaSerializer(falha).data)
@@ -12,6 +12,8 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 
 from pathlib import Path
 
+from decouple import config
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -43,6 +45,10 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Primeiro, para que o tempo total inclua os demais (ver api/metricas.py)
+    'api.metricas.MetricasMiddleware',
+    # Logo depois: a métrica de tamanho vê o corpo comprimido (ver api/compressao.py)
+    'api.compressao.CompressaoMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -76,12 +82,59 @@ WSGI_APPLICATION = 'eurounimanager.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# Perfil do banco lido do ambiente (ou de um arquivo .env, via python-decouple).
+# DB_ENGINE=sqlite (padrão) ou postgresql.
+DB_ENGINE = config('DB_ENGINE', default='sqlite')
+
+if DB_ENGINE == 'postgresql':
+    # Com DB_POOL=true usa o pool de conexões do psycopg 3
+    # (pip install "psycopg[binary,pool]"); sem pool, conexões persistentes.
+    DB_POOL = config('DB_POOL', default=True, cast=bool)
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': config('DB_NAME', default='eurounimanager'),
+            'USER': config('DB_USER', default='postgres'),
+            'PASSWORD': config('DB_PASSWORD', default=''),
+            'HOST': config('DB_HOST', default='localhost'),
+            'PORT': config('DB_PORT', default='5432'),
+            # O pool já reaproveita as conexões; CONN_MAX_AGE precisa ser 0 com ele
+            'CONN_MAX_AGE': 0 if DB_POOL else config('DB_CONN_MAX_AGE', default=60, cast=int),
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {
+                'pool': {
+                    'min_size': config('DB_POOL_MIN_SIZE', default=2, cast=int),
+                    'max_size': config('DB_POOL_MAX_SIZE', default=20, cast=int),
+                    'timeout': config('DB_POOL_TIMEOUT', default=10, cast=int),
+                },
+            } if DB_POOL else {},
+        }
+    }
+else:
+    # SQLite com WAL: leituras não bloqueiam a escrita e vice-versa.
+    # synchronous=NORMAL é seguro com WAL (pode perder só a última transação
+    # numa queda de energia, sem corromper o arquivo). Transações IMMEDIATE
+    # pegam o lock de escrita no BEGIN e esperam até DB_TIMEOUT segundos por
+    # ele, em vez de falharem com "database is locked" no meio da transação.
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': config('DB_NAME', default=str(BASE_DIR / 'db.sqlite3')),
+            'CONN_MAX_AGE': config('DB_CONN_MAX_AGE', default=60, cast=int),
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {
+                'timeout': config('DB_TIMEOUT', default=20, cast=int),
+                'transaction_mode': 'IMMEDIATE',
+                'init_command': ';'.join([
+                    'PRAGMA journal_mode=WAL',
+                    'PRAGMA synchronous=' + config('DB_SQLITE_SYNCHRONOUS', default='NORMAL'),
+                    # Negativo = KiB: 64 MiB de cache de páginas por conexão
+                    'PRAGMA cache_size=' + config('DB_SQLITE_CACHE_SIZE', default='-65536'),
+                    'PRAGMA temp_store=MEMORY',
+                ]),
+            },
+        }
     }
-}
 
 
 # Password validation
@@ -131,13 +184,85 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.AllowAny',
     ],
     'DEFAULT_RENDERER_CLASSES': [
-        'rest_framework.renderers.JSONRenderer',
+        'api.metricas.JSONRendererMedido',
     ],
     'DEFAULT_PARSER_CLASSES': [
         'rest_framework.parsers.JSONParser',
     ],
 }
 
+# Cache das respostas GET da API (ver api/cache.py). As versões das tabelas
+# ficam no banco; este backend guarda apenas os corpos já renderizados e pode
+# ser trocado por FileBasedCache, Memcached ou Redis sem mudar o código.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'api': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'api-respostas',
+        'TIMEOUT': 300,
+        'OPTIONS': {'MAX_ENTRIES': 1000},
+    },
+}
+
+API_CACHE_ALIAS = 'api'
+
+# Paginação por cursor das listagens (opcional por requisição)
+API_PAGINATION = {
+    'DEFAULT_PAGE_SIZE': 100,
+    'MAX_PAGE_SIZE': 1000,
+    'PAGINATE_BY_DEFAULT': False,
+}
+
+# Tamanho máximo dos lotes em /api/unidades/bulk/ e /api/falhas/bulk/
+API_BULK_MAX_ITEMS = 1000
+
+# Sincronização incremental (/api/sync/): margem de reentrega das últimas
+# gravações e por quantos dias as marcas de exclusão são mantidas
+API_SYNC = {
+    'MARGEM_SEGUNDOS': 5,
+    'RETENCAO_EXCLUSOES_DIAS': 90,
+}
+
+# Feed de eventos em tempo real (/api/eventos/). BROKER pode apontar para uma
+# classe com publicar(evento) que distribua os eventos entre processos.
+API_EVENTOS = {
+    'BROKER': 'api.eventos.BrokerLocal',
+    'HISTORICO': 1000,
+    'MAX_FILA': 1000,
+    'KEEPALIVE': 15,
+}
+
+# Métricas por requisição (api/metricas.py): cabeçalho Server-Timing e
+# histogramas em /api/metricas/
+API_METRICAS = {
+    'SERVER_TIMING': True,
+}
+
+# Compressão das respostas (api/compressao.py): gzip, ou br com o pacote
+# opcional brotli; text/event-stream nunca é comprimido
+API_COMPRESSAO = {
+    'TAMANHO_MINIMO': 1024,
+    'NIVEL_GZIP': 6,
+    'QUALIDADE_BROTLI': 5,
+}
+
+# Tarefas em segundo plano (api/tarefas.py): cada processo web executa as
+# tarefas a partir da primeira requisição; com INICIAR=False só
+# `manage.py executar_tarefas` executa. DIRETORIO guarda os arquivos
+# enviados e os resultados (padrão: media/tarefas).
+API_TAREFAS = {
+    'INICIAR': True,
+    'THREADS': 2,
+    'INTERVALO': 5,
+    'EXPIRACAO': 600,
+    'RETENCAO_DIAS': 7,
+}
+
+# Desliga o despachante de tarefas durante `manage.py test`
+TEST_RUNNER = 'eurounimanager.test_runner.TestRunner'
+
 # CORS Configuration
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:3000",
@@ -0,0 +1,14 @@
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+
+
+class TestRunner(DiscoverRunner):
+    """
+    Nos testes nenhum despachante de tarefas é iniciado pelas requisições do
+    cliente de teste: os testes executam as tarefas com
+    api.tarefas.executar_pendentes(), na mesma transação.
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        settings.API_TAREFAS = {**getattr(settings, 'API_TAREFAS', {}), 'INICIAR': False}
@@ -0,0 +1,61 @@
+import { useEffect, useRef } from 'react';
+
+// Evento publicado pelo backend em /api/eventos/ (Server-Sent Events)
+export interface EventoApi<T = unknown> {
+  tipo: 'falha' | 'unidade';
+  acao: 'created' | 'updated' | 'deleted' | 'imported';
+  dados: T;
+}
+
+const URL_EVENTOS = 'http://localhost:8000/api/eventos/';
+
+// Assina o feed de eventos enquanto o componente estiver montado.
+// O EventSource reconecta sozinho e reenvia o Last-Event-ID, então nenhum
+// evento é perdido em quedas curtas.
+export function useEventosApi(
+  tipos: Array<EventoApi['tipo']>,
+  aoReceber: (evento: EventoApi) => void
+) {
+  // Guarda o callback mais recente sem reabrir a conexão a cada render
+  const callback = useRef(aoReceber);
+  callback.current = aoReceber;
+  const chaveTipos = tipos.join(',');
+
+  useEffect(() => {
+    const fonte = new EventSource(`${URL_EVENTOS}?tipos=${chaveTipos}`);
+    fonte.onmessage = (mensagem) => {
+      try {
+        callback.current(JSON.parse(mensagem.data));
+      } catch (error) {
+        console.error('Evento inválido recebido:', error);
+      }
+    };
+    return () => fonte.close();
+  }, [chaveTipos]);
+}
+
+// Dados do evento das falhas excluídas em cascata com unidades
+export interface ExclusaoEmCascata {
+  ids: number[];
+  unidades: number[];
+}
+
+// Aplica um evento created/updated/deleted a uma lista de registros com id
+export function aplicarEvento<T extends { id: number }>(lista: T[], evento: EventoApi): T[] {
+  const dados = evento.dados as T;
+  if (evento.acao === 'deleted') {
+    const { ids } = evento.dados as Partial<ExclusaoEmCascata>;
+    if (ids) {
+      const excluidos = new Set(ids);
+      return lista.filter(item => !excluidos.has(item.id));
+    }
+    return lista.filter(item => item.id !== dados.id);
+  }
+  if (evento.acao === 'created' || evento.acao === 'updated') {
+    const existe = lista.some(item => item.id === dados.id);
+    return existe
+      ? lista.map(item => (item.id === dados.id ? { ...item, ...dados } : item))
+      : [dados, ...lista];
+  }
+  return lista;
+}
@@ -1,4 +1,4 @@
-import { useState, useEffect } from 'react';
+import { useState, useEffect, useRef } from 'react';
 import {
   Container,
   Typography,
@@ -26,18 +26,8 @@ import {
   TablePagination,
   Chip,
 } from '@mui/material';
+import { useEventosApi } from '../hooks/useEventosApi';
 // Interfaces para os dados do backend
-interface Unidade {
-  id: number;
-  nome_unidade: string;
-  grupo_unidade: string;
-  tecnico_unidade: string;
-  id_unidade: string;
-  observacoes: string;
-  created_at: string;
-  updated_at: string;
-}
-
 interface Falha {
   id: number;
   falha_ocorrida: string;
@@ -53,6 +43,11 @@ interface FalhaComUnidade extends Falha {
   unidade_nome: string;
 }
 
+// Resposta de /api/dashboard/falhas/ (só os totais são usados aqui)
+interface EstatisticasFalhas {
+  totais: { total: number; ativas: number; resolvidas: number };
+}
+
 function Dashboard() {
   const [mes, setMes] = useState<string>(new Date().getMonth() + 1 + '');
   const [ano, setAno] = useState<string>(new Date().getFullYear() + '');
@@ -71,109 +66,65 @@ function Dashboard() {
   const [page, setPage] = useState(0);
   const [rowsPerPage, setRowsPerPage] = useState(20);
   
-  // Estados para dados do backend
-  const [unidades, setUnidades] = useState<Unidade[]>([]);
-  const [falhas, setFalhas] = useState<Falha[]>([]);
   const [loading, setLoading] = useState(true);
-  
-  // Função para buscar dados do backend
-  const fetchDados = async () => {
+
+  // Filtros de data do mês selecionado (AAAA-MM-DD)
+  const filtrosPeriodo = () => {
+    const mm = mes.padStart(2, '0');
+    const ultimoDia = new Date(parseInt(ano), parseInt(mes), 0).getDate();
+    return { data_inicio: `${ano}-${mm}-01`, data_fim: `${ano}-${mm}-${String(ultimoDia).padStart(2, '0')}` };
+  };
+
+  // Contagens do mês agregadas pelo servidor (/api/dashboard/falhas/, lido do resumo diário)
+  const fetchEstatisticas = async (silencioso = false) => {
     try {
-      setLoading(true);
-      const [unidadesResponse, falhasResponse] = await Promise.all([
-        fetch('http://localhost:8000/api/unidades/'),
-        fetch('http://localhost:8000/api/falhas/')
-      ]);
-      
-      if (unidadesResponse.ok && falhasResponse.ok) {
-        const unidadesData: Unidade[] = await unidadesResponse.json();
-        const falhasData: Falha[] = await falhasResponse.json();
-        
-        setUnidades(unidadesData);
-        setFalhas(falhasData);
+      if (!silencioso) setLoading(true);
+      const params = new URLSearchParams({ periodo: 'mes', ...filtrosPeriodo() });
+      const response = await fetch(`http://localhost:8000/api/dashboard/falhas/?${params}`);
+      if (response.ok) {
+        const { totais }: EstatisticasFalhas = await response.json();
+        setEstatisticas({ ativas: totais.ativas, fechadas: totais.resolvidas, total: totais.total });
       }
     } catch (error) {
-      console.error('Erro ao buscar dados:', error);
+      console.error('Erro ao buscar estatísticas:', error);
     } finally {
       setLoading(false);
     }
   };
-  
-  useEffect(() => {
-    fetchDados();
-  }, []);
 
-  // Função para calcular estatísticas com base no mês e ano selecionados
-  const calcularEstatisticas = () => {
-    let ativas = 0;
-    let fechadas = 0;
-    let total = 0;
-    const falhasAtivasList: FalhaComUnidade[] = [];
-    const falhasFechadasList: FalhaComUnidade[] = [];
-    const falhasTotalList: FalhaComUnidade[] = [];
-
-    // Percorre todas as falhas do backend
-    falhas.forEach(falha => {
-      const unidade = unidades.find(u => u.id === falha.unidade);
-      const unidade_nome = unidade?.nome_unidade || 'Unidade Desconhecida';
-      
-      // Converte a data da falha para objeto Date
-      const dataFalha = new Date(falha.data_falha);
-      
-      // Verifica se a falha ocorreu no mês e ano selecionados
-      if (dataFalha.getMonth() + 1 === parseInt(mes) && dataFalha.getFullYear() === parseInt(ano)) {
-        const falhaComUnidade: FalhaComUnidade = { ...falha, unidade_nome };
-        total++;
-        falhasTotalList.push(falhaComUnidade);
-        
-        if (falha.ativa) {
-          ativas++;
-          falhasAtivasList.push(falhaComUnidade);
-        } else {
-          fechadas++;
-          falhasFechadasList.push(falhaComUnidade);
-        }
+  // Falhas do mês para o modal, filtradas no servidor (já trazem unidade_nome)
+  const fetchFalhasModal = async (tipo: 'ativas' | 'fechadas' | 'todas') => {
+    try {
+      const params = new URLSearchParams(filtrosPeriodo());
+      if (tipo !== 'todas') params.set('ativa', tipo === 'ativas' ? 'true' : 'false');
+      const response = await fetch(`http://localhost:8000/api/falhas/?${params}`);
+      if (response.ok) {
+        const falhasData: FalhaComUnidade[] = await response.json();
+        // Ordena por data (mais recentes primeiro)
+        setFalhasFiltradas(falhasData.sort(
+          (a, b) => new Date(b.data_falha).getTime() - new Date(a.data_falha).getTime()
+        ));
       }
-    });
-
-    setEstatisticas({ ativas, fechadas, total });
-    
-    // Ordena as listas por data (mais recentes primeiro)
-    const ordenarPorData = (a: FalhaComUnidade, b: FalhaComUnidade) => {
-      const dataA = new Date(a.data_falha);
-      const dataB = new Date(b.data_falha);
-      return dataB.getTime() - dataA.getTime();
-    };
-    
-    falhasAtivasList.sort(ordenarPorData);
-    falhasFechadasList.sort(ordenarPorData);
-    falhasTotalList.sort(ordenarPorData);
-    
-    // Armazena as listas para uso no modal
-    return { falhasAtivasList, falhasFechadasList, falhasTotalList };
+    } catch (error) {
+      console.error('Erro ao buscar falhas:', error);
+    }
   };
 
-  // Recalcula as estatísticas quando o mês, ano ou dados mudarem
+  // Recarrega as estatísticas quando o mês ou o ano mudarem
   useEffect(() => {
-    if (unidades.length > 0 && falhas.length > 0) {
-      calcularEstatisticas();
-    }
-  }, [mes, ano, unidades, falhas]);
+    fetchEstatisticas();
+  }, [mes, ano]);
 
-  // Atualiza as falhas filtradas quando o modal é aberto
-  useEffect(() => {
-    if (modalOpen && tipoFalhaModal && unidades.length > 0 && falhas.length > 0) {
-      const { falhasAtivasList, falhasFechadasList, falhasTotalList } = calcularEstatisticas();
-      
-      if (tipoFalhaModal === 'ativas') {
-        setFalhasFiltradas(falhasAtivasList);
-      } else if (tipoFalhaModal === 'fechadas') {
-        setFalhasFiltradas(falhasFechadasList);
-      } else {
-        setFalhasFiltradas(falhasTotalList);
-      }
-    }
-  }, [modalOpen, tipoFalhaModal, unidades, falhas]);
+  // As contagens são agregadas no servidor: a cada rajada de eventos recarrega uma vez
+  const recarga = useRef<ReturnType<typeof setTimeout> | undefined>(undefined);
+  useEventosApi(['falha', 'unidade'], () => {
+    clearTimeout(recarga.current);
+    recarga.current = setTimeout(() => {
+      fetchEstatisticas(true);
+      if (modalOpen && tipoFalhaModal) fetchFalhasModal(tipoFalhaModal);
+    }, 300);
+  });
+  useEffect(() => () => clearTimeout(recarga.current), []);
 
   const handleMesChange = (event: SelectChangeEvent) => {
     setMes(event.target.value);
@@ -187,17 +138,8 @@ function Dashboard() {
   const handleOpenModal = (tipo: 'ativas' | 'fechadas' | 'todas') => {
     setTipoFalhaModal(tipo);
     setPage(0); // Reseta a paginação
-    
-    const { falhasAtivasList, falhasFechadasList, falhasTotalList } = calcularEstatisticas();
-    
-    if (tipo === 'ativas') {
-      setFalhasFiltradas(falhasAtivasList);
-    } else if (tipo === 'fechadas') {
-      setFalhasFiltradas(falhasFechadasList);
-    } else {
-      setFalhasFiltradas(falhasTotalList);
-    }
-    
+    setFalhasFiltradas([]);
+    fetchFalhasModal(tipo);
     setModalOpen(true);
   };
   
@@ -1,4 +1,4 @@
-import { useState, useEffect } from 'react';
+import { useState, useEffect, useRef } from 'react';
 import {
   Container,
   Typography,
@@ -16,6 +16,7 @@ import {
   Grid,
 } from '@mui/material';
 import { styled, alpha } from '@mui/material/styles';
+import { useEventosApi } from '../hooks/useEventosApi';
 
 // Interfaces
 interface Unidade {
@@ -40,7 +41,13 @@ interface Falha {
   updated_at?: string;
 }
 
-interface UnidadeComFalha extends Unidade {
+interface UnidadeResumo extends Omit<Unidade, 'observacoes'> {
+  total_falhas: number;
+  falhas_ativas: number;
+  ultima_falha: Omit<Falha, 'unidade'> | null;
+}
+
+interface UnidadeComFalha extends Omit<Unidade, 'observacoes'> {
   ultimaFalha?: Falha;
 }
 
@@ -95,40 +102,26 @@ function Home() {
   const [error, setError] = useState<string>('');
 
   // Função para buscar dados do backend
-  const fetchDados = async () => {
+  const fetchDados = async (silencioso = false) => {
     try {
-      setLoading(true);
+      if (!silencioso) setLoading(true);
       setError('');
 
-      // Buscar unidades
-      const unidadesResponse = await fetch('http://127.0.0.1:8000/api/unidades/');
-      if (!unidadesResponse.ok) {
+      // Buscar resumo das unidades (contagens e última falha calculadas no servidor)
+      const resumoResponse = await fetch('http://127.0.0.1:8000/api/unidades/summary/');
+      if (!resumoResponse.ok) {
         throw new Error('Erro ao carregar unidades');
       }
-      const unidadesData: Unidade[] = await unidadesResponse.json();
+      const resumoData: UnidadeResumo[] = await resumoResponse.json();
 
-      // Buscar falhas
-      const falhasResponse = await fetch('http://127.0.0.1:8000/api/falhas/');
-      if (!falhasResponse.ok) {
-        throw new Error('Erro ao carregar falhas');
-      }
-      const falhasData: Falha[] = await falhasResponse.json();
-
-      // Combinar dados e pegar apenas as 5 unidades mais recentes
-      const unidadesComFalhas: UnidadeComFalha[] = unidadesData
+      // Pegar apenas as 5 unidades mais recentes
+      const unidadesComFalhas: UnidadeComFalha[] = resumoData
         .sort((a, b) => new Date(b.created_at || '').getTime() - new Date(a.created_at || '').getTime())
         .slice(0, 5)
-        .map(unidade => {
-          // Encontrar a falha mais recente para cada unidade
-          const falhasUnidade = falhasData
-            .filter(falha => falha.unidade === unidade.id)
-            .sort((a, b) => new Date(b.data_falha).getTime() - new Date(a.data_falha).getTime());
-          
-          return {
-            ...unidade,
-            ultimaFalha: falhasUnidade[0] || undefined
-          };
-        });
+        .map(unidade => ({
+          ...unidade,
+          ultimaFalha: unidade.ultima_falha ? { ...unidade.ultima_falha, unidade: unidade.id } : undefined
+        }));
 
       setUnidades(unidadesComFalhas);
     } catch (err) {
@@ -142,6 +135,14 @@ function Home() {
     fetchDados();
   }, []);
 
+  // O resumo é agregado no servidor: a cada rajada de eventos recarrega uma vez
+  const recarga = useRef<ReturnType<typeof setTimeout> | undefined>(undefined);
+  useEventosApi(['falha', 'unidade'], () => {
+    clearTimeout(recarga.current);
+    recarga.current = setTimeout(() => fetchDados(true), 300);
+  });
+  useEffect(() => () => clearTimeout(recarga.current), []);
+
   // Função para formatar data
   const formatarData = (data: string) => {
     return new Date(data).toLocaleDateString('pt-BR');
@@ -26,6 +26,7 @@ import {
 } from '@mui/material';
 import EditIcon from '@mui/icons-material/Edit';
 import AddIcon from '@mui/icons-material/Add';
+import { useEventosApi, aplicarEvento } from '../hooks/useEventosApi';
 
 // Interfaces para os dados do backend
 interface Unidade {
@@ -67,9 +68,9 @@ function ListagemFalhas() {
   const [unidades, setUnidades] = useState<Unidade[]>([]);
 
   // Função para buscar unidades e falhas do backend
-  const fetchFalhasEUnidades = async () => {
+  const fetchFalhasEUnidades = async (silencioso = false) => {
     try {
-      setLoading(true);
+      if (!silencioso) setLoading(true);
       
       // Busca unidades e falhas em paralelo
       const [unidadesResponse, falhasResponse] = await Promise.all([
@@ -116,6 +117,31 @@ function ListagemFalhas() {
     fetchFalhasEUnidades();
   }, []);
 
+  // Mantém a listagem atualizada com os eventos do servidor
+  useEventosApi(['falha', 'unidade'], (evento) => {
+    if (evento.acao === 'imported') {
+      fetchFalhasEUnidades(true);
+      return;
+    }
+    if (evento.tipo === 'falha') {
+      setTodasFalhas(atuais =>
+        aplicarEvento(atuais, evento).sort(
+          (a, b) => new Date(b.data_falha).getTime() - new Date(a.data_falha).getTime()
+        )
+      );
+      return;
+    }
+    const unidade = evento.dados as Unidade;
+    setUnidades(atuais => aplicarEvento(atuais, evento));
+    if (evento.acao === 'deleted') {
+      setTodasFalhas(atuais => atuais.filter(falha => falha.unidade !== unidade.id));
+    } else if (evento.acao === 'updated') {
+      setTodasFalhas(atuais => atuais.map(falha =>
+        falha.unidade === unidade.id ? { ...falha, unidade_nome: unidade.nome_unidade } : falha
+      ));
+    }
+  });
+
   // Filtra as falhas com base na opção de mostrar encerradas
   useEffect(() => {
     if (mostrarEncerradas) {
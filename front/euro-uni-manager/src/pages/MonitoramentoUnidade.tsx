@@ -90,11 +90,10 @@ function MonitoramentoUnidade() {
   const fetchFalhasUnidade = async (unidadeId: string) => {
     setLoadingFalhas(true);
     try {
-      const response = await fetch('http://127.0.0.1:8000/api/falhas/');
+      // Filtrar falhas da unidade selecionada no servidor
+      const response = await fetch(`http://127.0.0.1:8000/api/falhas/?unidade=${encodeURIComponent(unidadeId)}`);
       if (response.ok) {
-        const data = await response.json();
-        // Filtrar falhas da unidade selecionada
-        const falhasUnidade = data.filter((falha: Falha) => falha.unidade === parseInt(unidadeId));
+        const falhasUnidade: Falha[] = await response.json();
         setFalhas(falhasUnidade);
       } else {
         setErrorMessage('Erro ao carregar falhas');
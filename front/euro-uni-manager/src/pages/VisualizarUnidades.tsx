@@ -59,10 +59,16 @@ interface Falha {
   updated_at?: string;
 }
 
-// Interface para dados da unidade com falhas calculadas
-interface UnidadeComFalhas extends Unidade {
+// Linha de /api/unidades/summary/: contagens e última falha calculadas no servidor
+interface UnidadeResumo extends Omit<Unidade, 'observacoes'> {
+  total_falhas: number;
+  falhas_ativas: number;
+  ultima_falha: Omit<Falha, 'unidade'> | null;
+}
+
+interface UnidadeComFalhas extends Omit<Unidade, 'observacoes'> {
   falhasPendentes: number;
-  ultimaFalha?: Falha;
+  ultimaFalha?: Omit<Falha, 'unidade'>;
 }
 
 // Estilizando componentes da tabela
@@ -117,7 +123,8 @@ const ActionButton = styled(IconButton)(({ theme }) => ({
 const VisualizarUnidades = () => {
   const navigate = useNavigate();
   const [unidades, setUnidades] = useState<UnidadeComFalhas[]>([]);
-  const [falhas, setFalhas] = useState<Falha[]>([]);
+  // Falhas da unidade aberta no modal de edição, buscadas ao abrir
+  const [falhasUnidade, setFalhasUnidade] = useState<Falha[]>([]);
   const [openDialog, setOpenDialog] = useState(false);
   const [unidadeParaExcluir, setUnidadeParaExcluir] = useState<number | null>(null);
   const [searchTerm, setSearchTerm] = useState('');
@@ -135,44 +142,28 @@ const VisualizarUnidades = () => {
   const [loading, setLoading] = useState(true);
   const [loadingDelete, setLoadingDelete] = useState(false);
   const [loadingEdit, setLoadingEdit] = useState(false);
+  const [loadingFalhas, setLoadingFalhas] = useState(false);
   const [successMessage, setSuccessMessage] = useState('');
   const [errorMessage, setErrorMessage] = useState('');
 
   // Carregar dados do backend
   useEffect(() => {
-    fetchUnidadesEFalhas();
+    fetchUnidades();
   }, []);
 
-  const fetchUnidadesEFalhas = async () => {
+  const fetchUnidades = async () => {
     setLoading(true);
     try {
-      // Carregar unidades e falhas em paralelo
-      const [unidadesResponse, falhasResponse] = await Promise.all([
-        fetch('http://127.0.0.1:8000/api/unidades/'),
-        fetch('http://127.0.0.1:8000/api/falhas/')
-      ]);
-
-      if (unidadesResponse.ok && falhasResponse.ok) {
-        const unidadesData: Unidade[] = await unidadesResponse.json();
-        const falhasData: Falha[] = await falhasResponse.json();
-        
-        setFalhas(falhasData);
-        
-        // Calcular falhas pendentes e última falha para cada unidade
-        const unidadesComFalhas: UnidadeComFalhas[] = unidadesData.map(unidade => {
-          const falhasUnidade = falhasData.filter(falha => falha.unidade === unidade.id);
-          const falhasPendentes = falhasUnidade.filter(falha => falha.ativa).length;
-          const ultimaFalha = falhasUnidade
-            .sort((a, b) => new Date(b.data_falha).getTime() - new Date(a.data_falha).getTime())[0];
-          
-          return {
-            ...unidade,
-            falhasPendentes,
-            ultimaFalha
-          };
-        });
-        
-        setUnidades(unidadesComFalhas);
+      // Falhas pendentes e última falha de cada unidade vêm agregadas do servidor
+      const response = await fetch('http://127.0.0.1:8000/api/unidades/summary/');
+
+      if (response.ok) {
+        const resumoData: UnidadeResumo[] = await response.json();
+        setUnidades(resumoData.map(({ falhas_ativas, ultima_falha, ...unidade }) => ({
+          ...unidade,
+          falhasPendentes: falhas_ativas,
+          ultimaFalha: ultima_falha ?? undefined
+        })));
       } else {
         setErrorMessage('Erro ao carregar dados');
       }
@@ -183,20 +174,40 @@ const VisualizarUnidades = () => {
     }
   };
 
-  const handleEditClick = (id: number) => {
+  const handleEditClick = async (id: number) => {
     const unidade = unidades.find(u => u.id === id);
-    if (unidade) {
-      setUnidadeSelecionada(unidade);
-      setUnidadeEditData({ 
-        id: unidade.id,
-        nome_unidade: unidade.nome_unidade,
-        grupo_unidade: unidade.grupo_unidade,
-        tecnico_unidade: unidade.tecnico_unidade,
-        id_unidade: unidade.id_unidade,
-        observacoes: unidade.observacoes
-      });
-      setPaginaAtualFalhas(1);
-      setOpenEditModal(true);
+    if (!unidade) return;
+    setUnidadeSelecionada(unidade);
+    setUnidadeEditData(null);
+    setFalhasUnidade([]);
+    setPaginaAtualFalhas(1);
+    setOpenEditModal(true);
+
+    // O resumo não traz as observações nem as falhas: busca só as desta unidade
+    setLoadingFalhas(true);
+    try {
+      const [unidadeResponse, falhasResponse] = await Promise.all([
+        fetch(`http://127.0.0.1:8000/api/unidades/${id}/`),
+        fetch(`http://127.0.0.1:8000/api/falhas/?unidade=${id}`)
+      ]);
+      if (unidadeResponse.ok && falhasResponse.ok) {
+        const unidadeData: Unidade = await unidadeResponse.json();
+        setUnidadeEditData({
+          id: unidadeData.id,
+          nome_unidade: unidadeData.nome_unidade,
+          grupo_unidade: unidadeData.grupo_unidade,
+          tecnico_unidade: unidadeData.tecnico_unidade,
+          id_unidade: unidadeData.id_unidade,
+          observacoes: unidadeData.observacoes
+        });
+        setFalhasUnidade(await falhasResponse.json());
+      } else {
+        setErrorMessage('Erro ao carregar dados da unidade');
+      }
+    } catch (error) {
+      setErrorMessage('Erro ao conectar com o servidor');
+    } finally {
+      setLoadingFalhas(false);
     }
   };
 
@@ -250,6 +261,7 @@ const VisualizarUnidades = () => {
     setOpenEditModal(false);
     setUnidadeSelecionada(null);
     setUnidadeEditData(null);
+    setFalhasUnidade([]);
     setPaginaAtualFalhas(1);
   };
 
@@ -299,19 +311,12 @@ const VisualizarUnidades = () => {
     }
   };
 
-  // Função para obter falhas da unidade selecionada
-  const getFalhasUnidade = () => {
-    if (!unidadeSelecionada) return [];
-    return falhas.filter(falha => falha.unidade === unidadeSelecionada.id);
-  };
-
   const handleCloseSnackbar = () => {
     setSuccessMessage('');
     setErrorMessage('');
   };
 
   // Paginação das falhas
-  const falhasUnidade = getFalhasUnidade();
   const totalPaginasFalhas = Math.ceil(falhasUnidade.length / falhasPorPagina);
   const falhasPaginadas = falhasUnidade.slice(
     (paginaAtualFalhas - 1) * falhasPorPagina,
@@ -553,6 +558,11 @@ const VisualizarUnidades = () => {
           </Typography>
         </DialogTitle>
         <DialogContent sx={{ pt: 2 }}>
+          {loadingFalhas && (
+            <Box sx={{ display: 'flex', justifyContent: 'center', alignItems: 'center', py: 4 }}>
+              <CircularProgress size={40} />
+            </Box>
+          )}
           {unidadeEditData && (
             <Box>
               {/* Formulário de edição */}
@@ -695,7 +705,7 @@ const VisualizarUnidades = () => {
             onClick={handleSaveEdit} 
             variant="contained" 
             color="primary"
-            disabled={loadingEdit}
+            disabled={loadingEdit || !unidadeEditData}
             startIcon={loadingEdit ? <CircularProgress size={20} /> : null}
           >
             {loadingEdit ? 'Salvando...' : 'Salvar Alterações'}